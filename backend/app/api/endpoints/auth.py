@@ -1,12 +1,21 @@
 ﻿from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Body
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.models.user import User
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.db.session import get_async_db
+from app.api.pagination import keyset_page, finish_page, page_size
+from app.core.config import settings
+from app.core.auth_cache import TokenCache, UserPrincipal
+from app.core.passwords import PasswordExecutor
+from app.core.response_cache import response_cache
+from app.models.user import User, user_skills
+from app.models.resource_allocation import ResourceAllocation
+from app.models.availability import set_availability
 from app.schemas.user import UserCreate, UserBase, UserUpdate, UserWithSkills
 import os
 
@@ -14,12 +23,21 @@ router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+# bcrypt runs here instead of on the event loop
+password_executor = PasswordExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key_here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 8  # 8 days
 
+# Verified tokens, so repeat requests skip both the JWT decode and the user query
+token_cache = TokenCache(
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES
+)
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -28,6 +46,18 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password, hashed_password):
+    """
+    Verify on the password pool. Returns (valid, new_hash); new_hash is set
+    when the stored hash was made with a different cost factor.
+    """
+    return await password_executor.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):
+    return await password_executor.run(pwd_context.hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -44,8 +74,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 
 async def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
 ):
+    """
+    Resolve the bearer token to a UserPrincipal (id, email, role, is_active).
+    Handlers that change the user must load the User row themselves.
+    """
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -60,10 +98,12 @@ async def get_current_user(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.email == email).first()
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
     if user is None:
         raise credentials_exception
-    return user
+    principal = UserPrincipal.from_user(user)
+    token_cache.put(token, principal, payload.get("exp"))
+    return principal
 
 
 async def require_role(user: User = Depends(get_current_user), required_role: str = "admin"):
@@ -73,14 +113,16 @@ async def require_role(user: User = Depends(get_current_user), required_role: st
 
 
 @router.post("/register")
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if user already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = (await db.execute(select(User).where(User.email == user.email))).scalars().first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
+    # End the read transaction so the pooled connection is free while bcrypt runs
+    await db.commit()
 
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     new_user = User(
         email=user.email,
         hashed_password=hashed_password,
@@ -88,22 +130,28 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         role=user.role if user.role else "employee",
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
     return {"message": "User created successfully"}
 
 
 @router.post("/login")
 async def login(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = (await db.execute(select(User).where(User.email == form_data.username))).scalars().first()
+    # End the read transaction so the pooled connection is free while bcrypt runs
+    await db.commit()
+    valid, new_hash = await verify_password_async(form_data.password, user.hashed_password) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash and settings.PASSWORD_REHASH_ON_LOGIN:
+        # The cost factor changed since this hash was made; upgrade it while we have the password
+        user.hashed_password = new_hash
+        await db.commit()
     access_token_expires = timedelta(
         minutes=ACCESS_TOKEN_EXPIRE_MINUTES
     )
@@ -122,16 +170,14 @@ async def login(
 
 
 @router.get("/users/me")
-async def read_users_me(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # Fetch user with projects and allocations
-    user_with_data = db.query(User).filter(User.id == current_user.id).first()
-    
-    from sqlalchemy.orm import joinedload
+async def read_users_me(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     # Re-fetch user with projects and other relationships loaded
-    user_with_relations = db.query(User).options(
-        joinedload(User.skills),
-        joinedload(User.allocations)  # Use the correct relationship name 'allocations'
-    ).filter(User.id == current_user.id).first()
+    user_with_relations = (await db.execute(
+        select(User).options(
+            selectinload(User.skills),
+            selectinload(User.allocations)  # Use the correct relationship name 'allocations'
+        ).where(User.id == current_user.id)
+    )).scalars().first()
     
     # Create a dictionary from the user for custom modification
     user_dict = {
@@ -154,7 +200,7 @@ async def read_users_me(current_user: User = Depends(get_current_user), db: Sess
         project_ids = [alloc.project_id for alloc in user_with_relations.allocations if alloc.project_id]
         
         if project_ids:
-            projects = db.query(Project).filter(Project.id.in_(project_ids)).all()
+            projects = (await db.execute(select(Project).where(Project.id.in_(project_ids)))).scalars().all()
             user_dict["projects"] = [{
                 "id": project.id,
                 "name": project.name,
@@ -179,67 +225,127 @@ async def read_users_me(current_user: User = Depends(get_current_user), db: Sess
 @router.put("/users/me")
 async def update_own_user(
     user_data: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Update the currently authenticated user's profile"""
     user_dict = user_data.dict(exclude_unset=True)
     
-    # Handle password update
+    # Handle password update (hashed before the transaction starts, so no connection waits on bcrypt)
     if "password" in user_dict:
-        user_dict["hashed_password"] = get_password_hash(user_dict["password"])
+        user_dict["hashed_password"] = await get_password_hash_async(user_dict["password"])
         del user_dict["password"]
     
+    # Load skills up front; async sessions cannot lazy-load the collection on assignment
+    db_user = (await db.execute(
+        select(User).options(selectinload(User.skills)).where(User.id == current_user.id)
+    )).scalars().first()
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
     # Handle skills update
+    skills_created = False
     if "skills" in user_dict:
         # Clear current skills
-        current_user.skills = []
+        db_user.skills = []
         
         # Add new skills
         if user_dict["skills"]:
             from app.models.skill import Skill
             for skill_name in user_dict["skills"]:
                 # Get or create skill
-                skill = db.query(Skill).filter(Skill.name == skill_name).first()
+                skill = (await db.execute(select(Skill).where(Skill.name == skill_name))).scalars().first()
                 if not skill:
                     skill = Skill(name=skill_name)
                     db.add(skill)
-                    db.flush()  # Flush to get the ID
-                current_user.skills.append(skill)
+                    await db.flush()  # Flush to get the ID
+                    skills_created = True
+                db_user.skills.append(skill)
         
         del user_dict["skills"]
     
     # Update other user fields
     for key, value in user_dict.items():
-        setattr(current_user, key, value)
+        setattr(db_user, key, value)
     
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    await db.commit()
+    token_cache.invalidate_user(db_user.id)
+    if skills_created:
+        await response_cache.invalidate("skills")
+    
+    from app.api.endpoints.ml import update_skill_index
+    await update_skill_index(db_user)
+    return db_user
+
+
+# User columns listed by GET /users; never the password hash
+USER_LIST_COLUMNS = (
+    User.id, User.email, User.full_name, User.role, User.department, User.position,
+    User.is_active, User.availability_percentage, User.average_performance
+)
 
 
 @router.get("/users")
 async def get_users(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = page_size(),
+    role: Optional[str] = None,
+    department: Optional[str] = None,
+    skill_id: Optional[int] = None
 ):
+    """
+    List users in id order, optionally filtered; all of them unless `limit` is given.
+    Pass the X-Next-Cursor response header back as `cursor` for the next page.
+    """
     if current_user.role != "project_manager":
         raise HTTPException(status_code=403, detail="Not authorized")
-    users = db.query(User).all()
-    return users
+    
+    statement = select(*USER_LIST_COLUMNS)
+    if role:
+        statement = statement.where(User.role == role)
+    if department:
+        statement = statement.where(User.department == department)
+    if skill_id is not None:
+        statement = statement.where(
+            select(user_skills.c.user_id).where(
+                user_skills.c.user_id == User.id,
+                user_skills.c.skill_id == skill_id
+            ).exists()
+        )
+    rows = finish_page(
+        (await db.execute(keyset_page(statement, User.id, cursor, limit))).all(), limit, response
+    )
+    
+    # Skills for the whole page in one query
+    users = {row.id: {**row._asdict(), "skills": []} for row in rows}
+    if users:
+        from app.models.skill import Skill
+        skills = await db.execute(
+            select(user_skills.c.user_id, Skill.id, Skill.name)
+            .join(Skill, Skill.id == user_skills.c.skill_id)
+            .where(user_skills.c.user_id.in_(users))
+        )
+        for skill in skills:
+            users[skill.user_id]["skills"].append({"id": skill.id, "name": skill.name})
+    return list(users.values())
 
 
 @router.get("/users/{user_id}")
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role != "project_manager":
         raise HTTPException(status_code=403, detail="Not authorized")
     
     # Fetch user with skills relationship loaded
-    from sqlalchemy.orm import joinedload
-    user = db.query(User).options(joinedload(User.skills)).filter(User.id == user_id).first()
+    user = (await db.execute(
+        select(User).options(selectinload(User.skills)).where(User.id == user_id)
+    )).scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -263,23 +369,27 @@ async def get_user(
 async def update_user(
     user_id: int,
     user: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role != "project_manager":
         raise HTTPException(status_code=403, detail="Not authorized")
-    db_user = db.query(User).filter(User.id == user_id).first()
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
 
     user_data = user.dict(exclude_unset=True)
     
-    # Handle password update
+    # Handle password update (hashed before the transaction starts, so no connection waits on bcrypt)
     if "password" in user_data:
-        user_data["hashed_password"] = get_password_hash(user_data["password"])
+        user_data["hashed_password"] = await get_password_hash_async(user_data["password"])
         del user_data["password"]
+
+    db_user = (await db.execute(
+        select(User).options(selectinload(User.skills)).where(User.id == user_id)
+    )).scalars().first()
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
         
     # Handle skills update
+    skills_created = False
     if "skills" in user_data:
         # Clear current skills
         db_user.skills = []
@@ -289,35 +399,59 @@ async def update_user(
             from app.models.skill import Skill
             for skill_name in user_data["skills"]:
                 # Get or create skill
-                skill = db.query(Skill).filter(Skill.name == skill_name).first()
+                skill = (await db.execute(select(Skill).where(Skill.name == skill_name))).scalars().first()
                 if not skill:
                     skill = Skill(name=skill_name)
                     db.add(skill)
-                    db.flush()  # Flush to get the ID
+                    await db.flush()  # Flush to get the ID
+                    skills_created = True
                 db_user.skills.append(skill)
                 
         del user_data["skills"]
         
+    # Availability goes through the ledger, which owns users.availability_percentage
+    availability = user_data.pop("availability_percentage", None)
+
     # Update user fields
     for key, value in user_data.items():
         setattr(db_user, key, value)
 
-    db.commit()
-    db.refresh(db_user)
+    if availability is not None:
+        await db.run_sync(set_availability, db_user.id, availability)
+    await db.commit()
+    if availability is not None:
+        await db.refresh(db_user, attribute_names=["availability_percentage"])
+    token_cache.invalidate_user(db_user.id)
+    if skills_created:
+        await response_cache.invalidate("skills")
+    
+    from app.api.endpoints.ml import update_skill_index
+    await update_skill_index(db_user)
     return db_user
 
 
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role != "project_manager":
         raise HTTPException(status_code=403, detail="Not authorized")
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    db.delete(user)
-    db.commit()
+    # Deleting the user clears the employee on their allocations, which cached project bodies show
+    project_ids = (await db.execute(
+        select(ResourceAllocation.project_id).where(ResourceAllocation.employee_id == user_id).distinct()
+    )).scalars().all()
+    # Their availability ledger and reservation rows are removed in the same
+    # flush (see app.models.availability)
+    await db.delete(user)
+    await db.commit()
+    token_cache.invalidate_user(user_id)
+    await response_cache.invalidate("projects", *(f"project:{project_id}" for project_id in project_ids))
+    
+    from app.api.endpoints.ml import remove_from_skill_index
+    remove_from_skill_index(user_id)
     return {"message": "User deleted successfully"}
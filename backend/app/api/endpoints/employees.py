@@ -1,17 +1,30 @@
 from app.api.endpoints.auth import get_current_user, require_role
 from app.models import User, ResourceAllocation, Skill
-from sqlalchemy.orm import Session
-from app.db.session import get_db
-from fastapi import APIRouter, Depends, HTTPException, status
+from app.models.availability import set_availability
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.db.session import get_async_db
+from app.api.pagination import keyset_page, finish_page, page_size
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from app.api.endpoints.auth import require_role
 
 router = APIRouter()
 
+# Listed as plain rows; nothing here needs ORM identity tracking
+ALLOCATION_COLUMNS = (
+    ResourceAllocation.id, ResourceAllocation.employee_id, ResourceAllocation.project_id,
+    ResourceAllocation.start_date, ResourceAllocation.end_date, ResourceAllocation.hours_allocated,
+    ResourceAllocation.allocation_percentage, ResourceAllocation.status,
+    ResourceAllocation.is_ai_recommended, ResourceAllocation.confidence_score
+)
+
 @router.put("/employees/{employee_id}/availability")
-def update_availability(
+async def update_availability(
     employee_id: int,
     availability: float,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "project_manager":
@@ -19,19 +32,20 @@ def update_availability(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only project managers can update availability.",
         )
-    employee = db.query(User).filter(User.id == employee_id).first()
+    employee = await db.get(User, employee_id)
     if not employee:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Employee not found.")
-    employee.availability_percentage = availability
-    db.commit()
-    return {"detail": "Availability updated successfully"}
+    # Stored as a reservation next to the allocation ledger, which keeps it across allocation changes
+    availability = await db.run_sync(set_availability, employee_id, availability)
+    await db.commit()
+    return {"detail": "Availability updated successfully", "availability_percentage": availability}
 
 
 @router.put("/employees/{employee_id}/performance")
-def update_performance(
+async def update_performance(
     employee_id: int,
     performance_score: float,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "project_manager":
@@ -39,19 +53,23 @@ def update_performance(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only project managers can update performance metrics.",
         )
-    employee = db.query(User).filter(User.id == employee_id).first()
+    employee = await db.get(User, employee_id)
     if not employee:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Employee not found.")
     employee.average_performance = performance_score
-    db.commit()
+    await db.commit()
     return {"detail": "Performance updated successfully"}
 
 
 @router.get("/employees/{employee_id}/allocations")
-def view_allocations(
+async def view_allocations(
     employee_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = page_size(),
+    status_filter: Optional[str] = Query(None, alias="status")
 ):
     # Ensure employees can only view their own allocations
     if current_user.role == "employee" and current_user.id != employee_id:
@@ -60,17 +78,18 @@ def view_allocations(
             detail="Employees can only view their own allocations.",
         )
     
-    allocations = db.query(ResourceAllocation).filter(
-        ResourceAllocation.employee_id == employee_id
-    ).all()
-    return allocations
+    statement = select(*ALLOCATION_COLUMNS).where(ResourceAllocation.employee_id == employee_id)
+    if status_filter:
+        statement = statement.where(ResourceAllocation.status == status_filter)
+    allocations = (await db.execute(keyset_page(statement, ResourceAllocation.id, cursor, limit))).all()
+    return [allocation._asdict() for allocation in finish_page(allocations, limit, response)]
 
 
 @router.post("/employees/{employee_id}/skills")
-def add_skills_to_employee(
+async def add_skills_to_employee(
     employee_id: int,
     skill_ids: list[int],  # List of skill IDs to add
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     # Ensure employees can only add skills to themselves
@@ -81,7 +100,9 @@ def add_skills_to_employee(
         )
     
     # Find the employee
-    employee = db.query(User).filter(User.id == employee_id).first()
+    employee = (await db.execute(
+        select(User).options(selectinload(User.skills)).where(User.id == employee_id)
+    )).scalars().first()
     if not employee:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -90,7 +111,7 @@ def add_skills_to_employee(
     
     # Add skills to the employee
     for skill_id in skill_ids:
-        skill = db.query(Skill).filter(Skill.id == skill_id).first()
+        skill = await db.get(Skill, skill_id)
         if not skill:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -99,5 +120,8 @@ def add_skills_to_employee(
         if skill not in employee.skills:
             employee.skills.append(skill)
     
-    db.commit()
+    await db.commit()
+    
+    from app.api.endpoints.ml import update_skill_index
+    await update_skill_index(employee)
     return {"detail": "Skills added successfully"}
\ No newline at end of file
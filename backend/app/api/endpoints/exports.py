@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models import Project, ResourceAllocation, Skill, User, user_skills
+from app.api.endpoints.auth import get_current_user
+
+router = APIRouter()
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _ndjson_chunk(columns, rows):
+    return "".join(json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows)
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+async def _stream_rows(statement, export_format: ExportFormat):
+    """
+    Yield the statement's rows as NDJSON or CSV text, one batch at a time.
+
+    Rows come off a server-side cursor EXPORT_BATCH_SIZE at a time and are
+    written out before the next batch is fetched, so memory stays flat no
+    matter how many rows match. The generator owns its session because it
+    outlives the request handler.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(statement.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+        if export_format == ExportFormat.csv:
+            yield _csv_chunk([columns])
+        async for rows in result.partitions():
+            if export_format == ExportFormat.csv:
+                yield _csv_chunk(rows)
+            else:
+                yield _ndjson_chunk(columns, rows)
+
+
+def _export_response(statement, name: str, export_format: ExportFormat):
+    return StreamingResponse(
+        _stream_rows(statement, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format.value}"'}
+    )
+
+
+def _require_manager(current_user):
+    if current_user.role not in ["admin", "project_manager"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to export data"
+        )
+
+
+@router.get("/allocations")
+async def export_allocations(
+    current_user: User = Depends(get_current_user),
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    status_filter: Optional[str] = Query(None, alias="status")
+):
+    """Stream allocations, in id order; since/until keep those overlapping that date range"""
+    _require_manager(current_user)
+    statement = select(*ResourceAllocation.__table__.columns).order_by(ResourceAllocation.id)
+    if since:
+        statement = statement.where(ResourceAllocation.end_date >= since)
+    if until:
+        statement = statement.where(ResourceAllocation.start_date <= until)
+    if status_filter:
+        statement = statement.where(ResourceAllocation.status == status_filter)
+    return _export_response(statement, "allocations", export_format)
+
+
+@router.get("/projects")
+async def export_projects(
+    current_user: User = Depends(get_current_user),
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+    status_filter: Optional[str] = Query(None, alias="status")
+):
+    """Stream projects in id order"""
+    _require_manager(current_user)
+    statement = select(*Project.__table__.columns).order_by(Project.id)
+    if status_filter:
+        statement = statement.where(Project.status == status_filter)
+    return _export_response(statement, "projects", export_format)
+
+
+@router.get("/user-skills")
+async def export_user_skills(
+    current_user: User = Depends(get_current_user),
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format")
+):
+    """Stream one row per (user, skill) pair with the user's and skill's names"""
+    _require_manager(current_user)
+    statement = (
+        select(
+            user_skills.c.user_id,
+            User.email,
+            User.full_name,
+            User.department,
+            user_skills.c.skill_id,
+            Skill.name.label("skill_name"),
+            user_skills.c.proficiency_level
+        )
+        .join(User, User.id == user_skills.c.user_id)
+        .join(Skill, Skill.id == user_skills.c.skill_id)
+        .order_by(user_skills.c.user_id, user_skills.c.skill_id)
+    )
+    return _export_response(statement, "user_skills", export_format)
@@ -1,75 +1,145 @@
 ﻿from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Dict, Any
 import pandas as pd
 import numpy as np
 
-from app.db.session import get_db
+from app.db.session import engine, get_db, get_async_db
+from app.core.config import settings
 from app.api.endpoints.auth import get_current_user
 from app.models import User, Project, ProjectSkillRequirement, ResourceAllocation, Skill
-from ml.pipeline import ResourceAllocationPipeline
+from app.core.jobs import JobManager
+from ml.pipeline import ResourceAllocationPipeline, train_components_from_database
+from ml.allocation_optimization.capacity import CapacityCalendar
 
 router = APIRouter()
 
-# Initialize ML pipeline
-pipeline = ResourceAllocationPipeline()
+# Initialize ML pipeline (components load lazily on first use or during startup warmup)
+pipeline = ResourceAllocationPipeline(optimizer_params={
+    "max_time_in_seconds": settings.OPTIMIZER_MAX_TIME_SECONDS,
+    "num_search_workers": settings.OPTIMIZER_NUM_WORKERS,
+    "relative_gap_limit": settings.OPTIMIZER_RELATIVE_GAP,
+    "min_match_score": settings.OPTIMIZER_MIN_MATCH_SCORE
+}, forecaster_checkpoint_dir=settings.ML_CHECKPOINT_DIR, forecaster_params={
+    "profile": settings.ML_FORECASTER_PROFILE,
+    "n_jobs": settings.ML_FORECASTER_N_JOBS
+})
+
+# Training runs in worker processes so it never blocks the event loop
+training_jobs = JobManager(max_workers=settings.ML_TRAINING_WORKERS)
+
+async def update_skill_index(user):
+    """
+    Refresh a user's entry in the skill index after their skills change.
+    The skills are encoded in the threadpool so the event loop keeps serving;
+    the index itself is only edited from the loop (build_skill_index swaps
+    in a whole new one).
+    """
+    if pipeline.skill_matcher.index is None:
+        return
+    if user.is_active and user.role == "employee":
+        skills = [skill.name for skill in user.skills]
+        embeddings = await run_in_threadpool(pipeline.skill_matcher.get_skill_embeddings, skills) if skills else None
+        pipeline.skill_matcher.index_employee(user.id, skills, embeddings)
+    else:
+        pipeline.skill_matcher.remove_employee(user.id)
+
+def remove_from_skill_index(user_id):
+    """Drop a deleted user from the skill index"""
+    pipeline.skill_matcher.remove_employee(user_id)
+
+@router.get("/status")
+async def ml_status():
+    """Readiness report showing which ML components are loaded"""
+    return pipeline.status()
 
 @router.post("/train")
-async def train_ml_models(
+def train_ml_models(
+    incremental: bool = False,
+    full_history: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Train the ML models with current data"""
+    """
+    Train the ML models with current data.
+    
+    Training runs as a background job whose worker process reads the history
+    from the database itself; this handler only checks that there is some.
+    With incremental=true only the forecaster is trained, continuing its
+    latest checkpoint with allocations added since (or from the whole history
+    with full_history=true); the worker reads the rows in chunks and saves a
+    new checkpoint version.
+    """
     if current_user.role not in ["admin", "resource_planner"]:
         raise HTTPException(status_code=403, detail="Not authorized to train ML models")
     
+    database_url = engine.url.render_as_string(hide_password=False)
+    if incremental:
+        from ml.resource_forecasting.incremental import train_incremental
+        job_id = training_jobs.submit(
+            train_incremental,
+            database_url,
+            settings.ML_CHECKPOINT_DIR,
+            settings.ML_TRAINING_CHUNK_SIZE,
+            settings.ML_CHECKPOINT_KEEP,
+            full_history,
+            pipeline.forecaster_params,
+            on_success=pipeline.install_forecaster,
+            description="Incremental forecaster training"
+        )
+        return {"status": "accepted", "message": "Incremental forecaster training started", "job_id": job_id}
+    
     try:
-        # Get historical allocations from database
-        allocations = db.query(ResourceAllocation).all()
-        
-        # Convert to pandas DataFrame
-        allocation_data = []
-        for alloc in allocations:
-            allocation_data.append({
-                "employee_id": alloc.employee_id,
-                "project_id": alloc.project_id,
-                "start_date": alloc.start_date,
-                "end_date": alloc.end_date,
-                "hours_allocated": alloc.hours_allocated,
-                "allocation_percentage": alloc.allocation_percentage,
-                "status": alloc.status
-            })
-        
-        # Get employee data
-        employees = db.query(User).all()
-        employee_data = []
-        for emp in employees:
-            employee_data.append({
-                "id": emp.id,
-                "name": emp.full_name,
-                "role": emp.role,
-                "department": emp.department,
-                "performance": emp.average_performance
-            })
-            
-        # Convert to DataFrames
-        allocations_df = pd.DataFrame(allocation_data)
-        employee_df = pd.DataFrame(employee_data)
-        
-        # Train the pipeline if there's enough data
-        if len(allocations_df) > 0:
-            pipeline.train(allocations_df, employee_df)
-            return {"status": "success", "message": "ML models trained successfully"}
+        # Train the pipeline in a worker process if there's enough data; the
+        # current models keep serving until the new ones are swapped in
+        if db.query(ResourceAllocation.id).first() is not None:
+            job_id = training_jobs.submit(
+                train_components_from_database, database_url, pipeline.forecaster_params,
+                on_success=pipeline.install,
+                description="Train ML models on the allocation history"
+            )
+            return {"status": "accepted", "message": "ML model training started", "job_id": job_id}
         else:
             return {"status": "warning", "message": "Not enough historical data for training"}
             
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@router.get("/train/jobs")
+async def list_training_jobs(current_user: User = Depends(get_current_user)):
+    """List ML training jobs"""
+    if current_user.role not in ["admin", "resource_planner"]:
+        raise HTTPException(status_code=403, detail="Not authorized to view training jobs")
+    return training_jobs.list()
+
+@router.get("/train/jobs/{job_id}")
+async def get_training_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """Get status and progress of an ML training job"""
+    if current_user.role not in ["admin", "resource_planner"]:
+        raise HTTPException(status_code=403, detail="Not authorized to view training jobs")
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job
+
+@router.post("/train/jobs/{job_id}/cancel")
+async def cancel_training_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """Cancel a queued or running ML training job"""
+    if current_user.role not in ["admin", "resource_planner"]:
+        raise HTTPException(status_code=403, detail="Not authorized to cancel training jobs")
+    if training_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    if not training_jobs.cancel(job_id):
+        raise HTTPException(status_code=400, detail="Training job has already finished")
+    return {"status": "success", "message": "Training job cancelled"}
+
 @router.post("/recommend-resources")
 async def recommend_resources(
     request_data: dict,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get AI-recommended resources for a project"""
@@ -80,28 +150,32 @@ async def recommend_resources(
     
     try:
         # Get project details
-        project = db.query(Project).filter(Project.id == project_id).first()
+        project = await db.get(Project, project_id)
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
             
         # Get skill requirements
-        skill_requirements = db.query(ProjectSkillRequirement).filter(
-            ProjectSkillRequirement.project_id == project_id
-        ).all()
+        skill_requirements = (await db.execute(
+            select(ProjectSkillRequirement).where(ProjectSkillRequirement.project_id == project_id)
+        )).scalars().all()
         
         if not skill_requirements:
             return {"status": "warning", "message": "No skill requirements found for this project", "recommendations": []}
         
         # Get the required skills for this project
         required_skill_ids = [req.skill_id for req in skill_requirements]
-        required_skills = db.query(Skill).filter(Skill.id.in_(required_skill_ids)).all()
+        required_skills = (await db.execute(
+            select(Skill).where(Skill.id.in_(required_skill_ids))
+        )).scalars().all()
         
         # Get all active employees who are not project managers and have availability
-        employees = db.query(User).filter(
-            User.is_active == True,
-            User.role == "employee",  # Filter out project managers
-            User.availability_percentage > 0  # Only include employees with availability
-        ).all()
+        employees = (await db.execute(
+            select(User).options(selectinload(User.skills)).where(
+                User.is_active == True,
+                User.role == "employee",  # Filter out project managers
+                User.availability_percentage > 0  # Only include employees with availability
+            )
+        )).scalars().all()
         
         if not employees:
             return {"status": "warning", "message": "No available employees found", "recommendations": []}
@@ -150,3 +224,149 @@ async def recommend_resources(
         import traceback
         traceback.print_exc()
         return {"status": "error", "message": str(e), "recommendations": []}
+
+@router.post("/skill-index/build")
+def build_skill_index(
+    request_data: dict,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Build the employee skill index used for candidate retrieval.
+    
+    A plain def, so FastAPI runs the queries, the encoding of every employee's
+    skills and the recall probes in its threadpool instead of on the event
+    loop. The new index replaces the old one in a single assignment.
+    """
+    if current_user.role not in ["admin", "resource_planner"]:
+        raise HTTPException(status_code=403, detail="Not authorized to build the skill index")
+    
+    backend = request_data.get("backend", "flat")
+    index_params = request_data.get("params", {})
+    k = request_data.get("k", 10)
+    
+    employees = db.query(User).options(selectinload(User.skills)).filter(
+        User.is_active == True,
+        User.role == "employee"
+    ).all()
+    employee_skills = {emp.id: [skill.name for skill in emp.skills] for emp in employees}
+    
+    try:
+        index = pipeline.skill_matcher.build_index(employee_skills, backend=backend, **index_params)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Report recall@k against the exact backend using existing project descriptions
+    descriptions = [
+        desc for (desc,) in db.query(Project.description).filter(Project.description != None).limit(50).all()
+    ]
+    recall = pipeline.skill_matcher.index_recall(descriptions, k) if descriptions else None
+    
+    return {
+        "status": "success",
+        "backend": backend,
+        "employees_indexed": len(index),
+        "recall_at_k": recall,
+        "k": k
+    }
+
+@router.post("/optimize-portfolio")
+def optimize_portfolio(
+    request_data: dict,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Staff several projects jointly in one optimization run.
+    
+    A plain def, so FastAPI runs the queries and the solve (up to
+    OPTIMIZER_MAX_TIME_SECONDS) in its threadpool instead of on the event loop.
+    
+    To re-plan after a small change, send the earlier response back as
+    previous_plan: the solve is warm-started from it, and with
+    changed_employee_ids only those employees' roles, the roles on added
+    projects and people freed from removed ones are re-planned. The plan
+    stays with the caller, so concurrent callers never see each other's.
+    """
+    # Staffing projects is a project manager's job, as for /projects/{id}/allocate-employees;
+    # the model management endpoints above are for admins and resource planners
+    if current_user.role not in ["admin", "project_manager"]:
+        raise HTTPException(status_code=403, detail="Not authorized to optimize allocations")
+    
+    project_ids = request_data.get("project_ids")
+    if not project_ids:
+        raise HTTPException(status_code=400, detail="project_ids is required")
+    allocation_percentage = float(request_data.get("allocation_percentage", 50))
+    previous_plan = request_data.get("previous_plan")
+    changed_employee_ids = request_data.get("changed_employee_ids")
+    if previous_plan is not None and not (
+        isinstance(previous_plan, dict) and isinstance(previous_plan.get("assignments"), list)
+    ):
+        raise HTTPException(status_code=400, detail="previous_plan must be an earlier response with assignments")
+    
+    projects = db.query(Project).options(selectinload(Project.skill_requirements)).filter(
+        Project.id.in_(project_ids)
+    ).all()
+    missing_ids = set(project_ids) - {project.id for project in projects}
+    if missing_ids:
+        raise HTTPException(status_code=404, detail=f"Projects not found: {sorted(missing_ids)}")
+    
+    employees = db.query(User).options(selectinload(User.skills)).filter(
+        User.is_active == True,
+        User.role == "employee"
+    ).all()
+    
+    # Remaining capacity comes from the live (non-completed) allocations, bucketed
+    # by week so projects that do not overlap in time can share people
+    live_allocations = pd.DataFrame(
+        db.query(
+            ResourceAllocation.employee_id,
+            ResourceAllocation.start_date,
+            ResourceAllocation.end_date,
+            ResourceAllocation.allocation_percentage
+        ).filter(ResourceAllocation.status != "completed").all(),
+        columns=["employee_id", "start_date", "end_date", "allocation_percentage"]
+    )
+    allocated = live_allocations.groupby("employee_id")["allocation_percentage"].sum().to_dict()
+    project_dates = [d for project in projects for d in (project.start_date, project.end_date) if d]
+    calendar = CapacityCalendar.from_allocations(
+        live_allocations,
+        employee_ids=[emp.id for emp in employees],
+        horizon_start=min(project_dates) if project_dates else None,
+        horizon_end=max(project_dates) if project_dates else None
+    )
+    
+    employee_data = [{
+        "id": emp.id,
+        "name": emp.full_name,
+        "skills": [{"id": skill.id, "name": skill.name} for skill in emp.skills],
+        "available_percentage": max(0, 100 - (allocated.get(emp.id) or 0))
+    } for emp in employees]
+    project_data = [{
+        "id": project.id,
+        "name": project.name,
+        "description": project.description,
+        "allocation_percentage": allocation_percentage,
+        "start_date": project.start_date,
+        "end_date": project.end_date,
+        "skill_requirements": [
+            {"skill_id": req.skill_id, "employees_requested": req.employees_requested}
+            for req in project.skill_requirements
+        ]
+    } for project in projects]
+    
+    try:
+        result = pipeline.process_portfolio_request(
+            project_data, employee_data, calendar=calendar,
+            previous_plan=previous_plan, changed_employee_ids=changed_employee_ids
+        )
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return {"status": "error", "message": str(e), "assignments": []}
+    
+    return {
+        "status": "success",
+        "message": "Portfolio optimized successfully",
+        **result
+    }
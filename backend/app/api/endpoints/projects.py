@@ -1,13 +1,20 @@
 ﻿from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from pydantic import BaseModel
-from app.db.session import get_db
-from app.models import Project, ProjectSkillRequirement, User, ResourceAllocation
+from app.db.session import get_async_db
+from app.api.pagination import keyset_page, finish_page, page_headers, page_size
+from app.core.response_cache import response_cache
+from app.models import Project, ProjectSkillRequirement, User, ResourceAllocation, user_skills
 from app.models.skill import Skill
+from app.models.availability import get_allocated_percentages, apply_ledger_deltas
 from app.schemas.project import ProjectCreate, ProjectResponse, ProjectUpdate
 from app.api.endpoints.auth import get_current_user, require_role
 from datetime import datetime
+import pandas as pd
+from ml.allocation_optimization.capacity import CapacityCalendar
 
 router = APIRouter()
 
@@ -17,10 +24,72 @@ class AllocationRequest(BaseModel):
 class RemoveAllocationRequest(BaseModel):
     employee_id: int
 
+# Relationships serialized by ProjectResponse; async sessions cannot lazy-load them
+PROJECT_RESPONSE_RELATIONS = ["skill_requirements", "resource_allocations"]
+
+# Project columns serialized by ProjectResponse
+PROJECT_LIST_COLUMNS = (
+    Project.id, Project.name, Project.description, Project.start_date, Project.end_date,
+    Project.priority, Project.status, Project.manager_id
+)
+
+def _with_project_relations(statement):
+    return statement.options(
+        selectinload(Project.skill_requirements),
+        selectinload(Project.resource_allocations)
+    )
+
+async def _project_payloads(db: AsyncSession, rows):
+    """
+    ProjectResponse-shaped dicts for rows of PROJECT_LIST_COLUMNS, with both
+    relations fetched for all the rows at once (one query each). Requirements
+    and allocations whose skill or employee was deleted (NULL id) are left
+    out, since ProjectResponse cannot show them.
+    """
+    projects = {
+        row.id: {**row._asdict(), "skill_requirements": [], "resource_allocations": []}
+        for row in rows
+    }
+    if projects:
+        requirements = await db.execute(
+            select(
+                ProjectSkillRequirement.project_id,
+                ProjectSkillRequirement.skill_id,
+                ProjectSkillRequirement.employees_requested
+            ).where(
+                ProjectSkillRequirement.project_id.in_(projects),
+                ProjectSkillRequirement.skill_id.isnot(None)
+            )
+        )
+        for requirement in requirements:
+            projects[requirement.project_id]["skill_requirements"].append({
+                "skill_id": requirement.skill_id,
+                "employees_requested": requirement.employees_requested
+            })
+        allocations = await db.execute(
+            select(
+                ResourceAllocation.id,
+                ResourceAllocation.employee_id,
+                ResourceAllocation.project_id,
+                ResourceAllocation.allocation_percentage,
+                ResourceAllocation.status
+            ).where(
+                ResourceAllocation.project_id.in_(projects),
+                ResourceAllocation.employee_id.isnot(None)
+            )
+        )
+        for allocation in allocations:
+            projects[allocation.project_id]["resource_allocations"].append(allocation._asdict())
+    return list(projects.values())
+
+async def _invalidate_project(project_id: int):
+    """Drop cached responses showing this project, and the project lists"""
+    await response_cache.invalidate("projects", f"project:{project_id}")
+
 @router.post("/", response_model=ProjectResponse)
 async def create_project(
     project_data: ProjectCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     # Verify user has permission to create projects
@@ -52,8 +121,7 @@ async def create_project(
     )
     
     db.add(new_project)
-    db.commit()
-    db.refresh(new_project)
+    await db.commit()
     
     # Add skill requirements
     for skill_req in project_data.skill_requirements:
@@ -64,47 +132,171 @@ async def create_project(
         )
         db.add(db_skill_req)
     
-    db.commit()
+    await db.commit()
+    await _invalidate_project(new_project.id)
+    await db.refresh(new_project, PROJECT_RESPONSE_RELATIONS)
     
     return new_project
 
 @router.get("/", response_model=list[ProjectResponse])
 async def get_projects(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
-    skip: int = 0,
-    limit: int = 100
+    cursor: Optional[str] = None,
+    limit: Optional[int] = page_size(),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    skill_id: Optional[int] = None
 ):
-    """Get all projects"""
+    """
+    Get projects in id order; all of them unless `limit` is given.
+    Pass the X-Next-Cursor response header back as `cursor` for the next page.
+    """
     if current_user.role != "project_manager":
         raise HTTPException(status_code=403, detail="Not authorized")
-    projects = db.query(Project).offset(skip).limit(limit).all()
-    return projects
+    
+    cached = await response_cache.lookup(request, ["projects"], current_user)
+    if cached.response is not None:
+        return cached.response
+    
+    statement = select(*PROJECT_LIST_COLUMNS)
+    if status_filter:
+        statement = statement.where(Project.status == status_filter)
+    if skill_id is not None:
+        statement = statement.where(
+            select(ProjectSkillRequirement.id).where(
+                ProjectSkillRequirement.project_id == Project.id,
+                ProjectSkillRequirement.skill_id == skill_id
+            ).exists()
+        )
+    rows = finish_page(
+        (await db.execute(keyset_page(statement, Project.id, cursor, limit))).all(), limit, response
+    )
+    
+    return await response_cache.store(
+        cached, await _project_payloads(db, rows), page_headers(response), response_model=list[ProjectResponse]
+    )
+
+# Static paths are declared before /{project_id} so that route does not shadow them
+@router.get("/non-allocated-projects")
+async def get_non_allocated_projects(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Fetch projects without any allocations"""
+    # Remove the current_user dependency that's causing the validation error
+    cached = await response_cache.lookup(request, ["projects"])
+    if cached.response is not None:
+        return cached.response
+
+    # Fetch projects without allocations
+    non_allocated_projects = (await db.execute(
+        select(Project.id, Project.name, Project.status).where(~Project.resource_allocations.any())
+    )).all()
+    return await response_cache.store(cached, [project._asdict() for project in non_allocated_projects])
+
+@router.get("/employee/list")
+async def get_employee_projects(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get all projects assigned to the current employee"""
+    if current_user.role not in ["employee", "project_manager"]:
+        raise HTTPException(status_code=403, detail="Not authorized to access this endpoint")
+    
+    cached = await response_cache.lookup(request, ["projects"], current_user, vary_user=True)
+    if cached.response is not None:
+        return cached.response
+    
+    # Get all resource allocations for the current employee
+    allocations = (await db.execute(
+        select(ResourceAllocation).where(ResourceAllocation.employee_id == current_user.id)
+    )).scalars().all()
+    
+    # Get project IDs from allocations
+    project_ids = [allocation.project_id for allocation in allocations]
+    
+    if not project_ids:
+        return await response_cache.store(cached, [])
+    
+    # Get projects based on these IDs
+    projects = (await db.execute(
+        select(Project).options(selectinload(Project.resource_allocations)).where(Project.id.in_(project_ids))
+    )).scalars().all()
+    
+    # Convert projects to dictionaries
+    result = []
+    for project in projects:
+        # Create a dictionary representation of the project
+        project_dict = {
+            "id": project.id,
+            "name": project.name,
+            "description": project.description,
+            "start_date": project.start_date,
+            "end_date": project.end_date,
+            "status": project.status,
+            "priority": project.priority,
+            "manager_id": project.manager_id,
+            "skill_requirements": [],
+            "resource_allocations": []
+        }
+        
+        # Add resource allocations
+        for allocation in project.resource_allocations:
+            if allocation.employee_id == current_user.id:
+                allocation_dict = {
+                    "id": allocation.id,
+                    "employee_id": allocation.employee_id,
+                    "project_id": allocation.project_id,
+                    "allocation_percentage": allocation.allocation_percentage,
+                    "status": allocation.status
+                }
+                project_dict["resource_allocations"].append(allocation_dict)
+        
+        result.append(project_dict)
+    
+    return await response_cache.store(cached, result)
 
 @router.get("/{project_id}", response_model=ProjectResponse)
 async def get_project(
     project_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    project = db.query(Project).filter(Project.id == project_id).first()
+    # Managers share one cached copy; employees' access depends on their own allocations
+    cached = await response_cache.lookup(
+        request, [f"project:{project_id}"], current_user, vary_user=current_user.role != "project_manager"
+    )
+    if cached.response is not None:
+        return cached.response
+    
+    project = (await db.execute(select(*PROJECT_LIST_COLUMNS).where(Project.id == project_id))).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Project managers can access any project
     if current_user.role == "project_manager":
-        return project
+        return await response_cache.store(
+            cached, (await _project_payloads(db, [project]))[0], response_model=ProjectResponse
+        )
     
     # Employees can only access projects they're allocated to
     if current_user.role == "employee":
         # Check if the current user is allocated to this project
-        allocation = db.query(ResourceAllocation).filter(
-            ResourceAllocation.project_id == project_id,
-            ResourceAllocation.employee_id == current_user.id
-        ).first()
+        allocation = (await db.execute(
+            select(ResourceAllocation.id).where(
+                ResourceAllocation.project_id == project_id,
+                ResourceAllocation.employee_id == current_user.id
+            )
+        )).first()
         
         if allocation:
-            return project
+            return await response_cache.store(
+                cached, (await _project_payloads(db, [project]))[0], response_model=ProjectResponse
+            )
         
     # If we get here, the user doesn't have permission
     raise HTTPException(status_code=403, detail="Not authorized to view this project")
@@ -113,10 +305,10 @@ async def get_project(
 async def update_project(
     project_id: int,
     project_data: ProjectUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     if current_user.role not in ["admin"] and project.manager_id != current_user.id:
@@ -133,48 +325,40 @@ async def update_project(
     
     # If project is being marked as completed
     if old_status != "completed" and project_data.status == "completed":
-        allocations = db.query(ResourceAllocation).filter(
-            ResourceAllocation.project_id == project_id,
-            ResourceAllocation.status != "completed"
-        ).all()
+        allocations = (await db.execute(
+            select(ResourceAllocation).where(
+                ResourceAllocation.project_id == project_id,
+                ResourceAllocation.status != "completed"
+            )
+        )).scalars().all()
         
+        # Completing an allocation restores the employee's availability through
+        # the availability ledger in the same transaction
         for allocation in allocations:
-            employee = db.query(User).filter(User.id == allocation.employee_id).first()
-            if employee:
-                # Restore availability
-                if not hasattr(employee, 'availability_percentage') or employee.availability_percentage is None:
-                    employee.availability_percentage = 0
-                
-                employee.availability_percentage += allocation.allocation_percentage
-                employee.availability_percentage = min(100, employee.availability_percentage)  # Cap at 100%
-                allocation.status = "completed"
-                db.add(employee)
+            allocation.status = "completed"
     
     # If project is being reactivated from completed status
     elif old_status == "completed" and project_data.status != "completed":
         # When reactivating, don't restore allocations automatically
         # Just update the status
-        allocations = db.query(ResourceAllocation).filter(
-            ResourceAllocation.project_id == project_id
-        ).all()
-        
         # Just log the reactivation for audit purposes
         print(f"Project {project_id} reactivated from 'completed' to '{project_data.status}'")
 
-    db.commit()
-    db.refresh(project)
+    await db.commit()
+    await _invalidate_project(project_id)
+    await db.refresh(project, PROJECT_RESPONSE_RELATIONS)
     return project
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_project(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role not in ["admin", "project_manager"]:
         raise HTTPException(status_code=403, detail="Not authorized to delete projects")
         
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
@@ -182,17 +366,18 @@ async def delete_project(
     if current_user.role == "project_manager" and project.manager_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this project")
     
-    db.delete(project)
-    db.commit()
+    await db.delete(project)
+    await db.commit()
+    await _invalidate_project(project_id)
     
     return None
 
 @router.post("/projects/{project_id}/allocate")
-def allocate_resource(
+async def allocate_resource(
     project_id: int,
     employee_id: int,
     hours_allocated: float,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     # Ensure only project managers can allocate resources
@@ -210,81 +395,72 @@ def allocate_resource(
         allocation_percentage=hours_allocated / 40.0,  # Assuming 40-hour work week
     )
     db.add(allocation)
-    db.commit()
+    await db.commit()
+    await _invalidate_project(project_id)
     return {"detail": "Resource allocated successfully"}
 
 @router.get("/projects/{project_id}/allocations")
-def view_allocations(
+async def view_allocations(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     # Fetch allocations for the given project
-    allocations = db.query(ResourceAllocation).filter(
-        ResourceAllocation.project_id == project_id
-    ).all()
+    allocations = (await db.execute(
+        select(ResourceAllocation).where(ResourceAllocation.project_id == project_id)
+    )).scalars().all()
     return allocations
 
 @router.get("/{project_id}/match-employees", response_model=dict)
 async def match_employees(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     # Verify user has permission to view project details
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     if current_user.role not in ["admin", "project_manager"]:
         raise HTTPException(status_code=403, detail="Not authorized to match employees")
     
-    # Get skill requirements for the project
-    skill_requirements = db.query(ProjectSkillRequirement).filter(
-        ProjectSkillRequirement.project_id == project_id
-    ).all()
+    skill_requirements, candidates, allocations_by_employee = await db.run_sync(_load_match_candidates, project_id)
+    allocated = await db.run_sync(
+        get_allocated_percentages, {emp.id for users in candidates.values() for emp in users}
+    )
     
     # Find matching employees for each skill requirement
     matching_employees = {}
     for skill_req in skill_requirements:
-        # Get skill name from the skill table using skill_id
-        skill = db.query(Skill).filter(Skill.id == skill_req.skill_id).first()
+        skill = skill_req.skill
         if not skill:
             continue
-            
-        skill_name = skill.name
-        
-        # Query users with this skill
-        employees = db.query(User).join(User.skills).filter(
-            Skill.id == skill_req.skill_id,
-            User.is_active == True
-        ).all()
         
         # Sort employees by performance (descending)
-        employees = sorted(employees, key=lambda e: e.average_performance if e.average_performance is not None else 0, reverse=True)
+        employees = sorted(
+            candidates.get(skill.id, []),
+            key=lambda e: e.average_performance if e.average_performance is not None else 0,
+            reverse=True
+        )
         
         # Prepare employee details
         employee_list = []
         for emp in employees:
+            emp_allocations = allocations_by_employee.get(emp.id, [])
+            
             # Check if this employee is already allocated to this project for this skill
-            is_allocated = db.query(ResourceAllocation).filter(
-                ResourceAllocation.employee_id == emp.id,
-                ResourceAllocation.project_id == project_id,
-                ResourceAllocation.status != "completed"
-            ).first() is not None
+            is_allocated = any(
+                alloc.project_id == project_id and alloc.status != "completed" for alloc in emp_allocations
+            )
             
-            current_project = None
-            for alloc in emp.allocations:
-                if alloc.status == "confirmed":
-                    current_project = db.query(Project).filter(Project.id == alloc.project_id).first()
-                    if current_project:
-                        break
-                        
-            # Calculate availability (100% - sum of all allocations)
-            availability = 100
-            for alloc in emp.allocations:
-                if alloc.status in ["confirmed", "proposed"]:
-                    availability -= alloc.allocation_percentage
+            current_project = next(
+                (alloc.project for alloc in emp_allocations if alloc.status == "confirmed" and alloc.project),
+                None
+            )
+            
+            # Availability is 100% minus the ledger's active allocation total
+            availability = 100 - allocated.get(emp.id, 0)
             
             employee_list.append({
                 "id": emp.id,
@@ -295,20 +471,58 @@ async def match_employees(
                 "allocated": is_allocated  # Add allocation status
             })
         
-        matching_employees[skill_name] = employee_list
+        matching_employees[skill.name] = employee_list
     
     return matching_employees
 
+def _load_match_candidates(db: Session, project_id: int):
+    """
+    Load everything match_employees needs in a fixed number of queries:
+    the requirements with their skills, the active users holding any of those
+    skills, and those users' allocations with the referenced projects.
+    Returns (requirements, {skill_id: [users]}, {employee_id: [allocations]}).
+    """
+    skill_requirements = db.query(ProjectSkillRequirement).options(
+        joinedload(ProjectSkillRequirement.skill)
+    ).filter(ProjectSkillRequirement.project_id == project_id).all()
+    
+    skill_ids = {req.skill_id for req in skill_requirements}
+    if not skill_ids:
+        return skill_requirements, {}, {}
+    
+    candidates = {}
+    rows = db.query(User, user_skills.c.skill_id).join(
+        user_skills, user_skills.c.user_id == User.id
+    ).filter(
+        user_skills.c.skill_id.in_(skill_ids),
+        User.is_active == True
+    ).all()
+    for user, skill_id in rows:
+        candidates.setdefault(skill_id, []).append(user)
+    
+    employee_ids = {user.id for user, _ in rows}
+    allocations_by_employee = {}
+    if employee_ids:
+        allocations = db.query(ResourceAllocation).options(
+            joinedload(ResourceAllocation.project)
+        ).filter(
+            ResourceAllocation.employee_id.in_(employee_ids)
+        ).order_by(ResourceAllocation.id).all()
+        for alloc in allocations:
+            allocations_by_employee.setdefault(alloc.employee_id, []).append(alloc)
+    
+    return skill_requirements, candidates, allocations_by_employee
+
 @router.post("/{project_id}/allocate-employees", response_model=dict)
 async def allocate_employees(
     project_id: int,
     request_data: AllocationRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Allocate employees to a project"""
     # Verify user has permission to allocate employees
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
@@ -319,24 +533,43 @@ async def allocate_employees(
     allocations = request_data.allocations
     
     try:
-        # Allocate employees
-        for allocation in allocations:
-            employee_id = allocation["employee_id"]
-            
-            # Check if employee is already allocated to this project
-            existing_allocation = db.query(ResourceAllocation).filter(
-                ResourceAllocation.employee_id == employee_id,
+        # Validate the whole batch with set-based queries, then write it in one go
+        employee_ids = [allocation["employee_id"] for allocation in allocations]
+        already_allocated = set((await db.execute(
+            select(ResourceAllocation.employee_id).where(
+                ResourceAllocation.employee_id.in_(employee_ids),
                 ResourceAllocation.project_id == project_id,
                 ResourceAllocation.status != "completed"
-            ).first()
+            ).distinct()
+        )).scalars())
+        employees = {
+            emp.id: emp for emp in (await db.execute(
+                select(User).options(selectinload(User.skills)).where(User.id.in_(employee_ids))
+            )).scalars()
+        }
+        allocated = await db.run_sync(get_allocated_percentages, employee_ids)
+        
+        # The ledger total is an upper bound on any week's load, so only
+        # employees that could be over-booked need the weekly calendar
+        over_booked = {
+            allocation["employee_id"] for allocation in allocations
+            if allocated.get(allocation["employee_id"], 0) + float(allocation["allocation_percentage"]) > 100
+        }
+        calendar = await db.run_sync(_load_capacity_calendar, over_booked, project) if over_booked else None
+        
+        new_allocations = []
+        for allocation in allocations:
+            employee_id = allocation["employee_id"]
             
-            if existing_allocation:
+            # Check if employee is already allocated to this project (or earlier in this batch)
+            if employee_id in already_allocated:
                 raise HTTPException(
                     status_code=400,
                     detail=f"Employee ID {employee_id} is already allocated to this project"
                 )
+            already_allocated.add(employee_id)
             
-            employee = db.query(User).filter(User.id == employee_id).first()
+            employee = employees.get(employee_id)
             if not employee:
                 raise HTTPException(
                     status_code=404,
@@ -353,64 +586,80 @@ async def allocate_employees(
             
             # Check if employee has sufficient availability
             allocation_percentage = float(allocation["allocation_percentage"])
-            current_allocations = db.query(ResourceAllocation).filter(
-                ResourceAllocation.employee_id == employee.id,
-                ResourceAllocation.status != "completed"
-            ).all()
-            
-            total_allocation = sum(alloc.allocation_percentage for alloc in current_allocations)
-            if total_allocation + allocation_percentage > 100:
+            if employee_id in over_booked and allocation_percentage > calendar.min_remaining(
+                employee_id, project.start_date, project.end_date
+            ):
                 raise HTTPException(
                     status_code=400,
                     detail=f"Employee {employee.full_name} does not have sufficient availability"
                 )
             
             # Create resource allocation with specific fields required
-            new_allocation = ResourceAllocation(
-                employee_id=employee.id,
-                project_id=project_id,
-                allocation_percentage=allocation_percentage,
-                status="confirmed",
-                start_date=project.start_date,
-                end_date=project.end_date,
-                hours_allocated=allocation_percentage * 0.4,  # 40 hours * allocation percentage
-                is_ai_recommended=False
-            )
-            
-            # Update employee availability
-            if not hasattr(employee, 'availability_percentage') or employee.availability_percentage is None:
-                employee.availability_percentage = 100
-                
-            employee.availability_percentage -= allocation_percentage
-            
-            # Ensure it doesn't go below 0
-            employee.availability_percentage = max(0, employee.availability_percentage)
-            
-            db.add(new_allocation)
-            db.add(employee)
+            new_allocations.append({
+                "employee_id": employee_id,
+                "project_id": project_id,
+                "allocation_percentage": allocation_percentage,
+                "status": "confirmed",
+                "start_date": project.start_date,
+                "end_date": project.end_date,
+                "hours_allocated": allocation_percentage * 0.4,  # 40 hours * allocation percentage
+                "is_ai_recommended": False
+            })
+        
+        # One multi-row INSERT; Core inserts bypass the ORM events, so the
+        # availability ledger is updated explicitly in the same transaction
+        if new_allocations:
+            await db.execute(insert(ResourceAllocation.__table__), new_allocations)
+            deltas = {}
+            for row in new_allocations:
+                percentage, count = deltas.get(row["employee_id"], (0, 0))
+                deltas[row["employee_id"]] = (percentage + row["allocation_percentage"], count + 1)
+            await db.run_sync(apply_ledger_deltas, deltas)
         
         # Update project as having allocations if it wasn't already active
         if project.status == "planning":
             project.status = "active"
             db.add(project)
         
-        db.commit()
+        await db.commit()
+        await _invalidate_project(project_id)
         return {"detail": "Employees allocated successfully"}
     
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
+def _load_capacity_calendar(db: Session, employee_ids, project: Project):
+    """Weekly capacity calendar over the project's dates for the given employees' active allocations"""
+    current_allocations = db.query(
+        ResourceAllocation.employee_id,
+        ResourceAllocation.start_date,
+        ResourceAllocation.end_date,
+        ResourceAllocation.allocation_percentage
+    ).filter(
+        ResourceAllocation.employee_id.in_(employee_ids),
+        ResourceAllocation.status != "completed"
+    ).all()
+    return CapacityCalendar.from_allocations(
+        pd.DataFrame(current_allocations, columns=["employee_id", "start_date", "end_date", "allocation_percentage"]),
+        employee_ids=list(employee_ids),
+        horizon_start=project.start_date,
+        horizon_end=project.end_date
+    )
+
 @router.post("/{project_id}/remove-allocation", response_model=dict)
 async def remove_allocation(
     project_id: int,
     request_data: RemoveAllocationRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Remove an employee allocation from a project"""
     # Verify user has permission
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
@@ -421,11 +670,13 @@ async def remove_allocation(
     
     try:
         # Find the allocation to remove
-        allocation = db.query(ResourceAllocation).filter(
-            ResourceAllocation.project_id == project_id,
-            ResourceAllocation.employee_id == employee_id,
-            ResourceAllocation.status != "completed"
-        ).first()
+        allocation = (await db.execute(
+            select(ResourceAllocation).where(
+                ResourceAllocation.project_id == project_id,
+                ResourceAllocation.employee_id == employee_id,
+                ResourceAllocation.status != "completed"
+            )
+        )).scalars().first()
         
         if not allocation:
             raise HTTPException(
@@ -433,62 +684,39 @@ async def remove_allocation(
                 detail=f"No active allocation found for employee ID {employee_id} on this project"
             )
         
-        # Get the employee to update availability
-        employee = db.query(User).filter(User.id == employee_id).first()
+        employee = await db.get(User, employee_id)
         if not employee:
             raise HTTPException(status_code=404, detail=f"Employee with ID {employee_id} not found")
         
-        # Update employee availability (restore the allocated percentage)
-        if not hasattr(employee, 'availability_percentage') or employee.availability_percentage is None:
-            employee.availability_percentage = allocation.allocation_percentage
-        else:
-            employee.availability_percentage += allocation.allocation_percentage
-        
-        # Cap availability at 100%
-        employee.availability_percentage = min(100, employee.availability_percentage)
-        
-        # Delete the allocation
-        db.delete(allocation)
-        db.add(employee)
-        db.commit()
+        # Delete the allocation (the availability ledger restores the percentage)
+        await db.delete(allocation)
+        await db.commit()
+        await _invalidate_project(project_id)
         
         return {"detail": "Allocation successfully removed"}
     
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/non-allocated-projects")
-async def get_non_allocated_projects(
-    db: Session = Depends(get_db)
-):
-    """Fetch projects without any allocations"""
-    # Remove the current_user dependency that's causing the validation error
-
-    # Fetch projects without allocations
-    non_allocated_projects = db.query(Project).filter(~Project.resource_allocations.any()).all()
-    return [{"id": proj.id, "name": proj.name, "status": proj.status} for proj in non_allocated_projects]
-
 @router.get("/employee/{project_id}")
 async def read_employee_project(
     project_id: int, 
     current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get project details for an employee who is assigned to the project
     """
     # First check if the user is assigned to this project
-    resource_allocation = (
-        db.query(ResourceAllocation)
-        .filter(
+    resource_allocation = (await db.execute(
+        select(ResourceAllocation).where(
             ResourceAllocation.project_id == project_id,
             ResourceAllocation.employee_id == current_user.id
         )
-        .first()
-    )
+    )).scalars().first()
     
     if not resource_allocation and current_user.role != "project_manager":
         raise HTTPException(
@@ -496,93 +724,23 @@ async def read_employee_project(
             detail="You don't have permission to view this project"
         )
     
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = (await db.execute(
+        select(*Project.__table__.columns).where(Project.id == project_id)
+    )).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    
-    # Include allocations in the response
-    project_dict = project.__dict__.copy()
-    if "_sa_instance_state" in project_dict:
-        del project_dict["_sa_instance_state"]
+    project_dict = project._asdict()
     
     # Add resource allocations
-    allocations = (
-        db.query(ResourceAllocation)
-        .filter(ResourceAllocation.project_id == project_id)
-        .all()
+    allocations = await db.execute(
+        select(*ResourceAllocation.__table__.columns).where(ResourceAllocation.project_id == project_id)
     )
-    project_dict["resource_allocations"] = [allocation.__dict__ for allocation in allocations]
-    for allocation_dict in project_dict["resource_allocations"]:
-        if "_sa_instance_state" in allocation_dict:
-            del allocation_dict["_sa_instance_state"]
+    project_dict["resource_allocations"] = [allocation._asdict() for allocation in allocations]
     
     # Add skill requirements
-    requirements = (
-        db.query(ProjectSkillRequirement)
-        .filter(ProjectSkillRequirement.project_id == project_id)
-        .all()
+    requirements = await db.execute(
+        select(*ProjectSkillRequirement.__table__.columns).where(ProjectSkillRequirement.project_id == project_id)
     )
-    project_dict["skill_requirements"] = []
-    for req in requirements:
-        req_dict = req.__dict__.copy()
-        if "_sa_instance_state" in req_dict:
-            del req_dict["_sa_instance_state"]
-        project_dict["skill_requirements"].append(req_dict)
+    project_dict["skill_requirements"] = [requirement._asdict() for requirement in requirements]
     
     return project_dict
-
-@router.get("/employee/list")
-async def get_employee_projects(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Get all projects assigned to the current employee"""
-    if current_user.role not in ["employee", "project_manager"]:
-        raise HTTPException(status_code=403, detail="Not authorized to access this endpoint")
-    
-    # Get all resource allocations for the current employee
-    allocations = db.query(ResourceAllocation).filter(
-        ResourceAllocation.employee_id == current_user.id
-    ).all()
-    
-    # Get project IDs from allocations
-    project_ids = [allocation.project_id for allocation in allocations]
-    
-    if not project_ids:
-        return []
-    
-    # Get projects based on these IDs
-    projects = db.query(Project).filter(Project.id.in_(project_ids)).all()
-    
-    # Convert projects to dictionaries
-    result = []
-    for project in projects:
-        # Create a dictionary representation of the project
-        project_dict = {
-            "id": project.id,
-            "name": project.name,
-            "description": project.description,
-            "start_date": project.start_date,
-            "end_date": project.end_date,
-            "status": project.status,
-            "priority": project.priority,
-            "manager_id": project.manager_id,
-            "skill_requirements": [],
-            "resource_allocations": []
-        }
-        
-        # Add resource allocations
-        for allocation in project.resource_allocations:
-            if allocation.employee_id == current_user.id:
-                allocation_dict = {
-                    "id": allocation.id,
-                    "employee_id": allocation.employee_id,
-                    "project_id": allocation.project_id,
-                    "allocation_percentage": allocation.allocation_percentage,
-                    "status": allocation.status
-                }
-                project_dict["resource_allocations"].append(allocation_dict)
-        
-        result.append(project_dict)
-    
-    return result
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
 
-from app.db.session import get_db
+from app.db.session import get_async_db
+from app.api.pagination import keyset_page, finish_page, page_headers, page_size
+from app.core.response_cache import response_cache
+from app.models.project import ProjectSkillRequirement
 from app.models.skill import Skill
 from app.models.user import User
 from app.schemas.skill import SkillBase, SkillCreate
@@ -12,19 +17,30 @@ router = APIRouter()
 
 @router.get("", response_model=list[SkillBase])
 async def get_skills(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),  # Only require authentication, not specific role
-    skip: int = 0,
-    limit: int = 100
+    cursor: Optional[str] = None,
+    limit: Optional[int] = page_size(),
+    category: Optional[str] = None
 ):
-    """Get all skills (accessible to all authenticated users)"""
-    skills = db.query(Skill).offset(skip).limit(limit).all()
-    return skills
+    """Get skills, paged when `limit` is given (accessible to all authenticated users); see X-Next-Cursor"""
+    cached = await response_cache.lookup(request, ["skills"], current_user)
+    if cached.response is not None:
+        return cached.response
+    
+    statement = select(Skill.id, Skill.name)
+    if category:
+        statement = statement.where(Skill.category == category)
+    skills = (await db.execute(keyset_page(statement, Skill.id, cursor, limit))).all()
+    skills = [skill._asdict() for skill in finish_page(skills, limit, response)]
+    return await response_cache.store(cached, skills, page_headers(response), response_model=list[SkillBase])
 
 @router.post("/", response_model=SkillBase, status_code=status.HTTP_201_CREATED)
 async def create_skill(
     skill: SkillCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new skill"""
@@ -36,7 +52,7 @@ async def create_skill(
         )
     
     # Check if skill already exists
-    existing_skill = db.query(Skill).filter(Skill.name == skill.name).first()
+    existing_skill = (await db.execute(select(Skill).where(Skill.name == skill.name))).scalars().first()
     if existing_skill:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -46,26 +62,30 @@ async def create_skill(
     # Create new skill
     new_skill = Skill(name=skill.name)
     db.add(new_skill)
-    db.commit()
-    db.refresh(new_skill)
+    await db.commit()
+    await response_cache.invalidate("skills")
     
     return new_skill
 
 @router.get("/{skill_id}", response_model=SkillBase)
-async def get_skill(skill_id: int, db: Session = Depends(get_db)):
+async def get_skill(skill_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Get a skill by ID"""
-    skill = db.query(Skill).filter(Skill.id == skill_id).first()
+    cached = await response_cache.lookup(request, ["skills"])
+    if cached.response is not None:
+        return cached.response
+    
+    skill = (await db.execute(select(Skill.id, Skill.name).where(Skill.id == skill_id))).first()
     if not skill:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Skill not found"
         )
-    return skill
+    return await response_cache.store(cached, skill._asdict(), response_model=SkillBase)
 
 @router.delete("/{skill_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_skill(
     skill_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Delete a skill by ID"""
@@ -77,15 +97,30 @@ async def delete_skill(
         )
     
     # Get skill
-    skill = db.query(Skill).filter(Skill.id == skill_id).first()
+    skill = (await db.execute(
+        select(Skill).options(selectinload(Skill.users)).where(Skill.id == skill_id)
+    )).scalars().first()
     if not skill:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Skill not found"
         )
     
+    # Remember who had this skill so their index entries can be refreshed
+    affected_users = list(skill.users)
+    # Deleting the skill clears it on project requirements, which cached project bodies show
+    project_ids = (await db.execute(
+        select(ProjectSkillRequirement.project_id).where(ProjectSkillRequirement.skill_id == skill_id).distinct()
+    )).scalars().all()
+    
     # Delete skill
-    db.delete(skill)
-    db.commit()
+    await db.delete(skill)
+    await db.commit()
+    await response_cache.invalidate("skills", "projects", *(f"project:{project_id}" for project_id in project_ids))
+    
+    from app.api.endpoints.ml import update_skill_index
+    for user in affected_users:
+        await db.refresh(user, ["skills"])
+        await update_skill_index(user)
     
     return None
\ No newline at end of file
@@ -0,0 +1,69 @@
+import base64
+import json
+from typing import Optional
+from fastapi import HTTPException, Query, Response, status
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Response header carrying the cursor of the next page; absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def page_size(default: Optional[int] = None):
+    """
+    Query parameter for the page size, bounded so one paged request cannot pull
+    a whole table. Without a limit the endpoint returns every row after the
+    cursor, as these lists did before paging; clients that follow the
+    next-page header pass one (DEFAULT_PAGE_SIZE is a sensible choice).
+    """
+    return Query(default, ge=1, le=MAX_PAGE_SIZE)
+
+
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({"after": last_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Id the page starts after; 400 for anything that did not come from encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["after"]
+        if isinstance(last_id, int) and not isinstance(last_id, bool):
+            return last_id
+    except (ValueError, TypeError, KeyError, UnicodeEncodeError):
+        pass
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset_page(statement, id_column, cursor=None, limit: Optional[int] = DEFAULT_PAGE_SIZE):
+    """
+    Restrict a select to the page after the cursor, ordered by id_column.
+
+    Seeks straight to the cursor through the id (or filter + id) index, so
+    every page costs the same, unlike OFFSET which reads and discards all
+    earlier rows. One extra row is fetched to tell whether a next page exists.
+    A limit of None leaves the rows after the cursor unbounded.
+    """
+    if cursor:
+        statement = statement.where(id_column > decode_cursor(cursor))
+    statement = statement.order_by(id_column)
+    return statement if limit is None else statement.limit(limit + 1)
+
+
+def finish_page(rows, limit: Optional[int], response: Response, id_key: str = "id"):
+    """Drop the look-ahead row and, if there was one, set the next-page cursor header"""
+    rows = list(rows)
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(rows[-1], id_key))
+    return rows
+
+
+def page_headers(response: Response):
+    """The pagination headers finish_page set, for handlers that build their own response"""
+    return {
+        name: value for name, value in response.headers.items()
+        if name.lower() == NEXT_CURSOR_HEADER.lower()
+    }
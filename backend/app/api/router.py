@@ -1,5 +1,5 @@
 ﻿from fastapi import APIRouter
-from app.api.endpoints import auth, projects, ml, skills  # Import skills router
+from app.api.endpoints import auth, projects, ml, skills, exports, employees  # Import skills router
 
 api_router = APIRouter()
 
@@ -7,4 +7,7 @@ api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(projects.router, prefix="/projects", tags=["projects"])
 api_router.include_router(ml.router, prefix="/ml", tags=["machine-learning"])
 api_router.include_router(skills.router, prefix="/skills", tags=["skills"])  # Add skills router
+api_router.include_router(exports.router, prefix="/exports", tags=["exports"])
+# Employee routes carry their own /employees/{employee_id} prefix
+api_router.include_router(employees.router, tags=["employees"])
 
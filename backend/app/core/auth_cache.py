@@ -0,0 +1,118 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class UserPrincipal:
+    """
+    Detached snapshot of the user columns request handlers check for
+    authorization. It carries no session, so it is safe to share between
+    requests; handlers that modify the user load the row themselves.
+    """
+
+    __slots__ = ("id", "email", "role", "is_active")
+
+    def __init__(self, id, email, role, is_active):
+        self.id = id
+        self.email = email
+        self.role = role
+        self.is_active = is_active
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.email, user.role, user.is_active)
+
+
+class TokenCache:
+    """
+    Bounded TTL cache from bearer token to UserPrincipal.
+
+    Keys are SHA-256 hashes of the token so raw tokens are not kept in
+    memory. Entries expire after ttl_seconds or when the token itself
+    expires, whichever is first; the least recently used entry is dropped
+    once max_entries is reached. The cache is per process, so changes made
+    through another worker become visible after at most ttl_seconds.
+    """
+
+    def __init__(self, ttl_seconds=60, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (principal, expires_at)
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token):
+        """Cached principal for the token, or None"""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def put(self, token, principal, token_expires_at=None):
+        """Cache a principal; token_expires_at is the JWT exp as a Unix timestamp"""
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        ttl = self.ttl_seconds
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        if ttl <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            while len(self._entries) >= self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (principal, time.monotonic() + ttl)
+            self._keys_by_user.setdefault(principal.id, set()).add(key)
+
+    def invalidate_user(self, user_id):
+        """Forget every cached token of a user (after an update or delete)"""
+        with self._lock:
+            for key in self._keys_by_user.pop(user_id, ()):
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _drop(self, key):
+        principal, _ = self._entries.pop(key)
+        keys = self._keys_by_user.get(principal.id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[principal.id]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
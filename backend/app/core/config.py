@@ -13,9 +13,64 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
     ALGORITHM: str = "HS256"
     DATABASE_URI: str = os.getenv(
-        "DATABASE_URL", "sqlite:///./sql_app.db"
+        "DATABASE_URL", "sqlite:///./resource_planning.db"
     )
 
+    # Connection pool (server databases and SQLite files)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+    # SQLite pragmas applied to every new connection
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+    # Verified-token cache for get_current_user (0 disables it)
+    AUTH_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+    AUTH_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+    # Password hashing: bcrypt cost factor, worker threads, and whether logins upgrade old hashes
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_REHASH_ON_LOGIN: bool = os.getenv("PASSWORD_REHASH_ON_LOGIN", "true").lower() == "true"
+
+    # Response cache for read-heavy endpoints (TTL 0 disables it); a redis:// URL shares it between workers
+    RESPONSE_CACHE_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+    RESPONSE_CACHE_URL: str = os.getenv("RESPONSE_CACHE_URL", "")
+
+    # Rows fetched per server-side cursor batch by the streaming exports
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+    # Load ML models in the background at startup instead of on first request
+    ML_WARMUP: bool = os.getenv("ML_WARMUP", "true").lower() == "true"
+
+    # CP-SAT limits for allocation optimization so a large request cannot hang a worker
+    OPTIMIZER_MAX_TIME_SECONDS: float = float(os.getenv("OPTIMIZER_MAX_TIME_SECONDS", "10"))
+    OPTIMIZER_NUM_WORKERS: int = int(os.getenv("OPTIMIZER_NUM_WORKERS", "4"))
+    OPTIMIZER_RELATIVE_GAP: float = float(os.getenv("OPTIMIZER_RELATIVE_GAP", "0.0"))
+    # Skill-match score an (employee, project) pair needs to get a decision variable;
+    # 0 keeps every scored pair and drops only unscored or negatively scored ones
+    OPTIMIZER_MIN_MATCH_SCORE: float = float(os.getenv("OPTIMIZER_MIN_MATCH_SCORE", "0.0"))
+
+    # Worker processes for background ML training jobs
+    ML_TRAINING_WORKERS: int = int(os.getenv("ML_TRAINING_WORKERS", "1"))
+
+    # Forecaster training profile (fast, balanced, exhaustive, hist_gradient_boosting)
+    # and the cores one training job or prediction may use (-1 for all); each of the
+    # ML_TRAINING_WORKERS jobs gets this many, so keep it bounded next to the API
+    ML_FORECASTER_PROFILE: str = os.getenv("ML_FORECASTER_PROFILE", "balanced")
+    ML_FORECASTER_N_JOBS: int = int(os.getenv("ML_FORECASTER_N_JOBS", str(min(2, os.cpu_count() or 1))))
+
+    # Incremental forecaster training: versioned checkpoints and rows read per chunk
+    ML_CHECKPOINT_DIR: str = os.getenv("ML_CHECKPOINT_DIR", "./model_checkpoints")
+    ML_CHECKPOINT_KEEP: int = int(os.getenv("ML_CHECKPOINT_KEEP", "5"))
+    ML_TRAINING_CHUNK_SIZE: int = int(os.getenv("ML_TRAINING_CHUNK_SIZE", "50000"))
+
     # CORS middleware settings
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173"]
 
@@ -0,0 +1,117 @@
+import multiprocessing
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from datetime import datetime
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled"""
+
+
+def _run_job(job_id, store, fn, args):
+    """Worker-process entry point: run fn(*args, progress=...) and report into the shared store"""
+    def progress(fraction, message=None):
+        if store.get(f"{job_id}:cancel"):
+            raise JobCancelled()
+        store[job_id] = {"status": "running", "progress": float(fraction), "message": message}
+
+    progress(0.0, "Started")
+    return fn(*args, progress=progress)
+
+
+class JobManager:
+    """
+    In-process manager for long-running ML jobs executed in a process pool.
+
+    Each job gets an id, a status (queued, running, succeeded, failed,
+    cancelled) and a progress fraction reported by the worker. Queued jobs are
+    cancelled outright; running jobs stop at their next progress report and
+    their result is discarded either way. on_success runs in the API process
+    with the job result, e.g. to swap a trained model into service.
+    """
+
+    def __init__(self, max_workers=1):
+        self.max_workers = max_workers
+        self._executor = None
+        self._manager = None
+        self._store = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._executor is None:
+            # Spawned workers start clean instead of forking the API's threads
+            context = multiprocessing.get_context("spawn")
+            self._manager = context.Manager()
+            self._store = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def submit(self, fn, *args, on_success=None, description=None):
+        """Queue fn(*args, progress=callback) and return the job id"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._ensure_started()
+            self._jobs[job_id] = {
+                "id": job_id,
+                "description": description,
+                "status": "queued",
+                "progress": 0.0,
+                "message": None,
+                "error": None,
+                "created_at": datetime.utcnow().isoformat(),
+                "finished_at": None,
+            }
+            future = self._executor.submit(_run_job, job_id, self._store, fn, args)
+            self._jobs[job_id]["future"] = future
+        future.add_done_callback(lambda f: self._finish(job_id, f, on_success))
+        return job_id
+
+    def _finish(self, job_id, future, on_success):
+        job = self._jobs[job_id]
+        cancelled = job["status"] == "cancelled" or self._store.get(f"{job_id}:cancel")
+        try:
+            result = future.result()
+            if cancelled:
+                # Finished anyway, but the caller asked us to throw the result away
+                job["status"] = "cancelled"
+            else:
+                if on_success is not None:
+                    on_success(result)
+                job.update(status="succeeded", progress=1.0, message="Finished")
+        except (CancelledError, JobCancelled):
+            job["status"] = "cancelled"
+        except Exception as e:
+            job.update(status="cancelled" if cancelled else "failed", error=str(e))
+        job["finished_at"] = datetime.utcnow().isoformat()
+
+    def get(self, job_id):
+        """Public view of a job, or None if unknown"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        view = {key: value for key, value in job.items() if key != "future"}
+        if view["status"] in ("queued", "running"):
+            reported = self._store.get(job_id)
+            if reported:
+                view.update(reported)
+        return view
+
+    def list(self):
+        return [self.get(job_id) for job_id in list(self._jobs)]
+
+    def cancel(self, job_id):
+        """Request cancellation; returns False if the job is unknown or already finished"""
+        job = self._jobs.get(job_id)
+        if job is None or job["finished_at"] is not None:
+            return False
+        self._store[f"{job_id}:cancel"] = True
+        job["status"] = "cancelled"
+        job["future"].cancel()
+        return True
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
+            self._executor = None
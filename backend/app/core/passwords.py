@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PasswordExecutor:
+    """
+    Dedicated thread pool for bcrypt hashing and verification.
+
+    bcrypt releases the GIL while it works, so running it here keeps the
+    event loop free to serve other requests; max_workers bounds how many
+    hashes run at once, and the rest wait in the executor queue.
+    """
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.peak_queued = 0
+        self.completed = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _call(self, submitted_at, fn, args):
+        started = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            wait = started - submitted_at
+            self.total_wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.total_run_seconds += time.perf_counter() - started
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool and await its result"""
+        with self._lock:
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, time.perf_counter(), fn, args)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "peak_queued": self.peak_queued,
+                "completed": self.completed,
+                "avg_wait_ms": round(1000 * self.total_wait_seconds / self.completed, 3) if self.completed else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait_seconds, 3),
+                "avg_run_ms": round(1000 * self.total_run_seconds / self.completed, 3) if self.completed else 0.0,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from app.core.config import settings
+
+try:  # pydantic 2
+    from pydantic import TypeAdapter
+
+    @lru_cache(maxsize=None)
+    def _adapter(response_model):
+        return TypeAdapter(response_model)
+
+    def validate_response(response_model, payload):
+        """Validate payload against response_model, as FastAPI does before serializing"""
+        return _adapter(response_model).validate_python(payload, from_attributes=True)
+except ImportError:  # pydantic 1
+    from pydantic import parse_obj_as
+
+    def validate_response(response_model, payload):
+        """Validate payload against response_model, as FastAPI does before serializing"""
+        return parse_obj_as(response_model, payload)
+
+# Browsers may keep the response but must revalidate it (If-None-Match) before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU store with per-entry TTL.
+
+    The default backend, and the local stand-in for a shared one: anything
+    with the same async get/set/versions/bump methods can replace it.
+    Tag versions are kept apart from the entries so eviction never resets one.
+    """
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    async def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    async def set(self, key, value, ttl_seconds):
+        with self._lock:
+            self._entries.pop(key, None)
+            while self._entries and len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._entries[key] = (value, time.monotonic() + ttl_seconds)
+
+    async def versions(self, tags):
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    async def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "evictions": self.evictions}
+
+
+class RedisCacheBackend:
+    """Shared backend, so an invalidation in one worker reaches all of them (needs the redis package)"""
+
+    def __init__(self, url, prefix="response-cache:"):
+        import redis.asyncio as redis
+        self._client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key):
+        return await self._client.get(self.prefix + key)
+
+    async def set(self, key, value, ttl_seconds):
+        await self._client.set(self.prefix + key, value, px=max(1, int(ttl_seconds * 1000)))
+
+    async def versions(self, tags):
+        values = await self._client.mget([f"{self.prefix}tag:{tag}" for tag in tags])
+        return [int(value or 0) for value in values]
+
+    async def bump(self, tags):
+        async with self._client.pipeline(transaction=False) as pipeline:
+            for tag in tags:
+                pipeline.incr(f"{self.prefix}tag:{tag}")
+            await pipeline.execute()
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+class CacheLookup:
+    """Result of ResponseCache.lookup: a ready response on a hit, else the key to store under"""
+
+    __slots__ = ("key", "response", "if_none_match")
+
+    def __init__(self, key, response=None, if_none_match=None):
+        self.key = key
+        self.response = response
+        self.if_none_match = if_none_match
+
+
+class ResponseCache:
+    """
+    Cache of serialized JSON responses with ETag revalidation.
+
+    Entries are keyed by method, path, query parameters and the caller's
+    role (plus user id for per-user views), and by the current version of
+    each tag the response depends on. Mutations bump those versions through
+    invalidate(), which orphans every entry built from the old data; the
+    orphans age out via TTL and LRU. Versions are read before the handler
+    queries the database, so a write that lands mid-request can never be
+    cached under the new version.
+    """
+
+    def __init__(self, backend=None, ttl_seconds=300):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.ttl_seconds > 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def lookup(self, request, tags, current_user=None, vary_user=False):
+        """Cached response (200 or 304) for this request if there is one"""
+        if_none_match = request.headers.get("if-none-match")
+        if not self.enabled:
+            return CacheLookup(None, if_none_match=if_none_match)
+        versions = await self.backend.versions(tags)
+        parts = [
+            request.method,
+            request.url.path,
+            sorted(request.query_params.multi_items()),
+            current_user.role if current_user is not None else None,
+            current_user.id if current_user is not None and vary_user else None,
+            dict(zip(tags, versions)),
+        ]
+        key = hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+        value = await self.backend.get(key)
+        if value is None:
+            self._count("misses")
+            return CacheLookup(key, if_none_match=if_none_match)
+        self._count("hits")
+        meta, body = value.split(b"\n", 1)
+        meta = json.loads(meta)
+        return CacheLookup(key, self._response(body, meta["etag"], meta["headers"], if_none_match))
+
+    async def store(self, lookup, payload, headers=None, response_model=None):
+        """
+        Serialize payload, cache it under the lookup's key and return the response.
+
+        Handlers return the Response directly, which skips FastAPI's own
+        response_model handling, so pass the route's response_model to have
+        the payload validated and shaped by it first.
+        """
+        if response_model is not None:
+            payload = validate_response(response_model, payload)
+        body = json.dumps(
+            jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        headers = dict(headers or {})
+        if lookup.key is not None:
+            meta = json.dumps({"etag": etag, "headers": headers}).encode("utf-8")
+            await self.backend.set(lookup.key, meta + b"\n" + body, self.ttl_seconds)
+        return self._response(body, etag, headers, lookup.if_none_match)
+
+    async def invalidate(self, *tags):
+        """Drop every cached response depending on any of the tags"""
+        if tags:
+            await self.backend.bump(tags)
+            with self._lock:
+                self.invalidations += len(tags)
+
+    def _response(self, body, etag, headers, if_none_match):
+        headers = {**headers, "ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if if_none_match and _etag_matches(etag, if_none_match):
+            self._count("not_modified")
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "not_modified": self.not_modified,
+                "invalidations": self.invalidations,
+            }
+        stats.update(self.backend.stats())
+        return stats
+
+
+def _etag_matches(etag, if_none_match):
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
+
+
+def create_response_cache(url="", ttl_seconds=300, max_entries=5000):
+    """In-process cache, or one shared through Redis when url is a redis:// URL"""
+    if url:
+        return ResponseCache(RedisCacheBackend(url), ttl_seconds)
+    return ResponseCache(MemoryCacheBackend(max_entries), ttl_seconds)
+
+
+# Shared by the read-heavy endpoints and the mutations that invalidate them
+response_cache = create_response_cache(
+    settings.RESPONSE_CACHE_URL,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES
+)
@@ -1,18 +1,191 @@
-﻿from sqlalchemy import create_engine
+﻿import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
+from app.core.config import settings
+
+# Database URL (DATABASE_URL in the environment, SQLite file by default)
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URI
+
+
+class PoolMetrics:
+    """Connection pool counters for one engine, updated from pool events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.checkouts = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.invalidated = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.total_wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def attach(self, pool_events):
+        """Register the pool listeners on an engine (or async_engine.sync_engine)"""
+        @event.listens_for(pool_events, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connections_opened += 1
+
+        @event.listens_for(pool_events, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                self.checkouts += 1
+                self.checked_out += 1
+                self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+        @event.listens_for(pool_events, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self.checked_out = max(self.checked_out - 1, 0)
+
+        @event.listens_for(pool_events, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidated += 1
+
+    def snapshot(self, pool=None):
+        with self._lock:
+            stats = {
+                "connections_opened": self.connections_opened,
+                "checkouts": self.checkouts,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "invalidated": self.invalidated,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(1000 * self.total_wait_seconds / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait_seconds, 3),
+            }
+        if pool is not None:
+            stats["pool"] = pool.status()
+        return stats
+
+
+def _timed_pool_class(base, metrics):
+    """Pool subclass that reports how long each checkout waited for a connection"""
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except PoolTimeoutError:
+            metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        metrics.record_wait(time.perf_counter() - start)
+        return connection
+    # Kept as a class (not an instance patch) so engine.dispose() recreates it
+    return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite tuning: WAL lets readers run alongside one writer, busy_timeout waits out locks"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
+
+
+def _engine_options(url: str, pool_class, metrics):
+    options = {"poolclass": _timed_pool_class(pool_class, metrics)}
+    if is_sqlite(url):
+        if ":memory:" in url or url.rstrip("/").endswith("sqlite:"):
+            # An in-memory database lives in one connection; use the driver's default pool
+            return {}
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        # Server databases drop idle connections; test them before use and recycle old ones
+        options["pool_pre_ping"] = settings.DB_POOL_PRE_PING
+        options["pool_recycle"] = settings.DB_POOL_RECYCLE_SECONDS
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    )
+    return options
+
+
+def database_url(url: str) -> str:
+    """Normalize the postgres:// scheme some hosts hand out to the one SQLAlchemy accepts"""
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite for SQLite, asyncpg for Postgres)"""
+    url = database_url(url)
+    for prefix, async_prefix in (
+        ("sqlite://", "sqlite+aiosqlite://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+    ):
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    """Sync engine with the configured pool, SQLite pragmas and pool metrics (engine.pool_metrics)"""
+    url = database_url(url)
+    metrics = PoolMetrics()
+    engine = create_engine(url, **_engine_options(url, QueuePool, metrics))
+    if is_sqlite(url):
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    metrics.attach(engine)
+    engine.pool_metrics = metrics
+    return engine
+
+
+def create_async_db_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    """Async counterpart of create_db_engine (metrics at engine.sync_engine.pool_metrics)"""
+    url = async_database_url(url)
+    metrics = PoolMetrics()
+    engine = create_async_engine(url, **_engine_options(url, AsyncAdaptedQueuePool, metrics))
+    if is_sqlite(url):
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    metrics.attach(engine.sync_engine)
+    # AsyncEngine has __slots__, so the metrics live on its sync engine
+    engine.sync_engine.pool_metrics = metrics
+    return engine
+
+
+def pool_metrics():
+    """Pool metrics for the sync and async engines"""
+    return {
+        "sync": engine.pool_metrics.snapshot(engine.pool),
+        "async": async_engine.sync_engine.pool_metrics.snapshot(async_engine.pool),
+    }
 
-# SQLite database URL
-SQLALCHEMY_DATABASE_URL = "sqlite:///./resource_planning.db"
 
 # Create the database engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}  # SQLite-specific
-)
+engine = create_db_engine()
 
 # Create a session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for endpoints that must not block the event loop
+async_engine = create_async_db_engine()
+
+# Objects stay usable after commit, since async sessions cannot lazy-load expired attributes
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Define the Base class for models
 Base = declarative_base()
 
@@ -27,3 +200,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async database session
+async def get_async_db():
+    """
+    Dependency to get an AsyncSession.
+    Relationships must be loaded eagerly (selectinload/joinedload); lazy loads
+    are not available on async sessions.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
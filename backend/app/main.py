@@ -7,16 +7,33 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Add the project root directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.router import api_router
-from app.db.session import Base, engine
+from app.api.endpoints.ml import pipeline, training_jobs
+from app.api.endpoints.auth import token_cache, password_executor
+from app.core.config import settings
+from app.core.response_cache import response_cache
+from app.db.session import Base, engine, SessionLocal, async_engine, pool_metrics
 from app.models import User, Project, ProjectSkillRequirement, ResourceAllocation, Skill
+from app.models.availability import AvailabilityLedger
 
 # Create all tables
 Base.metadata.create_all(bind=engine)
 print("Database schema recreated.")
 
+# The availability ledger is filled by the migrations (0005) and checked or
+# repaired by reconcile_availability.py; startup only reads two rows to warn
+# about a database that was never migrated
+with SessionLocal() as db:
+    if (
+        db.query(AvailabilityLedger.employee_id).first() is None
+        and db.query(ResourceAllocation.id).filter(ResourceAllocation.status != "completed").first() is not None
+    ):
+        print("Availability ledger is empty; run `alembic upgrade head` "
+              "(or reconcile_availability.py --fix) to fill it.")
+
 app = FastAPI(title="AI Resource Planning API")
 
 # Configure CORS with more specific settings
@@ -32,10 +49,48 @@ app.add_middleware(
 # Include API router
 app.include_router(api_router, prefix="/api")
 
+@app.on_event("startup")
+async def start_ml_warmup():
+    # Load the ML components in a worker thread so the API can serve immediately
+    if settings.ML_WARMUP:
+        asyncio.get_running_loop().run_in_executor(None, pipeline.warmup)
+
+@app.on_event("shutdown")
+def stop_training_jobs():
+    training_jobs.shutdown()
+
+@app.on_event("shutdown")
+def stop_password_executor():
+    password_executor.shutdown()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await async_engine.dispose()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to AI Resource Planning API"}
 
+@app.get("/health/db-pool")
+async def db_pool_health():
+    """Connection pool usage and checkout wait times"""
+    return pool_metrics()
+
+@app.get("/health/auth-cache")
+async def auth_cache_health():
+    """Token cache size and hit rate"""
+    return token_cache.stats()
+
+@app.get("/health/password-hashing")
+async def password_hashing_health():
+    """Password pool queue depth and wait times"""
+    return password_executor.stats()
+
+@app.get("/health/response-cache")
+async def response_cache_health():
+    """Response cache hit rate, 304s served and invalidations"""
+    return response_cache.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
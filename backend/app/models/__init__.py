@@ -4,5 +4,6 @@ from app.models.user import User, user_skills
 from app.models.skill import Skill
 from app.models.project import Project, ProjectSkillRequirement
 from app.models.resource_allocation import ResourceAllocation
+from app.models.availability import AvailabilityLedger, AvailabilityReservation
 
 # For Alembic to detect models
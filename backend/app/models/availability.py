@@ -0,0 +1,296 @@
+﻿from datetime import datetime
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, case, delete, event, func, select, update, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from app.db.session import Base
+from app.models.resource_allocation import ResourceAllocation
+from app.models.user import User
+
+class AvailabilityLedger(Base):
+    """Running total of each employee's active (non-completed) allocation percentage"""
+    __tablename__ = "availability_ledger"
+
+    employee_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    allocated_percentage = Column(Float, nullable=False, default=0.0)
+    active_allocations = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AvailabilityReservation(Base):
+    """
+    Share of an employee's time set aside outside project allocations (leave,
+    part-time, internal work), recorded when availability is set by hand
+    """
+    __tablename__ = "availability_reservations"
+
+    employee_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    reserved_percentage = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+def is_active_allocation(status):
+    """
+    Matches the SQL filter ResourceAllocation.status != 'completed' (NULL is not active).
+    For the statuses in use (proposed, confirmed, completed) that is the same
+    as counting proposed and confirmed allocations.
+    """
+    return status is not None and status != "completed"
+
+
+def _apply_delta(connection, employee_id, percentage_delta, count_delta):
+    """Add a delta to an employee's ledger row and mirror it onto users.availability_percentage"""
+    if employee_id is None or (not percentage_delta and not count_delta):
+        return
+    ledger = AvailabilityLedger.__table__
+    result = connection.execute(
+        update(ledger)
+        .where(ledger.c.employee_id == employee_id)
+        .values(
+            allocated_percentage=ledger.c.allocated_percentage + percentage_delta,
+            active_allocations=ledger.c.active_allocations + count_delta,
+            updated_at=datetime.utcnow()
+        )
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(ledger).values(
+            employee_id=employee_id,
+            allocated_percentage=percentage_delta,
+            active_allocations=count_delta,
+            updated_at=datetime.utcnow()
+        ))
+    _sync_user_availability(connection, [employee_id])
+
+
+def _sync_user_availability(connection, employee_ids=None):
+    """
+    Set users.availability_percentage = 100 - ledger total - reserved share
+    (clamped to 0..100); None means every user. This is the only writer of
+    that column.
+    """
+    ledger = AvailabilityLedger.__table__
+    reservations = AvailabilityReservation.__table__
+    unavailable = (
+        select(func.coalesce(func.sum(ledger.c.allocated_percentage), 0))
+        .where(ledger.c.employee_id == User.__table__.c.id)
+        .scalar_subquery()
+    ) + (
+        select(func.coalesce(func.sum(reservations.c.reserved_percentage), 0))
+        .where(reservations.c.employee_id == User.__table__.c.id)
+        .scalar_subquery()
+    )
+    statement = update(User.__table__)
+    if employee_ids is not None:
+        statement = statement.where(User.__table__.c.id.in_(employee_ids))
+    connection.execute(
+        statement.values(availability_percentage=case(
+            (unavailable >= 100, 0),
+            (unavailable <= 0, 100),
+            else_=100 - unavailable
+        ))
+    )
+
+
+def _contribution(employee_id, percentage, status):
+    if is_active_allocation(status):
+        return employee_id, percentage or 0, 1
+    return employee_id, 0, 0
+
+
+# The ledger is updated in the same flush (and therefore transaction) as the allocation change
+
+@event.listens_for(ResourceAllocation, "after_insert")
+def _ledger_after_insert(mapper, connection, target):
+    _apply_delta(connection, *_contribution(target.employee_id, target.allocation_percentage, target.status))
+
+
+@event.listens_for(ResourceAllocation, "after_delete")
+def _ledger_after_delete(mapper, connection, target):
+    employee_id, percentage, count = _contribution(target.employee_id, target.allocation_percentage, target.status)
+    _apply_delta(connection, employee_id, -percentage, -count)
+
+
+@event.listens_for(ResourceAllocation, "after_update")
+def _ledger_after_update(mapper, connection, target):
+    old_values = {}
+    for attribute in ("employee_id", "allocation_percentage", "status"):
+        history = get_history(target, attribute)
+        old_values[attribute] = history.deleted[0] if history.deleted else getattr(target, attribute)
+    old = _contribution(old_values["employee_id"], old_values["allocation_percentage"], old_values["status"])
+    new = _contribution(target.employee_id, target.allocation_percentage, target.status)
+    if old == new:
+        return
+    _apply_delta(connection, old[0], -old[1], -old[2])
+    _apply_delta(connection, new[0], new[1], new[2])
+
+
+@event.listens_for(User, "before_delete")
+def _ledger_before_user_delete(mapper, connection, target):
+    # Runs after the user's allocations were detached in the same flush (which
+    # moved their ledger total), just before the users row goes, so neither
+    # table is left pointing at a deleted user
+    connection.execute(
+        delete(AvailabilityLedger.__table__).where(AvailabilityLedger.__table__.c.employee_id == target.id)
+    )
+    connection.execute(
+        delete(AvailabilityReservation.__table__).where(AvailabilityReservation.__table__.c.employee_id == target.id)
+    )
+
+
+def apply_ledger_deltas(db: Session, deltas):
+    """
+    Apply {employee_id: (percentage_delta, count_delta)} to the ledger for
+    writes that bypass the ORM events (e.g. Core bulk inserts).
+
+    Uses one UPDATE ... CASE for existing rows, one INSERT for new ones and one
+    availability sync, whatever the number of employees.
+    """
+    deltas = {employee_id: delta for employee_id, delta in deltas.items() if employee_id is not None}
+    if not deltas:
+        return
+    connection = db.connection()
+    ledger = AvailabilityLedger.__table__
+    now = datetime.utcnow()
+    existing = {
+        employee_id for (employee_id,) in connection.execute(
+            select(ledger.c.employee_id).where(ledger.c.employee_id.in_(list(deltas)))
+        )
+    }
+    if existing:
+        connection.execute(
+            update(ledger)
+            .where(ledger.c.employee_id.in_(list(existing)))
+            .values(
+                allocated_percentage=ledger.c.allocated_percentage + case(
+                    {employee_id: deltas[employee_id][0] for employee_id in existing},
+                    value=ledger.c.employee_id
+                ),
+                active_allocations=ledger.c.active_allocations + case(
+                    {employee_id: deltas[employee_id][1] for employee_id in existing},
+                    value=ledger.c.employee_id
+                ),
+                updated_at=now
+            )
+        )
+    missing = [employee_id for employee_id in deltas if employee_id not in existing]
+    if missing:
+        connection.execute(insert(ledger), [
+            {
+                "employee_id": employee_id,
+                "allocated_percentage": deltas[employee_id][0],
+                "active_allocations": deltas[employee_id][1],
+                "updated_at": now
+            }
+            for employee_id in missing
+        ])
+    _sync_user_availability(connection, list(deltas))
+
+
+def get_allocated_percentages(db: Session, employee_ids):
+    """Ledger totals for the given employees ({employee_id: allocated percentage}); missing means 0"""
+    if not employee_ids:
+        return {}
+    rows = db.query(AvailabilityLedger.employee_id, AvailabilityLedger.allocated_percentage).filter(
+        AvailabilityLedger.employee_id.in_(list(employee_ids))
+    ).all()
+    return {employee_id: allocated or 0 for employee_id, allocated in rows}
+
+
+def set_availability(db: Session, employee_id, availability):
+    """
+    Record a hand-set availability percentage for an employee.
+
+    Allocations keep counting: the part of 100 - availability not covered by
+    the employee's active allocations is stored as their reservation, so later
+    allocation changes move availability on from the edited value. Asking for
+    more than the allocations leave free clears the reservation. Returns the
+    resulting users.availability_percentage; the caller commits.
+    """
+    allocated = get_allocated_percentages(db, [employee_id]).get(employee_id, 0)
+    reserved = min(100.0, max(0.0, 100 - allocated - availability))
+    reservation = db.get(AvailabilityReservation, employee_id)
+    if reservation is None:
+        db.add(AvailabilityReservation(
+            employee_id=employee_id, reserved_percentage=reserved, updated_at=datetime.utcnow()
+        ))
+    else:
+        reservation.reserved_percentage = reserved
+        reservation.updated_at = datetime.utcnow()
+    db.flush()
+    _sync_user_availability(db.connection(), [employee_id])
+    return db.execute(select(User.availability_percentage).where(User.id == employee_id)).scalar()
+
+
+def _seed_reservations(db: Session, actual):
+    """Reserve 100 - allocated - current availability for users without a reservation"""
+    reserved = {
+        user_id: min(100.0, 100 - actual.get(user_id, (0, 0))[0] - availability)
+        for user_id, availability in db.query(User.id, User.availability_percentage).filter(
+            User.availability_percentage != None,
+            ~select(AvailabilityReservation.employee_id)
+            .where(AvailabilityReservation.employee_id == User.id)
+            .exists()
+        ).all()
+    }
+    db.bulk_insert_mappings(AvailabilityReservation, [
+        {"employee_id": user_id, "reserved_percentage": share, "updated_at": datetime.utcnow()}
+        for user_id, share in reserved.items()
+        if share > 0
+    ])
+
+
+def reconcile_availability_ledger(db: Session, fix=False):
+    """
+    Compare the ledger with totals recomputed from resource_allocations.
+
+    Returns a list of mismatches; with fix=True the ledger and
+    users.availability_percentage are rewritten from the raw allocations
+    (reservations are kept). Fixing an empty ledger, as in a database that
+    predates it, first keeps the current availability values as reservations,
+    like migration 0005 does.
+    """
+    actual = {
+        employee_id: (allocated or 0, count)
+        for employee_id, allocated, count in db.query(
+            ResourceAllocation.employee_id,
+            func.sum(ResourceAllocation.allocation_percentage),
+            func.count(ResourceAllocation.id)
+        ).filter(
+            ResourceAllocation.status != "completed",
+            ResourceAllocation.employee_id != None
+        ).group_by(ResourceAllocation.employee_id).all()
+    }
+    recorded = {
+        row.employee_id: (row.allocated_percentage, row.active_allocations)
+        for row in db.query(AvailabilityLedger).all()
+    }
+
+    mismatches = []
+    for employee_id in set(actual) | set(recorded):
+        expected = actual.get(employee_id, (0, 0))
+        found = recorded.get(employee_id, (0, 0))
+        if abs(expected[0] - found[0]) > 1e-6 or expected[1] != found[1]:
+            mismatches.append({
+                "employee_id": employee_id,
+                "ledger_percentage": found[0],
+                "actual_percentage": expected[0],
+                "ledger_allocations": found[1],
+                "actual_allocations": expected[1]
+            })
+
+    if fix:
+        if not recorded:
+            _seed_reservations(db, actual)
+        db.query(AvailabilityLedger).delete(synchronize_session=False)
+        db.bulk_insert_mappings(AvailabilityLedger, [
+            {
+                "employee_id": employee_id,
+                "allocated_percentage": allocated,
+                "active_allocations": count,
+                "updated_at": datetime.utcnow()
+            }
+            for employee_id, (allocated, count) in actual.items()
+        ])
+        _sync_user_availability(db.connection())
+        db.commit()
+
+    return mismatches
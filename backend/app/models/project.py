@@ -1,10 +1,14 @@
-﻿from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Table, Text, Boolean
+﻿from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Table, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.session import Base
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        # Keyset pages of GET /projects filtered by status
+        Index("ix_projects_status_id", "status", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -26,7 +30,7 @@ class ProjectSkillRequirement(Base):
     __tablename__ = "project_skill_requirements"
     
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
     skill_id = Column(Integer, ForeignKey("skills.id"))  # Add ForeignKey to skills table
     employees_requested = Column(Integer, nullable=False)  # Number of employees needed
     
@@ -1,4 +1,4 @@
-﻿from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Boolean
+﻿from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.session import Base
@@ -11,6 +11,12 @@ router = APIRouter()
 
 class ResourceAllocation(Base):
     __tablename__ = "resource_allocations"
+    __table_args__ = (
+        # Active allocations per employee (ledger reconciliation, capacity checks, match-employees)
+        Index("ix_resource_allocations_employee_id_status", "employee_id", "status"),
+        # Allocation of an employee on a project; the project_id prefix serves per-project lookups
+        Index("ix_resource_allocations_project_id_employee_id_status", "project_id", "employee_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("users.id"))
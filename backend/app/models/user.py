@@ -1,4 +1,4 @@
-﻿from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, Float, Table, DateTime
+﻿from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, Float, Table, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.session import Base
@@ -10,11 +10,20 @@ user_skills = Table(
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
     Column('skill_id', Integer, ForeignKey('skills.id'), primary_key=True),
     Column('proficiency_level', Float, default=1.0),  # 0-5 rating scale
+    # The primary key leads with user_id; lookups by skill need their own index
+    Index('ix_user_skills_skill_id_user_id', 'skill_id', 'user_id'),
     extend_existing=True  # Allow redefinition if the table already exists
 )
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Active employees with availability (ML recommendations)
+        Index("ix_users_is_active_role_availability", "is_active", "role", "availability_percentage"),
+        # Keyset pages of GET /auth/users filtered by role or department
+        Index("ix_users_role_id", "role", "id"),
+        Index("ix_users_department_id", "department", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent request throughput for the API.
+
+Runs against a live server (--url) or, by default, against the app in-process
+through httpx's ASGI transport. Run it on two revisions to compare them, e.g.
+
+    python load_benchmark.py --email pm@example.com --path /api/projects/1/match-employees
+
+With --login-burst N, N concurrent logins run alongside the measured requests,
+showing how password hashing affects latency of unrelated endpoints.
+"""
+import sys
+import os
+import argparse
+import asyncio
+import time
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+
+async def run_load(client, path, headers, total_requests, concurrency):
+    """Issue total_requests GETs with at most `concurrency` in flight; returns (seconds, latencies, errors)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one_request():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(total_requests)))
+    return time.perf_counter() - start, sorted(latencies), errors
+
+
+async def login_burst(client, count, email, password):
+    """Fire `count` concurrent logins; returns how many succeeded"""
+    responses = await asyncio.gather(*(
+        client.post("/api/auth/login", data={"username": email, "password": password})
+        for _ in range(count)
+    ))
+    return sum(response.status_code == 200 for response in responses)
+
+
+def percentile(latencies, fraction):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+
+async def main(args):
+    from app.api.endpoints.auth import create_access_token
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': args.email})}"}
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=60)
+
+    async with client:
+        # Warm up connections and caches before measuring
+        await run_load(client, args.path, headers, args.concurrency, args.concurrency)
+        for concurrency in args.concurrency_levels or [args.concurrency]:
+            load = run_load(client, args.path, headers, args.requests, concurrency)
+            if args.login_burst:
+                (seconds, latencies, errors), logins = await asyncio.gather(
+                    load, login_burst(client, args.login_burst, args.login_email or args.email, args.login_password)
+                )
+            else:
+                seconds, latencies, errors = await load
+            print(
+                f"concurrency={concurrency:4d}  {args.requests / seconds:8.1f} req/s  "
+                f"p50={percentile(latencies, 0.5):7.1f}ms  p95={percentile(latencies, 0.95):7.1f}ms  "
+                f"p99={percentile(latencies, 0.99):7.1f}ms  errors={errors}"
+                + (f"  logins={logins}/{args.login_burst}" if args.login_burst else "")
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process app)")
+    parser.add_argument("--email", required=True, help="User to issue the bearer token for")
+    parser.add_argument("--path", default="/api/projects/1/match-employees")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--concurrency-levels", type=int, nargs="*", help="Run once per level, e.g. 1 10 50")
+    parser.add_argument("--login-burst", type=int, default=0, help="Concurrent logins to run during each measurement")
+    parser.add_argument("--login-email", help="Account for the login burst (default: --email)")
+    parser.add_argument("--login-password", default="", help="Password of the login burst account")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,52 @@
+import sys
+import os
+from logging.config import fileConfig
+
+from alembic import context
+
+# Add the backend and project root directories to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.db.session import Base, create_db_engine, database_url
+from app.core.config import settings
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# settings.DATABASE_URI (DATABASE_URL), unless sqlalchemy.url is set on the config
+# (e.g. by tests building a scratch database)
+DATABASE_URL = config.get_main_option("sqlalchemy.url") or settings.DATABASE_URI
+
+
+def run_migrations_offline():
+    """Emit the migration SQL without connecting to a database"""
+    context.configure(
+        url=database_url(DATABASE_URL),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Run the migrations against DATABASE_URL"""
+    engine = create_db_engine(DATABASE_URL)
+    with engine.connect() as connection:
+        # Batch mode lets SQLite apply ALTERs by copying the table
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
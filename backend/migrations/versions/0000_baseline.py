@@ -0,0 +1,105 @@
+"""Baseline schema
+
+The tables as they were before the migration chain started, so that
+`alembic upgrade head` can build a database from scratch. Databases that
+already have them (created by Base.metadata.create_all at startup) skip
+this revision's tables, hence if_not_exists.
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0000"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # (name, table, columns, unique)
+    ("ix_users_id", "users", ["id"], False),
+    ("ix_users_email", "users", ["email"], True),
+    ("ix_skills_id", "skills", ["id"], False),
+    ("ix_skills_name", "skills", ["name"], True),
+    ("ix_projects_id", "projects", ["id"], False),
+    ("ix_projects_name", "projects", ["name"], False),
+    ("ix_project_skill_requirements_id", "project_skill_requirements", ["id"], False),
+    ("ix_resource_allocations_id", "resource_allocations", ["id"], False),
+]
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String()),
+        sa.Column("full_name", sa.String()),
+        sa.Column("hashed_password", sa.String()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("role", sa.String()),
+        sa.Column("department", sa.String()),
+        sa.Column("position", sa.String()),
+        sa.Column("average_performance", sa.Float()),
+        sa.Column("availability_percentage", sa.Float()),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "skills",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        sa.Column("category", sa.String()),
+        sa.Column("description", sa.String()),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "user_skills",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("skill_id", sa.Integer(), sa.ForeignKey("skills.id"), primary_key=True),
+        sa.Column("proficiency_level", sa.Float()),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "projects",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        sa.Column("description", sa.Text()),
+        sa.Column("start_date", sa.Date()),
+        sa.Column("end_date", sa.Date()),
+        sa.Column("status", sa.String()),
+        sa.Column("priority", sa.Integer()),
+        sa.Column("manager_id", sa.Integer(), sa.ForeignKey("users.id")),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "project_skill_requirements",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id")),
+        sa.Column("skill_id", sa.Integer(), sa.ForeignKey("skills.id")),
+        sa.Column("employees_requested", sa.Integer(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "resource_allocations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("employee_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id")),
+        sa.Column("start_date", sa.Date()),
+        sa.Column("end_date", sa.Date()),
+        sa.Column("hours_allocated", sa.Float()),
+        sa.Column("allocation_percentage", sa.Float()),
+        sa.Column("status", sa.String()),
+        sa.Column("is_ai_recommended", sa.Boolean()),
+        sa.Column("confidence_score", sa.Float()),
+        if_not_exists=True,
+    )
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, columns, unique in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+    for table in ("resource_allocations", "project_skill_requirements", "projects", "user_skills", "skills", "users"):
+        op.drop_table(table, if_exists=True)
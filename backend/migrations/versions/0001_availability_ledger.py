@@ -0,0 +1,33 @@
+"""Availability ledger table
+
+Tables are created by Base.metadata.create_all at startup; this revision
+brings databases that predate the ledger up to the model, and is a no-op for
+those that already have it. 0005 fills it from the allocations (or run
+`python reconcile_availability.py --fix`).
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = "0000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "availability_ledger",
+        sa.Column("employee_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("allocated_percentage", sa.Float(), nullable=False),
+        sa.Column("active_allocations", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime()),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table("availability_ledger", if_exists=True)
@@ -0,0 +1,35 @@
+"""Secondary and composite indexes for the hot filter paths
+
+Tables are created by Base.metadata.create_all at startup; databases created
+before these indexes were declared on the models get them from this revision.
+Databases created afterwards already have them, hence if_not_exists.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # (name, table, columns)
+    ("ix_resource_allocations_employee_id_status", "resource_allocations", ["employee_id", "status"]),
+    ("ix_resource_allocations_project_id_employee_id_status", "resource_allocations", ["project_id", "employee_id", "status"]),
+    ("ix_project_skill_requirements_project_id", "project_skill_requirements", ["project_id"]),
+    ("ix_user_skills_skill_id_user_id", "user_skills", ["skill_id", "user_id"]),
+    ("ix_users_is_active_role_availability", "users", ["is_active", "role", "availability_percentage"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,32 @@
+"""Filter + id indexes for keyset-paginated list endpoints
+
+A filtered page seeks to (filter value, cursor id) in one of these indexes
+instead of scanning the table for matching rows past the cursor.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # (name, table, columns)
+    ("ix_users_role_id", "users", ["role", "id"]),
+    ("ix_users_department_id", "users", ["department", "id"]),
+    ("ix_projects_status_id", "projects", ["status", "id"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
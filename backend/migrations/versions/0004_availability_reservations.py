@@ -0,0 +1,31 @@
+"""Availability reservations
+
+Hand-set availability is stored as a reserved share next to the allocation
+ledger instead of overwriting users.availability_percentage. Like 0001, a
+no-op where create_all already made the table.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "availability_reservations",
+        sa.Column("employee_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("reserved_percentage", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime()),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table("availability_reservations", if_exists=True)
@@ -0,0 +1,86 @@
+"""Backfill the availability ledger
+
+Fills an empty availability_ledger from the active (non-completed)
+resource_allocations, so databases that predate the ledger start from the
+right totals. The users.availability_percentage values such databases hold
+may have been set by hand; whatever part of them the allocations do not
+explain is kept as a reservation, so the ledger does not overwrite them.
+A no-op once the ledger has rows.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+users = sa.table("users", sa.column("id"), sa.column("availability_percentage"))
+allocations = sa.table(
+    "resource_allocations",
+    sa.column("id"),
+    sa.column("employee_id"),
+    sa.column("allocation_percentage"),
+    sa.column("status"),
+)
+ledger = sa.table(
+    "availability_ledger",
+    sa.column("employee_id"),
+    sa.column("allocated_percentage"),
+    sa.column("active_allocations"),
+    sa.column("updated_at"),
+)
+reservations = sa.table(
+    "availability_reservations",
+    sa.column("employee_id"),
+    sa.column("reserved_percentage"),
+    sa.column("updated_at"),
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.execute(sa.select(ledger.c.employee_id).limit(1)).first() is not None:
+        return
+
+    # Same filter as is_active_allocation: NULL status is not active
+    bind.execute(ledger.insert().from_select(
+        ["employee_id", "allocated_percentage", "active_allocations", "updated_at"],
+        sa.select(
+            allocations.c.employee_id,
+            sa.func.coalesce(sa.func.sum(allocations.c.allocation_percentage), 0),
+            sa.func.count(allocations.c.id),
+            sa.func.current_timestamp(),
+        ).where(
+            allocations.c.status != "completed",
+            allocations.c.employee_id.isnot(None),
+        ).group_by(allocations.c.employee_id)
+    ))
+
+    # reserved = 100 - allocated - current availability, as set_availability
+    # records it, for users who have none yet
+    allocated = sa.func.coalesce(
+        sa.select(ledger.c.allocated_percentage).where(ledger.c.employee_id == users.c.id).scalar_subquery(), 0
+    )
+    reserved = 100 - allocated - users.c.availability_percentage
+    bind.execute(reservations.insert().from_select(
+        ["employee_id", "reserved_percentage", "updated_at"],
+        sa.select(
+            users.c.id,
+            sa.case((reserved >= 100, 100), else_=reserved),
+            sa.func.current_timestamp(),
+        ).where(
+            users.c.availability_percentage.isnot(None),
+            reserved > 0,
+            ~sa.exists().where(reservations.c.employee_id == users.c.id),
+        )
+    ))
+
+
+def downgrade():
+    # The ledger and reservations are dropped with their tables in 0001 and 0004
+    pass
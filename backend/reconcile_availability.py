@@ -0,0 +1,48 @@
+"""
+Compare the availability ledger with the raw allocations.
+
+Run this with --fix to rebuild the ledger and users.availability_percentage
+from resource_allocations, e.g. after writing allocations outside the ORM.
+Hand-set reservations are kept; on an empty ledger (a database that predates
+it and was not migrated) the current availability values are kept as
+reservations first, as migration 0005 does.
+
+    python reconcile_availability.py [--fix]
+"""
+import sys
+import os
+import argparse
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import Base, SessionLocal, engine
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.models.availability import reconcile_availability_ledger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fix", action="store_true", help="rewrite the ledger from the allocations")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        mismatches = reconcile_availability_ledger(db, fix=args.fix)
+    for mismatch in mismatches:
+        print(
+            f"employee {mismatch['employee_id']}: ledger {mismatch['ledger_percentage']}% "
+            f"over {mismatch['ledger_allocations']} allocations, actual {mismatch['actual_percentage']}% "
+            f"over {mismatch['actual_allocations']}"
+        )
+    if not mismatches:
+        print("Availability ledger matches the allocations.")
+    elif args.fix:
+        print(f"Reconciled {len(mismatches)} employees.")
+    else:
+        print(f"{len(mismatches)} employees differ; run with --fix to repair.")
+    return 1 if mismatches and not args.fix else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
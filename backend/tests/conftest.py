@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway SQLite file before anything reads the settings
+_database_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_database_dir, "test.db")
+os.environ["ML_WARMUP"] = "false"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+# Backend and project root, as app.main and run.py add them
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+
+
+@pytest.fixture
+def db():
+    """Session on freshly created tables, with the caches keyed on old rows cleared"""
+    from app.main import app  # noqa: F401  (registers every model and creates the schema)
+    from app.api.endpoints.auth import token_cache
+    from app.core.response_cache import MemoryCacheBackend, response_cache
+    from app.db.session import Base, SessionLocal, engine
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    token_cache.clear()
+    response_cache.backend = MemoryCacheBackend()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    """API client; lifespan events are skipped so shared executors stay up across tests"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def make_user(db):
+    """Create a user and return (user, auth headers)"""
+    from app.api.endpoints.auth import create_access_token
+    from app.models.user import User
+
+    def make_user(email, role="employee", **fields):
+        user = User(email=email, full_name=email.split("@")[0], hashed_password="x", role=role, **fields)
+        db.add(user)
+        db.commit()
+        token = create_access_token({"sub": email})
+        return user, {"Authorization": f"Bearer {token}"}
+
+    return make_user
+
+
+class StubEncoder:
+    """Deterministic stand-in for the Sentence-BERT encoder: one pseudo-random vector per text"""
+
+    dimension = 16
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts):
+        import hashlib
+        import numpy as np
+
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        self.encoded.extend(texts)
+        vectors = np.array([
+            np.random.default_rng(int(hashlib.md5(text.encode()).hexdigest()[:8], 16)).normal(size=self.dimension)
+            for text in texts
+        ], dtype=np.float32).reshape(len(texts), self.dimension)
+        return vectors[0] if single else vectors
+
+
+@pytest.fixture
+def stub_encoder(monkeypatch):
+    """Serve skill matching from StubEncoder instead of loading sentence-transformers"""
+    encoder = StubEncoder()
+    monkeypatch.setattr("ml.skill_matching.model.get_encoder", lambda model_name=None: encoder)
+    return encoder
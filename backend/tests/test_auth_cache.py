@@ -0,0 +1,86 @@
+import time
+
+from app.core.auth_cache import TokenCache, UserPrincipal
+from app.models.user import User
+
+
+def principal(user_id, role="employee"):
+    return UserPrincipal(user_id, f"user{user_id}@example.com", role, True)
+
+
+def test_entries_expire_after_the_ttl_or_the_token():
+    cache = TokenCache(ttl_seconds=0.05)
+    cache.put("ttl", principal(1))
+    cache.put("short-token", principal(2), token_expires_at=time.time() + 0.01)
+    cache.put("expired-token", principal(3), token_expires_at=time.time() - 1)
+
+    assert cache.get("ttl").id == 1
+    assert cache.get("expired-token") is None
+    time.sleep(0.02)
+    assert cache.get("short-token") is None
+    assert cache.get("ttl").id == 1
+    time.sleep(0.05)
+    assert cache.get("ttl") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TokenCache(max_entries=2)
+    cache.put("a", principal(1))
+    cache.put("b", principal(2))
+    cache.get("a")
+    cache.put("c", principal(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a").id == 1 and cache.get("c").id == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_role_change_takes_effect_on_the_next_request(db, client, make_user):
+    _, manager_headers = make_user("pm@example.com", role="project_manager")
+    employee, headers = make_user("dev@example.com")
+
+    assert client.get("/api/projects/", headers=headers).status_code == 403
+    response = client.put(f"/api/auth/users/{employee.id}", json={"role": "project_manager"}, headers=manager_headers)
+    assert response.status_code == 200
+
+    assert client.get("/api/projects/", headers=headers).status_code == 200
+
+
+def test_deleted_user_is_rejected_on_the_next_request(db, client, make_user):
+    _, manager_headers = make_user("pm@example.com", role="project_manager")
+    employee, headers = make_user("dev@example.com")
+    assert client.get("/api/auth/users/me", headers=headers).status_code == 200
+
+    assert client.delete(f"/api/auth/users/{employee.id}", headers=manager_headers).status_code == 200
+
+    assert client.get("/api/auth/users/me", headers=headers).status_code == 401
+
+
+def test_deactivation_elsewhere_shows_after_the_ttl_or_an_invalidation(db, client, make_user, monkeypatch):
+    from app.api.endpoints.auth import token_cache
+
+    employee, headers = make_user("dev@example.com")
+    token = headers["Authorization"].split()[1]
+    client.get("/api/auth/users/me", headers=headers)
+    assert token_cache.get(token).is_active
+
+    # Deactivated outside this process: the cached principal stands until it expires
+    monkeypatch.setattr(token_cache, "ttl_seconds", 0.05)
+    token_cache.clear()
+    client.get("/api/auth/users/me", headers=headers)
+    db.query(User).filter(User.id == employee.id).update({"is_active": False})
+    db.commit()
+    assert token_cache.get(token).is_active
+    time.sleep(0.06)
+    client.get("/api/auth/users/me", headers=headers)
+    assert not token_cache.get(token).is_active
+
+    # In this process, writers invalidate the user's tokens right away
+    monkeypatch.setattr(token_cache, "ttl_seconds", 60)
+    db.query(User).filter(User.id == employee.id).update({"is_active": True})
+    db.commit()
+    token_cache.invalidate_user(employee.id)
+    assert token_cache.get(token) is None
+    client.get("/api/auth/users/me", headers=headers)
+    assert token_cache.get(token).is_active
@@ -0,0 +1,119 @@
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+
+from app.models.availability import AvailabilityLedger, AvailabilityReservation, reconcile_availability_ledger
+from app.models.project import Project
+from app.models.resource_allocation import ResourceAllocation
+from app.models.user import User
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def availability(db, user_id):
+    db.expire_all()
+    return db.get(User, user_id).availability_percentage
+
+
+def test_hand_set_availability_survives_allocation_changes(db, client, make_user):
+    _, headers = make_user("pm@example.com", role="project_manager")
+    employee, _ = make_user("dev@example.com")
+    project = Project(name="Apollo", status="active")
+    db.add(project)
+    db.flush()
+    db.add(ResourceAllocation(employee_id=employee.id, project_id=project.id, allocation_percentage=20, status="confirmed"))
+    db.commit()
+    assert availability(db, employee.id) == 80
+
+    response = client.put(f"/api/auth/users/{employee.id}", json={"availability_percentage": 50}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["availability_percentage"] == 50
+
+    # Another allocation comes on top of the 30% set aside by hand
+    db.add(ResourceAllocation(employee_id=employee.id, project_id=project.id, allocation_percentage=10, status="proposed"))
+    db.commit()
+    assert availability(db, employee.id) == 40
+
+    # Rebuilding the ledger keeps the reservation
+    reconcile_availability_ledger(db, fix=True)
+    assert availability(db, employee.id) == 40
+
+
+def test_reconcile_reports_without_fixing_by_default(db, make_user):
+    employee, _ = make_user("dev@example.com")
+    project = Project(name="Apollo", status="active")
+    db.add(project)
+    db.flush()
+    db.add(ResourceAllocation(employee_id=employee.id, project_id=project.id, allocation_percentage=40, status="confirmed"))
+    db.commit()
+    db.query(AvailabilityLedger).delete()
+    db.commit()
+
+    mismatches = reconcile_availability_ledger(db)
+    assert [(m["employee_id"], m["ledger_percentage"], m["actual_percentage"]) for m in mismatches] == [
+        (employee.id, 0, 40)
+    ]
+    assert db.query(AvailabilityLedger).count() == 0
+
+    reconcile_availability_ledger(db, fix=True)
+    assert reconcile_availability_ledger(db) == []
+    assert availability(db, employee.id) == 60
+
+
+def test_deleting_a_user_removes_their_ledger_and_reservation(db, client, make_user):
+    _, headers = make_user("pm@example.com", role="project_manager")
+    employee, _ = make_user("dev@example.com")
+    project = Project(name="Apollo", status="active")
+    db.add(project)
+    db.flush()
+    db.add(ResourceAllocation(employee_id=employee.id, project_id=project.id, allocation_percentage=20, status="confirmed"))
+    db.commit()
+    employee_id = employee.id
+    client.put(f"/api/auth/users/{employee_id}", json={"availability_percentage": 50}, headers=headers)
+
+    response = client.delete(f"/api/auth/users/{employee_id}", headers=headers)
+    assert response.status_code == 200
+
+    db.expire_all()
+    assert db.get(AvailabilityLedger, employee_id) is None
+    assert db.get(AvailabilityReservation, employee_id) is None
+    # Reported whether or not SQLite enforces foreign keys on this connection
+    assert db.execute(text("PRAGMA foreign_key_check")).all() == []
+
+
+def test_migration_fills_the_ledger_and_keeps_hand_set_availability(tmp_path):
+    url = "sqlite:///" + str(tmp_path / "upgrade.db")
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "0004")
+
+    # Availability as a database from before the ledger holds it: 20% allocated,
+    # then set to 50% by hand; the second user was set to 70% with no allocations
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO users (id, email, role, availability_percentage) "
+            "VALUES (1, 'a@example.com', 'employee', 50), (2, 'b@example.com', 'employee', 70)"
+        ))
+        connection.execute(text("INSERT INTO projects (id, name) VALUES (1, 'Apollo')"))
+        connection.execute(text(
+            "INSERT INTO resource_allocations (employee_id, project_id, allocation_percentage, status) "
+            "VALUES (1, 1, 20, 'confirmed'), (1, 1, 40, 'completed')"
+        ))
+
+    command.upgrade(config, "head")
+
+    with engine.connect() as connection:
+        ledger = connection.execute(text(
+            "SELECT employee_id, allocated_percentage, active_allocations FROM availability_ledger"
+        )).all()
+        reserved = connection.execute(text(
+            "SELECT employee_id, reserved_percentage FROM availability_reservations ORDER BY employee_id"
+        )).all()
+        availability = connection.execute(text("SELECT availability_percentage FROM users ORDER BY id")).all()
+    assert ledger == [(1, 20, 1)]
+    assert reserved == [(1, 30), (2, 30)]
+    assert availability == [(50,), (70,)]
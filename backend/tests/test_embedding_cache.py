@@ -0,0 +1,64 @@
+import numpy as np
+
+from ml.skill_matching.embedding_cache import SkillEmbeddingCache
+from ml.skill_matching.model import SkillMatcher
+
+
+def test_encode_only_computes_missing_texts(stub_encoder):
+    encoder = stub_encoder
+    cache = SkillEmbeddingCache("stub")
+
+    first = cache.encode(["Python", "SQL", "Python"], encoder.encode)
+    second = cache.encode(["SQL", "React"], encoder.encode)
+
+    assert encoder.encoded == ["Python", "SQL", "React"]
+    assert np.array_equal(first[0], first[2])
+    assert np.array_equal(first[1], second[0])
+    assert cache.stats()["hits"] == 1
+
+
+def test_memory_tier_evicts_the_least_recently_used_vector(stub_encoder):
+    encoder = stub_encoder
+    cache = SkillEmbeddingCache("stub", max_memory_items=2)
+    cache.encode(["Python", "SQL"], encoder.encode)
+    cache.get("Python")
+    cache.encode(["React"], encoder.encode)
+
+    assert cache.get("SQL") is None
+    assert cache.get("Python") is not None and cache.get("React") is not None
+    assert cache.stats()["memory_items"] == 2
+
+
+def test_disk_tier_is_reused_memory_mapped_across_instances(stub_encoder, tmp_path):
+    encoder = stub_encoder
+    expected = SkillEmbeddingCache("org/stub", cache_dir=tmp_path).encode(["Python", "SQL"], encoder.encode)
+
+    reopened = SkillEmbeddingCache("org/stub", cache_dir=tmp_path)
+    assert isinstance(reopened._disk_vectors, np.memmap)
+    assert reopened.stats()["disk_items"] == 2
+    assert np.array_equal(reopened.encode(["SQL", "Python"], encoder.encode), expected[::-1])
+    assert encoder.encoded == ["Python", "SQL"]
+
+    # New texts are appended to the existing store; other models get their own
+    reopened.encode(["React"], encoder.encode)
+    assert SkillEmbeddingCache("org/stub", cache_dir=tmp_path).stats()["disk_items"] == 3
+    assert SkillEmbeddingCache("other", cache_dir=tmp_path).stats()["disk_items"] == 0
+
+
+def test_corrupt_disk_tier_is_ignored(stub_encoder, tmp_path):
+    cache = SkillEmbeddingCache("stub", cache_dir=tmp_path)
+    cache.encode(["Python"], stub_encoder.encode)
+    with open(f"{cache.cache_dir}/{cache.INDEX_FILE}", "w") as f:
+        f.write("{not json")
+
+    assert SkillEmbeddingCache("stub", cache_dir=tmp_path).stats()["disk_items"] == 0
+
+
+def test_matcher_only_loads_the_encoder_for_uncached_skills(stub_encoder, tmp_path):
+    SkillMatcher(cache_dir=tmp_path).get_skill_embeddings(["Python", "SQL"])
+    stub_encoder.encoded.clear()
+
+    vectors = SkillMatcher(cache_dir=tmp_path).get_skill_embeddings(["SQL", "Python"])
+
+    assert vectors.shape == (2, stub_encoder.dimension)
+    assert stub_encoder.encoded == []
@@ -0,0 +1,47 @@
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.models.project import Project
+from app.models.resource_allocation import ResourceAllocation
+
+
+def test_employee_allocations_page_through_the_cursor(db, client, make_user):
+    employee, headers = make_user("dev@example.com")
+    _, other_headers = make_user("other@example.com")
+    project = Project(name="Apollo", status="active")
+    db.add(project)
+    db.flush()
+    db.add_all(
+        ResourceAllocation(employee_id=employee.id, project_id=project.id, allocation_percentage=10,
+                           status="completed" if i % 2 else "confirmed")
+        for i in range(5)
+    )
+    db.commit()
+
+    ids, params = [], {"limit": 2}
+    while True:
+        response = client.get(f"/api/employees/{employee.id}/allocations", params=params, headers=headers)
+        assert response.status_code == 200
+        ids += [allocation["id"] for allocation in response.json()]
+        if NEXT_CURSOR_HEADER not in response.headers:
+            break
+        params = {"limit": 2, "cursor": response.headers[NEXT_CURSOR_HEADER]}
+    assert len(ids) == 5 and ids == sorted(ids)
+
+    confirmed = client.get(f"/api/employees/{employee.id}/allocations", params={"status": "confirmed"},
+                           headers=headers)
+    assert [allocation["status"] for allocation in confirmed.json()] == ["confirmed"] * 3
+
+    # Employees only see their own allocations
+    assert client.get(f"/api/employees/{employee.id}/allocations", headers=other_headers).status_code == 403
+
+
+def test_project_manager_sets_employee_availability(db, client, make_user):
+    employee, employee_headers = make_user("dev@example.com")
+    _, headers = make_user("pm@example.com", role="project_manager")
+
+    response = client.put(f"/api/employees/{employee.id}/availability", params={"availability": 60}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["availability_percentage"] == 60
+    forbidden = client.put(f"/api/employees/{employee.id}/availability", params={"availability": 10},
+                           headers=employee_headers)
+    assert forbidden.status_code == 403
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+from datetime import date
+
+import pytest
+
+from app.api.endpoints import exports
+from app.core.config import settings
+from app.models import Project
+
+
+@pytest.fixture
+def projects(db, monkeypatch):
+    """Seven projects streamed three rows per batch; the second name needs CSV quoting"""
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 3)
+    names = ["Apollo", 'Gemini, "phase 2"\nrollout'] + [f"Project {i}" for i in range(5)]
+    db.add_all([
+        Project(name=name, description="", status="active", priority=3, start_date=date(2026, 1, 5))
+        for name in names
+    ])
+    db.commit()
+    return names
+
+
+def count_calls(monkeypatch, name):
+    calls = []
+    original = getattr(exports, name)
+
+    def counted(*args):
+        calls.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(exports, name, counted)
+    return calls
+
+
+def test_ndjson_export_streams_every_row_in_batches(client, make_user, projects, monkeypatch):
+    _, headers = make_user("pm@example.com", role="project_manager")
+    chunks = count_calls(monkeypatch, "_ndjson_chunk")
+
+    response = client.get("/api/exports/projects", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["content-disposition"] == 'attachment; filename="projects.ndjson"'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["name"] for row in rows] == projects
+    assert rows[0]["start_date"] == "2026-01-05"
+    assert [len(args[1]) for args in chunks] == [3, 3, 1]
+
+
+def test_csv_export_writes_a_header_and_escapes_values(client, make_user, projects, monkeypatch):
+    _, headers = make_user("pm@example.com", role="project_manager")
+    chunks = count_calls(monkeypatch, "_csv_chunk")
+
+    response = client.get("/api/exports/projects", params={"format": "csv"}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="projects.csv"'
+    assert response.text.startswith("id,name,description,")
+    assert '"Gemini, ""phase 2""\nrollout"' in response.text
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header[:2] == ["id", "name"]
+    assert [row[1] for row in rows] == projects
+    # One header chunk, then the rows in three batches
+    assert [len(args[0]) for args in chunks] == [1, 3, 3, 1]
+
+
+def test_exports_require_a_manager(client, make_user):
+    _, headers = make_user("dev@example.com")
+    assert client.get("/api/exports/projects", headers=headers).status_code == 403
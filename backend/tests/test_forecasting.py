@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from ml.allocation_optimization.capacity import CapacityCalendar
+from ml.pipeline import ResourceAllocationPipeline
+from ml.resource_forecasting.availability import WeeklyAvailabilityForecaster
+from ml.resource_forecasting.benchmark import make_allocations
+from ml.resource_forecasting.incremental import train_incremental
+from ml.resource_forecasting.model import TRAINING_PROFILES, ResourceForecaster
+
+
+@pytest.fixture
+def allocation_db(tmp_path):
+    """SQLite URL of an empty resource_allocations table, and a function adding n synthetic rows"""
+    url = "sqlite:///" + str(tmp_path / "history.db")
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE resource_allocations (id INTEGER PRIMARY KEY, employee_id INTEGER, project_id INTEGER, "
+            "start_date DATE, end_date DATE, hours_allocated FLOAT, allocation_percentage FLOAT)"
+        ))
+    added = 0
+
+    def add_rows(n):
+        nonlocal added
+        rows = make_allocations(n, num_employees=20, num_projects=10, num_skills=5, seed=added)
+        rows.drop(columns="skill_id").assign(id=range(added + 1, added + n + 1)).to_sql(
+            "resource_allocations", engine, index=False, if_exists="append"
+        )
+        added += n
+
+    yield url, add_rows
+    engine.dispose()
+
+
+def test_incremental_training_without_new_rows_keeps_the_serving_model(allocation_db, tmp_path):
+    url, add_rows = allocation_db
+    checkpoints = str(tmp_path / "checkpoints")
+    pipeline = ResourceAllocationPipeline()
+    serving = pipeline.forecaster
+
+    assert train_incremental(url, checkpoints) is None
+    pipeline.install_forecaster(None)
+    assert pipeline.forecaster is serving
+
+    add_rows(300)
+    params = {"profile": "fast", "n_jobs": 1}
+    forecaster = train_incremental(url, checkpoints, chunk_size=100, forecaster_params=params)
+    assert forecaster.trained and forecaster.version == 1 and forecaster.rows_seen == 300
+    regressor = forecaster.model.named_steps["regressor"]
+    assert regressor.n_jobs == 1 and regressor.max_depth == 10
+    pipeline.install_forecaster(forecaster)
+    assert pipeline.forecaster is forecaster
+
+    # Nothing new since the checkpoint: no new version, nothing to install
+    assert train_incremental(url, checkpoints, forecaster_params=params) is None
+    add_rows(100)
+    assert train_incremental(url, checkpoints, forecaster_params=params).version == 2
+
+
+@pytest.fixture(scope="module")
+def small_history():
+    return make_allocations(600, num_employees=30, num_projects=10, num_skills=5)
+
+
+@pytest.mark.parametrize("profile", sorted(TRAINING_PROFILES))
+def test_profile_trains_and_predicts(profile, small_history):
+    forecaster = ResourceForecaster(profile, n_jobs=1).train(small_history)
+
+    predictions = forecaster.predict_allocation(small_history.head(50))
+
+    assert forecaster.trained
+    assert predictions.shape == (50,)
+    actual = small_history["hours_allocated"].head(50).to_numpy()
+    # Better than predicting the mean
+    assert np.abs(predictions - actual).mean() < np.abs(actual - actual.mean()).mean()
+
+
+@pytest.mark.parametrize("profile, overrides", [
+    ("fast", {"n_estimators": 7, "max_depth": 3}),
+    ("balanced", {"min_samples_leaf": 5, "n_jobs": 1}),
+    ("exhaustive", {"n_estimators": 5}),
+    ("hist_gradient_boosting", {"max_iter": 15, "learning_rate": 0.3}),
+])
+def test_keyword_overrides_win_over_the_profile(profile, overrides, small_history):
+    forecaster = ResourceForecaster(profile, **overrides).train(small_history)
+
+    params = forecaster.model.named_steps["regressor"].get_params()
+    assert {name: params[name] for name in overrides} == overrides
+
+
+def test_open_ended_allocations_book_the_same_weeks_for_capacity_and_availability():
+    allocations = pd.DataFrame({
+        "employee_id": [1, 2, 3],
+        "start_date": [None, "2026-06-01", "2026-01-05"],
+        "end_date": ["2026-11-01", None, "2026-03-01"],
+        "hours_allocated": [20.0, 10.0, 40.0],
+        "allocation_percentage": [50.0, 25.0, 100.0],
+    })
+    weeks = pd.date_range("2026-10-05", periods=8, freq="W-MON")
+
+    forecaster = WeeklyAvailabilityForecaster(weekly_hours=40).fit(allocations, as_of="2026-10-05")
+    available = forecaster.predict(weeks)
+    # Missing start: booked up to its end date (before, it booked nothing); missing end: booked throughout
+    assert available.loc[1].tolist()[:4] == [20.0] * 4
+    assert available.loc[2].tolist() == [30.0] * 8
+
+    calendar = CapacityCalendar.from_allocations(
+        allocations, horizon_start=weeks[0], horizon_end=weeks[-1]
+    )
+    assert calendar.booked[0].tolist() == [50.0] * 4 + [0.0] * 4
+    assert calendar.booked[1].tolist() == [25.0] * 8
@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+from app.core.jobs import JobManager
+
+
+def wait_for(manager, job_id, predicate, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if predicate(job):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} stuck at {manager.get(job_id)}")
+
+
+def add(a, b, progress=None):
+    progress(0.5, "Adding")
+    return a + b
+
+
+def count_forever(progress=None):
+    step = 0
+    while True:
+        step += 1
+        progress(min(0.99, step / 1000), f"Step {step}")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=1)
+    yield manager
+    manager.shutdown()
+
+
+def test_submit_reports_success_and_runs_on_success(manager):
+    results = []
+    job_id = manager.submit(add, 2, 3, on_success=results.append, description="add")
+
+    job = wait_for(manager, job_id, lambda job: job["finished_at"] is not None)
+
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 1.0
+    assert job["description"] == "add"
+    assert results == [5]
+    assert [listed["id"] for listed in manager.list()] == [job_id]
+
+
+def test_cancel_stops_a_running_job(manager):
+    results = []
+    job_id = manager.submit(count_forever, on_success=results.append)
+    wait_for(manager, job_id, lambda job: job["status"] == "running" and job["progress"] > 0)
+
+    assert manager.cancel(job_id)
+
+    job = wait_for(manager, job_id, lambda job: job["finished_at"] is not None)
+    assert job["status"] == "cancelled"
+    assert results == []
+    # The worker is free again once the cancelled job has stopped
+    follow_up = manager.submit(add, 1, 1)
+    assert wait_for(manager, follow_up, lambda job: job["finished_at"] is not None)["status"] == "succeeded"
+    assert not manager.cancel(job_id)
+
+
+def test_cancel_unknown_job(manager):
+    assert manager.get("missing") is None
+    assert not manager.cancel("missing")
+
+
+def test_training_stops_at_the_next_round_after_cancel():
+    from app.core.jobs import JobCancelled
+    from ml.pipeline import train_components
+    from ml.resource_forecasting.benchmark import make_allocations
+
+    allocations = make_allocations(2000, num_employees=50, num_projects=20, num_skills=10)
+    messages = []
+
+    def progress(fraction, message=None):
+        messages.append(message)
+        if fraction > 0.3:
+            raise JobCancelled()
+
+    with pytest.raises(JobCancelled):
+        train_components(allocations, None, {"profile": "fast", "n_jobs": 1}, progress=progress)
+    assert any(message.startswith("Fitted") for message in messages)
+    assert "Training complete" not in messages
+
+
+def test_training_job_reads_the_history_in_the_worker(db, client, make_user):
+    from app.db.session import engine
+    from ml.pipeline import train_components_from_database
+    from ml.resource_forecasting.benchmark import make_allocations
+
+    _, headers = make_user("admin@example.com", role="admin")
+    database_url = engine.url.render_as_string(hide_password=False)
+    assert train_components_from_database(database_url) is None
+    response = client.post("/api/ml/train", headers=headers)
+    assert response.json()["status"] == "warning"
+
+    make_allocations(300, num_employees=20, num_projects=10, num_skills=5).drop(columns="skill_id").to_sql(
+        "resource_allocations", engine, index=False, if_exists="append"
+    )
+    messages = []
+    trained = train_components_from_database(
+        database_url, {"profile": "fast", "n_jobs": 1}, progress=lambda fraction, message: messages.append(message)
+    )
+
+    assert trained["forecaster"].trained
+    assert messages[0] == "Loading allocation history"
+    assert messages[-1] == "Training complete"
@@ -0,0 +1,289 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from ml.allocation_optimization.model import ResourceOptimizer
+from app.models.project import Project, ProjectSkillRequirement
+from app.models.skill import Skill
+from app.models.user import User
+
+
+def portfolio(available):
+    """Two single-role projects needing skill 1; available maps employee id -> free percentage"""
+    requirements = pd.DataFrame({
+        "project_id": [10, 20],
+        "skill_id": [1, 1],
+        "employees_requested": [1, 1],
+        "allocation_percentage": [50, 50],
+    })
+    employees = pd.DataFrame({
+        "id": list(available),
+        "available_percentage": list(available.values()),
+        "skill_ids": [[1]] * len(available),
+    })
+    skill_matches = {(1, 10): 0.9, (2, 20): 0.8, (3, 10): 0.5, (3, 20): 0.4}
+    return requirements, employees, skill_matches
+
+
+def staffed(assignments):
+    return {(a["employee_id"], a["project_id"]) for a in assignments}
+
+
+def test_warm_start_from_the_same_inputs_keeps_the_plan():
+    requirements, employees, skill_matches = portfolio({1: 100, 2: 100, 3: 100})
+    plan = ResourceOptimizer().optimize_portfolio(requirements, employees, skill_matches)
+
+    optimizer = ResourceOptimizer()
+    replanned = optimizer.optimize_portfolio(requirements, employees, skill_matches, previous_assignments=plan)
+
+    assert staffed(replanned) == staffed(plan) == {(1, 10), (2, 20)}
+    warm_start = optimizer.get_explanation()["warm_start"]
+    assert warm_start["previous_assignments"] == 2
+    assert not warm_start["restricted_to_affected"]
+
+
+def test_restricted_replan_only_moves_affected_employees():
+    requirements, employees, skill_matches = portfolio({1: 100, 2: 100, 3: 100})
+    plan = ResourceOptimizer().optimize_portfolio(requirements, employees, skill_matches)
+
+    # Employee 1 is booked elsewhere now; 3 takes over project 10 and 2 keeps project 20
+    requirements, employees, skill_matches = portfolio({1: 0, 2: 100, 3: 100})
+    optimizer = ResourceOptimizer()
+    replanned = optimizer.optimize_portfolio(
+        requirements, employees, skill_matches, previous_assignments=plan, affected_employee_ids=[1, 3]
+    )
+
+    assert staffed(replanned) == {(3, 10), (2, 20)}
+    assert optimizer.warm_start["restricted_to_affected"]
+    assert optimizer.warm_start["fixed_roles"] > 0
+
+
+def test_restricted_replan_falls_back_to_a_full_solve():
+    requirements, employees, skill_matches = portfolio({1: 100, 2: 100, 3: 100})
+    plan = ResourceOptimizer().optimize_portfolio(requirements, employees, skill_matches)
+    # Employee 2 also took on a role in project 10 in this (hand-edited) plan
+    plan.append({"employee_id": 2, "project_id": 10, "skill_id": 1})
+
+    # Keeping employee 2 on both projects now exceeds their capacity
+    requirements, employees, skill_matches = portfolio({1: 100, 2: 50, 3: 100})
+    requirements["employees_requested"] = 2
+    optimizer = ResourceOptimizer()
+    replanned = optimizer.optimize_portfolio(
+        requirements, employees, skill_matches, previous_assignments=plan, affected_employee_ids=[3]
+    )
+
+    assert not optimizer.warm_start["restricted_to_affected"]
+    assert sum(a["employee_id"] == 2 for a in replanned) == 1
+
+
+def test_optimize_portfolio_replans_from_the_callers_previous_plan(db, client, make_user, stub_encoder):
+    _, headers = make_user("pm@example.com", role="project_manager")
+    skill = Skill(name="Python")
+    projects = [
+        Project(name=f"Project {i}", description="Python service", status="active",
+                start_date=date(2026, 1, 5), end_date=date(2026, 3, 27))
+        for i in range(2)
+    ]
+    db.add_all([skill] + projects)
+    db.flush()
+    for project in projects:
+        db.add(ProjectSkillRequirement(project_id=project.id, skill_id=skill.id, employees_requested=1))
+    for i in range(3):
+        db.add(User(email=f"dev{i}@example.com", full_name=f"Dev {i}", role="employee", skills=[skill]))
+    db.commit()
+    project_ids = [project.id for project in projects]
+
+    first = client.post("/api/ml/optimize-portfolio", json={"project_ids": project_ids[:1]}, headers=headers)
+    assert first.status_code == 200
+    assert len(first.json()["assignments"]) == 1
+
+    # Add the second project; the employee already on the first keeps their role
+    second = client.post("/api/ml/optimize-portfolio", json={
+        "project_ids": project_ids,
+        "previous_plan": first.json(),
+        "changed_employee_ids": [],
+    }, headers=headers)
+    body = second.json()
+    assert body["status"] == "success"
+    assert len(body["assignments"]) == 2
+    assert first.json()["assignments"][0]["employee_id"] in {
+        a["employee_id"] for a in body["assignments"] if a["project_id"] == project_ids[0]
+    }
+    assert body["explanation"]["warm_start"]["restricted_to_affected"]
+
+    bad = client.post("/api/ml/optimize-portfolio", json={"project_ids": project_ids, "previous_plan": [1]},
+                      headers=headers)
+    assert bad.status_code == 400
+
+
+def allocation_inputs(efficiency=1.0):
+    """Two one-hour projects; employee 3 has room for both"""
+    projects = pd.DataFrame({"id": [1, 2], "hours_needed": [1, 1]})
+    employees = pd.DataFrame({"id": [1, 2, 3], "available_hours": [1, 1, 2], "efficiency": [efficiency] * 3})
+    skill_matches = {(1, 1): 0.9, (2, 2): 0.8, (3, 1): 0.2, (3, 2): 0.1, (1, 2): 0.05}
+    return projects, employees, skill_matches
+
+
+def test_sparse_model_only_creates_variables_for_good_matches():
+    projects, employees, skill_matches = allocation_inputs()
+
+    _, dense_pairs, _ = ResourceOptimizer().build_model(projects, employees, skill_matches)
+    _, sparse_pairs, _ = ResourceOptimizer(min_match_score=0.5).build_model(projects, employees, skill_matches)
+
+    assert len(dense_pairs) == 6
+    assert sparse_pairs == [(1, 1), (2, 2)]
+
+
+def test_sparse_and_dense_allocations():
+    projects, employees, skill_matches = allocation_inputs()
+
+    dense = ResourceOptimizer().optimize_allocation(projects, employees, skill_matches)
+    sparse = ResourceOptimizer().optimize_allocation(projects, employees, skill_matches, min_match_score=0.5)
+
+    assert staffed(dense) == {(1, 1), (2, 2), (3, 1), (3, 2)}
+    assert staffed(sparse) == {(1, 1), (2, 2)}
+    assert {a["skill_match_score"] for a in sparse} == {0.9, 0.8}
+
+
+def test_allocation_respects_efficiency_and_missing_candidates():
+    projects, employees, skill_matches = allocation_inputs(efficiency=0.5)
+    # Half-efficient employees need a partner, but each project has one candidate above the threshold
+    assert ResourceOptimizer(min_match_score=0.5).optimize_allocation(projects, employees, skill_matches) == []
+
+    projects, employees, skill_matches = allocation_inputs()
+    del skill_matches[(2, 2)]
+    # Nobody above the threshold can staff project 2
+    assert ResourceOptimizer(min_match_score=0.5).optimize_allocation(projects, employees, skill_matches) == []
+
+
+def test_portfolio_fills_roles_before_chasing_match_scores():
+    requirements = pd.DataFrame({
+        "project_id": [10, 20], "skill_id": [1, 2], "employees_requested": [1, 1], "allocation_percentage": [50, 50],
+    })
+    employees = pd.DataFrame({"id": [1, 2], "available_percentage": [50, 100], "skill_ids": [[1, 2], [1]]})
+    # Employee 1 matches project 10 best, but only they can staff project 20
+    skill_matches = {(1, 10): 0.9, (1, 20): 0.6, (2, 10): 0.1}
+
+    assignments = ResourceOptimizer().optimize_portfolio(requirements, employees, skill_matches)
+
+    assert staffed(assignments) == {(1, 20), (2, 10)}
+    assert {(a["employee_id"], a["skill_id"], a["allocation_percentage"]) for a in assignments} == {
+        (1, 2, 50.0), (2, 1, 50.0)
+    }
+
+
+def test_portfolio_limits_roles_per_employee_and_requirement():
+    requirements = pd.DataFrame({
+        "project_id": [10, 10, 20], "skill_id": [1, 2, 1], "employees_requested": [1, 1, 2],
+        "allocation_percentage": [30, 30, 40],
+    })
+    employees = pd.DataFrame({
+        "id": [1, 2, 3], "available_percentage": [100, 100, 30], "skill_ids": [[1, 2], [2], [1]],
+    })
+    skill_matches = {(1, 10): 0.9, (2, 10): 0.5, (1, 20): 0.5, (3, 20): 0.9}
+
+    assignments = ResourceOptimizer().optimize_portfolio(requirements, employees, skill_matches)
+
+    # Employee 1 holds both of project 10's skills but fills one role there;
+    # employee 3 has no room for a 40% role
+    assert {(a["employee_id"], a["project_id"], a["skill_id"]) for a in assignments} == {
+        (1, 10, 1), (2, 10, 2), (1, 20, 1)
+    }
+
+
+def test_portfolio_with_nobody_qualified_returns_an_empty_plan():
+    requirements, employees, skill_matches = portfolio({1: 100})
+    employees["skill_ids"] = [[2]]
+
+    optimizer = ResourceOptimizer()
+    assert optimizer.optimize_portfolio(requirements, employees, skill_matches) == []
+    assert optimizer.get_explanation()["status"] == "OPTIMAL"
+
+
+def weekly_portfolio(percentages):
+    """Project 10 in January, 20 in February and 30 from mid-February into March, all needing skill 1"""
+    requirements = pd.DataFrame({
+        "project_id": [10, 20, 30], "skill_id": [1, 1, 1], "employees_requested": [1, 1, 1],
+        "allocation_percentage": percentages,
+        "start_date": pd.to_datetime(["2026-01-05", "2026-02-02", "2026-02-16"]),
+        "end_date": pd.to_datetime(["2026-01-30", "2026-02-27", "2026-03-13"]),
+    })
+    employees = pd.DataFrame({"id": [1], "available_percentage": [100], "skill_ids": [[1]]})
+    return requirements, employees, {(1, 10): 0.9, (1, 20): 0.8, (1, 30): 0.7}
+
+
+def calendar_for(bookings):
+    from ml.allocation_optimization.capacity import CapacityCalendar
+
+    allocations = pd.DataFrame(bookings, columns=["employee_id", "start_date", "end_date", "allocation_percentage"])
+    for column in ("start_date", "end_date"):
+        allocations[column] = pd.to_datetime(allocations[column])
+    return CapacityCalendar.from_allocations(allocations, employee_ids=[1], horizon_start=date(2026, 1, 5),
+                                             horizon_end=date(2026, 3, 27))
+
+
+def test_weekly_capacity_allows_back_to_back_projects():
+    requirements, employees, skill_matches = weekly_portfolio([80, 80, 80])
+
+    overall = ResourceOptimizer().optimize_portfolio(requirements, employees, skill_matches)
+    weekly = ResourceOptimizer().optimize_portfolio(requirements, employees, skill_matches, calendar=calendar_for([]))
+
+    # One overall percentage fits a single 80% role; per week, the January and
+    # one of the overlapping February projects fit
+    assert staffed(overall) == {(1, 10)}
+    assert staffed(weekly) == {(1, 10), (1, 20)}
+
+
+def test_weekly_capacity_subtracts_existing_bookings():
+    requirements, employees, skill_matches = weekly_portfolio([50, 50, 50])
+    calendar = calendar_for([(1, "2026-01-12", "2026-01-16", 60)])
+
+    assignments = ResourceOptimizer().optimize_portfolio(requirements, employees, skill_matches, calendar=calendar)
+
+    # A single booked week in January rules out project 10; 20 and 30 share 100% in their overlap
+    assert staffed(assignments) == {(1, 20), (1, 30)}
+
+
+def test_weekly_capacity_groups_share_weeks_and_skip_loose_ones():
+    requirements, _, _ = weekly_portfolio([50, 60, 60])
+    calendar = calendar_for([])
+    bounds = np.array([calendar.week_range(s, e) for s, e in zip(requirements["start_date"], requirements["end_date"])])
+
+    groups = list(ResourceOptimizer()._weekly_capacity_groups(
+        calendar, 1, np.arange(3), bounds, np.array([50, 60, 60])
+    ))
+
+    # Only the overlap of projects 20 and 30 can exceed capacity
+    assert [(members.tolist(), capacity) for members, capacity in groups] == [([1, 2], 100)]
+
+
+def test_solver_limits_and_incumbents_are_reported():
+    requirements, employees, skill_matches = portfolio({1: 100, 2: 100, 3: 100})
+    seen = []
+    optimizer = ResourceOptimizer(max_time_in_seconds=5, num_search_workers=1, relative_gap_limit=0.0,
+                                  on_solution=seen.append)
+    assert optimizer.get_explanation() == "No optimization has been performed yet."
+
+    optimizer.optimize_portfolio(requirements, employees, skill_matches)
+
+    parameters = optimizer.solver.parameters
+    assert (parameters.max_time_in_seconds, parameters.num_workers, parameters.relative_gap_limit) == (5, 1, 0)
+    explanation = optimizer.get_explanation()
+    assert explanation["status"] == "OPTIMAL"
+    assert explanation["optimality_gap"] == 0
+    assert explanation["objective_value"] == 100 + 90 + 100 + 80
+    assert explanation["num_incumbents"] == len(seen) == len(optimizer.incumbents) >= 1
+    objectives = [incumbent["objective_value"] for incumbent in seen]
+    assert objectives == sorted(objectives) and objectives[-1] == explanation["objective_value"]
+    assert all(incumbent["best_objective_bound"] >= incumbent["objective_value"] for incumbent in seen)
+
+
+def test_infeasible_allocation_returns_no_plan():
+    projects, employees, skill_matches = allocation_inputs()
+    employees["available_hours"] = 0
+
+    optimizer = ResourceOptimizer(max_time_in_seconds=5)
+    assert optimizer.optimize_allocation(projects, employees, skill_matches) == []
+    assert optimizer.get_explanation()["status"] == "INFEASIBLE"
+    assert optimizer.get_explanation()["num_incumbents"] == 0
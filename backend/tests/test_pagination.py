@@ -0,0 +1,35 @@
+from app.api.pagination import DEFAULT_PAGE_SIZE, NEXT_CURSOR_HEADER
+from app.models.skill import Skill
+
+
+def add_skills(db, count):
+    db.add_all(Skill(name=f"skill-{i:04d}") for i in range(count))
+    db.commit()
+
+
+def test_list_without_limit_returns_every_row(db, client, make_user):
+    _, headers = make_user("pm@example.com", role="project_manager")
+    add_skills(db, DEFAULT_PAGE_SIZE + 20)
+
+    response = client.get("/api/skills", headers=headers)
+
+    assert response.status_code == 200
+    assert len(response.json()) == DEFAULT_PAGE_SIZE + 20
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_limit_pages_through_the_cursor(db, client, make_user):
+    _, headers = make_user("pm@example.com", role="project_manager")
+    add_skills(db, 45)
+
+    names, params = [], {"limit": 20}
+    while True:
+        response = client.get("/api/skills", params=params, headers=headers)
+        assert response.status_code == 200
+        assert len(response.json()) <= 20
+        names += [skill["name"] for skill in response.json()]
+        if NEXT_CURSOR_HEADER not in response.headers:
+            break
+        params = {"limit": 20, "cursor": response.headers[NEXT_CURSOR_HEADER]}
+
+    assert names == [f"skill-{i:04d}" for i in range(45)]
@@ -0,0 +1,51 @@
+import asyncio
+
+import httpx
+from passlib.context import CryptContext
+
+from app.api.endpoints import auth
+from app.models.user import User
+
+
+def test_login_upgrades_a_lower_cost_hash(db, client, monkeypatch):
+    stronger = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5)
+    monkeypatch.setattr(auth, "pwd_context", stronger)
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+    db.add(User(email="dev@example.com", full_name="dev", hashed_password=old_hash, role="employee"))
+    db.commit()
+
+    response = client.post("/api/auth/login", data={"username": "dev@example.com", "password": "secret"})
+
+    assert response.status_code == 200
+    db.expire_all()
+    new_hash = db.query(User).filter(User.email == "dev@example.com").one().hashed_password
+    assert new_hash != old_hash and new_hash.startswith("$2b$05$")
+    assert stronger.verify("secret", new_hash)
+    # The upgraded hash needs no further rehash
+    assert client.post("/api/auth/login", data={"username": "dev@example.com", "password": "secret"}).status_code == 200
+    db.expire_all()
+    assert db.query(User).filter(User.email == "dev@example.com").one().hashed_password == new_hash
+
+
+def test_concurrent_logins_succeed(db):
+    from app.main import app
+
+    emails = [f"user{i}@example.com" for i in range(8)]
+    for email in emails:
+        db.add(User(email=email, full_name=email, hashed_password=auth.get_password_hash("secret"), role="employee"))
+    db.add(User(email="wrong@example.com", full_name="wrong", hashed_password=auth.get_password_hash("other"), role="employee"))
+    db.commit()
+    completed = auth.password_executor.stats()["completed"]
+
+    async def login_all():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/api/auth/login", data={"username": email, "password": "secret"})
+                for email in emails + ["wrong@example.com"]
+            ))
+
+    responses = asyncio.run(login_all())
+
+    assert [r.status_code for r in responses] == [200] * len(emails) + [401]
+    assert [r.json()["email"] for r in responses[:-1]] == emails
+    assert auth.password_executor.stats()["completed"] - completed == len(emails) + 1
@@ -0,0 +1,65 @@
+from contextlib import contextmanager
+from datetime import date
+
+from sqlalchemy import event
+
+from app.db.session import async_engine
+from app.models.project import Project, ProjectSkillRequirement
+from app.models.resource_allocation import ResourceAllocation
+from app.models.skill import Skill
+from app.models.user import User
+
+
+@contextmanager
+def count_statements():
+    """Count the SQL statements the async engine executes inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def staffed_project(db, name, num_candidates):
+    """A project needing two skills, with num_candidates employees holding them and busy elsewhere"""
+    skills = [Skill(name=f"{name} skill {i}") for i in range(2)]
+    project = Project(name=name, status="active", start_date=date(2026, 1, 5), end_date=date(2026, 6, 26))
+    other = Project(name=f"{name} elsewhere", status="active")
+    db.add_all(skills + [project, other])
+    db.flush()
+    for skill in skills:
+        db.add(ProjectSkillRequirement(project_id=project.id, skill_id=skill.id, employees_requested=1))
+    for i in range(num_candidates):
+        employee = User(email=f"{name}-{i}@example.com", full_name=f"{name} {i}", role="employee")
+        employee.skills = [skills[i % 2]]
+        db.add(employee)
+        db.flush()
+        db.add(ResourceAllocation(
+            employee_id=employee.id, project_id=other.id, allocation_percentage=50,
+            hours_allocated=20, status="confirmed"
+        ))
+    db.commit()
+    return project.id
+
+
+def test_match_employees_query_count_does_not_grow_with_candidates(db, client, make_user):
+    _, headers = make_user("pm@example.com", role="project_manager")
+    small = staffed_project(db, "small", 5)
+    large = staffed_project(db, "large", 50)
+    # Resolve the token once so both counts hit the auth cache alike
+    client.get("/api/auth/users/me", headers=headers)
+
+    counts = {}
+    for project_id, num_candidates in ((small, 5), (large, 50)):
+        with count_statements() as statements:
+            response = client.get(f"/api/projects/{project_id}/match-employees", headers=headers)
+        assert response.status_code == 200
+        assert sum(len(employees) for employees in response.json().values()) == num_candidates
+        counts[num_candidates] = len(statements)
+
+    assert counts[5] == counts[50]
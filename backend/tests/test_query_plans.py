@@ -0,0 +1,121 @@
+import os
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, select, text
+
+from app.db.session import Base
+from app.models import User, Project, ProjectSkillRequirement, ResourceAllocation, user_skills
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Hot filter paths from the endpoints and the index each one should use
+HOT_QUERIES = [
+    (
+        "active allocations per employee (ledger, capacity calendar, match-employees)",
+        select(ResourceAllocation.id).where(
+            ResourceAllocation.employee_id.in_([1, 2, 3]),
+            ResourceAllocation.status != "completed"
+        ),
+        "ix_resource_allocations_employee_id_status",
+    ),
+    (
+        "employee's allocation on a project (allocate-employees, remove-allocation)",
+        select(ResourceAllocation.id).where(
+            ResourceAllocation.project_id == 1,
+            ResourceAllocation.employee_id == 2,
+            ResourceAllocation.status != "completed"
+        ),
+        "ix_resource_allocations_project_id_employee_id_status",
+    ),
+    (
+        "allocations of a project",
+        select(ResourceAllocation.id).where(ResourceAllocation.project_id == 1),
+        "ix_resource_allocations_project_id_employee_id_status",
+    ),
+    (
+        "skill requirements of a project",
+        select(ProjectSkillRequirement.id).where(ProjectSkillRequirement.project_id == 1),
+        "ix_project_skill_requirements_project_id",
+    ),
+    (
+        "users holding a skill (match-employees candidates)",
+        select(user_skills.c.user_id).where(user_skills.c.skill_id.in_([1, 2])),
+        "ix_user_skills_skill_id_user_id",
+    ),
+    (
+        "active employees with availability (recommend-resources)",
+        select(User.id).where(
+            User.is_active == True,
+            User.role == "employee",
+            User.availability_percentage > 0
+        ),
+        "ix_users_is_active_role_availability",
+    ),
+    (
+        "keyset page of users by role (GET /auth/users?role=)",
+        select(User.id).where(User.role == "employee", User.id > 1000).order_by(User.id).limit(101),
+        "ix_users_role_id",
+    ),
+    (
+        "keyset page of users by department (GET /auth/users?department=)",
+        select(User.id).where(User.department == "Engineering", User.id > 1000).order_by(User.id).limit(101),
+        "ix_users_department_id",
+    ),
+    (
+        "keyset page of projects by status (GET /projects?status=)",
+        select(Project.id).where(Project.status == "active", Project.id > 1000).order_by(Project.id).limit(101),
+        "ix_projects_status_id",
+    ),
+]
+
+
+def query_plan(connection, statement):
+    """EXPLAIN output for a statement as one string"""
+    compiled = statement.compile(connection, compile_kwargs={"literal_binds": True})
+    prefix = "EXPLAIN QUERY PLAN " if connection.dialect.name == "sqlite" else "EXPLAIN "
+    rows = connection.execute(text(prefix + str(compiled))).fetchall()
+    return "\n".join(" ".join(str(value) for value in row) for row in rows)
+
+
+def migrate(url):
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+
+
+@pytest.fixture(scope="module", params=["create_all", "alembic"])
+def scratch_engine(request, tmp_path_factory):
+    """Empty database built the way the app does it (create_all) or from the migration chain"""
+    url = "sqlite:///" + str(tmp_path_factory.mktemp(request.param) / "plans.db")
+    engine = create_engine(url)
+    if request.param == "create_all":
+        Base.metadata.create_all(bind=engine)
+    else:
+        migrate(url)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize(
+    "statement, index_name",
+    [(statement, index_name) for _, statement, index_name in HOT_QUERIES],
+    ids=[description for description, _, _ in HOT_QUERIES]
+)
+def test_hot_query_uses_its_index(scratch_engine, statement, index_name):
+    with scratch_engine.connect() as connection:
+        plan = query_plan(connection, statement)
+    assert index_name in plan, plan
+
+
+def test_migrations_build_the_model_schema(tmp_path):
+    url = "sqlite:///" + str(tmp_path / "migrated.db")
+    migrate(url)
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        assert compare_metadata(MigrationContext.configure(connection), Base.metadata) == []
+    engine.dispose()
@@ -0,0 +1,104 @@
+from datetime import date
+
+from app.models.project import Project, ProjectSkillRequirement
+from app.models.resource_allocation import ResourceAllocation
+from app.models.skill import Skill
+
+
+def project_with_staff(db, employee_id, manager_id):
+    """A project ProjectResponse accepts, with one requirement and one allocation"""
+    skill = Skill(name="Python")
+    project = Project(
+        name="Apollo", description="Data platform", status="active", priority=3, manager_id=manager_id,
+        start_date=date(2026, 1, 5), end_date=date(2026, 6, 26)
+    )
+    db.add_all([skill, project])
+    db.flush()
+    db.add(ProjectSkillRequirement(project_id=project.id, skill_id=skill.id, employees_requested=1))
+    db.add(ResourceAllocation(employee_id=employee_id, project_id=project.id, allocation_percentage=50, status="confirmed"))
+    db.commit()
+    return project.id, skill.id
+
+
+def test_etag_revalidation_and_invalidation_on_update(db, client, make_user):
+    manager, headers = make_user("pm@example.com", role="project_manager")
+    employee, _ = make_user("dev@example.com")
+    project_id, _ = project_with_staff(db, employee.id, manager.id)
+
+    first = client.get("/api/projects/", headers=headers)
+    assert first.status_code == 200
+    assert first.json()[0]["resource_allocations"][0]["employee_id"] == employee.id
+    assert first.json()[0]["start_date"] == "2026-01-05"
+    etag = first.headers["ETag"]
+
+    revalidated = client.get("/api/projects/", headers={**headers, "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == etag
+
+    removed = client.post(
+        f"/api/projects/{project_id}/remove-allocation", json={"employee_id": employee.id}, headers=headers
+    )
+    assert removed.status_code == 200
+
+    changed = client.get("/api/projects/", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()[0]["resource_allocations"] == []
+
+
+def test_deleting_a_user_invalidates_cached_projects(db, client, make_user):
+    manager, headers = make_user("pm@example.com", role="project_manager")
+    employee, _ = make_user("dev@example.com")
+    project_id, _ = project_with_staff(db, employee.id, manager.id)
+
+    listed = client.get("/api/projects/", headers=headers)
+    detail = client.get(f"/api/projects/{project_id}", headers=headers)
+    assert detail.json()["resource_allocations"][0]["employee_id"] == employee.id
+
+    assert client.delete(f"/api/auth/users/{employee.id}", headers=headers).status_code == 200
+
+    for path, cached in (("/api/projects/", listed), (f"/api/projects/{project_id}", detail)):
+        response = client.get(path, headers={**headers, "If-None-Match": cached.headers["ETag"]})
+        assert response.status_code == 200, path
+    # The allocation lost its employee, so the project no longer lists it
+    detail = client.get(f"/api/projects/{project_id}", headers=headers).json()
+    assert detail["resource_allocations"] == []
+
+
+def test_deleting_a_skill_invalidates_cached_projects(db, client, make_user):
+    manager, headers = make_user("pm@example.com", role="project_manager")
+    employee, _ = make_user("dev@example.com")
+    project_id, skill_id = project_with_staff(db, employee.id, manager.id)
+
+    listed = client.get("/api/projects/", headers=headers)
+    detail = client.get(f"/api/projects/{project_id}", headers=headers)
+    assert detail.json()["skill_requirements"][0]["skill_id"] == skill_id
+
+    assert client.delete(f"/api/skills/{skill_id}", headers=headers).status_code == 204
+
+    for path, cached in (("/api/projects/", listed), (f"/api/projects/{project_id}", detail)):
+        response = client.get(path, headers={**headers, "If-None-Match": cached.headers["ETag"]})
+        assert response.status_code == 200, path
+        body = response.json()
+        # The requirement lost its skill, so the project no longer lists it
+        assert (body[0] if isinstance(body, list) else body)["skill_requirements"] == []
+
+
+def test_cached_bodies_are_validated_by_the_response_model(db, make_user):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app, raise_server_exceptions=False)
+    manager, headers = make_user("pm@example.com", role="project_manager")
+    employee, _ = make_user("dev@example.com")
+    project_with_staff(db, employee.id, manager.id)
+
+    skills = client.get("/api/skills", headers=headers).json()
+    assert [sorted(skill) for skill in skills] == [["id", "name"]]
+
+    # As on an uncached response_model route, a row the model rejects is a
+    # server error rather than a cached body that breaks the schema
+    db.add(Project(name="Draft", status="planning"))  # no dates, description or manager
+    db.commit()
+    assert client.get("/api/projects/", headers=headers).status_code == 500
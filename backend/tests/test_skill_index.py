@@ -0,0 +1,87 @@
+import numpy as np
+
+from ml.skill_matching.vector_index import FlatIndex, IVFIndex, recall_at_k
+from app.models.project import Project
+from app.models.skill import Skill
+from app.models.user import User
+
+
+def clustered_vectors(center, count, seed):
+    rng = np.random.default_rng(seed)
+    return center + 0.05 * rng.normal(size=(count, len(center)))
+
+
+def test_ivf_add_many_trains_on_every_vector():
+    rng = np.random.default_rng(0)
+    early, late = rng.normal(size=(2, 16))
+    # The first vectors to arrive all come from one cluster, most of the data from another
+    vectors = np.vstack([clustered_vectors(early, 16, 1), clustered_vectors(late, 200, 2)])
+
+    index = IVFIndex(n_lists=4, n_probe=1).add_many((i, vector) for i, vector in enumerate(vectors))
+
+    assert index.is_trained
+    assert sum(len(rows) for rows in index._lists) == len(vectors)
+    late_direction = late / np.linalg.norm(late)
+    assert (index.centroids @ late_direction).max() > 0.9
+
+
+def clustered_index(index):
+    """Eight clusters of 25 employees with two skill vectors each, plus queries near each cluster"""
+    rng = np.random.default_rng(3)
+    centers = rng.normal(size=(8, 16))
+    for c, center in enumerate(centers):
+        for i in range(25):
+            index.add(c * 100 + i, clustered_vectors(center, 2, seed=c * 100 + i))
+    return index, np.vstack([clustered_vectors(center, 1, seed=900 + c) for c, center in enumerate(centers)])
+
+
+def test_flat_index_is_exact():
+    index, queries = clustered_index(FlatIndex())
+    best_key, best_score = index.search(queries[0], k=1)[0]
+    vectors = index.get(best_key)
+
+    assert best_key // 100 == 0
+    assert np.isclose(best_score, (vectors @ (queries[0] / np.linalg.norm(queries[0]))).max())
+    assert recall_at_k(index, queries, k=10) == 1.0
+
+
+def test_ivf_recall_tracks_the_probed_lists():
+    index, queries = clustered_index(IVFIndex(n_lists=8, n_probe=2))
+    assert index.is_trained
+    assert recall_at_k(index, queries, k=10) >= 0.9
+
+    index.n_probe = index.n_lists
+    assert recall_at_k(index, queries, k=10) == 1.0
+
+
+def test_removed_keys_leave_the_ivf_results():
+    index, queries = clustered_index(IVFIndex(n_lists=8, n_probe=8))
+    best_key, _ = index.search(queries[0], k=1)[0]
+
+    index.remove(best_key)
+
+    assert best_key not in index
+    assert best_key not in {key for key, _ in index.search(queries[0], k=25)}
+    assert recall_at_k(index, queries, k=10) == 1.0
+
+
+def test_build_skill_index_reports_recall(db, client, make_user, stub_encoder, monkeypatch):
+    from app.api.endpoints.ml import pipeline
+    monkeypatch.setattr(pipeline.skill_matcher, "index", None)
+    _, headers = make_user("admin@example.com", role="admin")
+    skills = [Skill(name=name) for name in ("Python", "SQL", "React", "Kubernetes")]
+    db.add_all(skills)
+    for i in range(6):
+        db.add(User(email=f"dev{i}@example.com", full_name=f"Dev {i}", role="employee",
+                    skills=[skills[i % 4], skills[(i + 1) % 4]]))
+    db.add(Project(name="Apollo", description="Data platform in Python and SQL", status="active"))
+    db.commit()
+
+    response = client.post("/api/ml/skill-index/build", json={"backend": "flat", "k": 3}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["employees_indexed"] == 6
+    assert response.json()["recall_at_k"] == 1.0
+    assert len(pipeline.skill_matcher.index) == 6
+    # Skills shared by several employees were encoded once
+    assert len(stub_encoder.encoded) == len(set(stub_encoder.encoded))
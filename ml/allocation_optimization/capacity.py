@@ -0,0 +1,87 @@
+# Weekly capacity calendar built from resource allocations
+import numpy as np
+import pandas as pd
+from ml.utils.weeks import booking_matrix, week_number
+
+
+class CapacityCalendar:
+    """
+    Booked allocation percentage per employee per week.
+
+    The calendar is a dense float32 array of shape (employees, weeks) covering
+    [start_week, start_week + num_weeks). Allocations without a start or end
+    date are treated as open-ended and book every week of the horizon on that
+    side.
+    """
+
+    def __init__(self, employee_ids, start_week, booked):
+        self.employee_ids = list(employee_ids)
+        self.start_week = int(start_week)
+        self.booked = booked
+        self._positions = {emp_id: i for i, emp_id in enumerate(self.employee_ids)}
+
+    @property
+    def num_weeks(self):
+        return self.booked.shape[1]
+
+    @classmethod
+    def from_allocations(cls, allocations, employee_ids=None, horizon_start=None, horizon_end=None):
+        """
+        Build the calendar from a DataFrame with employee_id, start_date,
+        end_date and allocation_percentage columns.
+
+        Booking is done by ml.utils.weeks.booking_matrix, the same difference
+        array the availability forecaster uses, so the two agree on week
+        numbering and on open-ended allocations.
+        """
+        starts = week_number(allocations['start_date']) if len(allocations) else np.zeros(0)
+        ends = week_number(allocations['end_date']) if len(allocations) else np.zeros(0)
+        known = np.concatenate([starts[~np.isnan(starts)], ends[~np.isnan(ends)]])
+
+        if horizon_start is not None:
+            first_week = int(week_number([horizon_start])[0])
+        else:
+            first_week = int(known.min()) if len(known) else int(week_number([pd.Timestamp.today()])[0])
+        if horizon_end is not None:
+            last_week = int(week_number([horizon_end])[0])
+        else:
+            last_week = int(known.max()) if len(known) else first_week
+        last_week = max(last_week, first_week)
+        num_weeks = last_week - first_week + 1
+
+        if employee_ids is None:
+            employee_ids = pd.unique(allocations['employee_id']) if len(allocations) else []
+        employee_ids = list(employee_ids)
+        booked = booking_matrix(
+            employee_ids,
+            allocations['employee_id'] if len(allocations) else [],
+            starts, ends,
+            allocations['allocation_percentage'] if len(allocations) else [],
+            first_week, num_weeks, dtype=np.float32
+        )
+        return cls(employee_ids, first_week, booked)
+
+    def week_range(self, start_date, end_date):
+        """Calendar column slice covering [start_date, end_date] (whole horizon if a date is missing)"""
+        start, end = week_number([start_date, end_date])
+        start = 0 if np.isnan(start) else int(start) - self.start_week
+        end = self.num_weeks - 1 if np.isnan(end) else int(end) - self.start_week
+        return max(start, 0), min(end, self.num_weeks - 1)
+
+    def remaining(self, employee_id, capacity=100.0):
+        """Remaining weekly capacity for one employee (full capacity if unknown)"""
+        pos = self._positions.get(employee_id)
+        if pos is None:
+            return np.full(self.num_weeks, capacity, dtype=np.float32)
+        return capacity - self.booked[pos]
+
+    def min_remaining(self, employee_id, start_date, end_date, capacity=100.0):
+        """Smallest remaining capacity for an employee over a date range"""
+        start, end = self.week_range(start_date, end_date)
+        if start > end:
+            return capacity
+        return float(self.remaining(employee_id, capacity)[start:end + 1].min())
+
+# Example usage:
+# calendar = CapacityCalendar.from_allocations(allocations_df)
+# calendar.min_remaining(employee_id, project_start, project_end)
@@ -3,85 +3,407 @@ from ortools.sat.python import cp_model
 import pandas as pd
 import numpy as np
 
+def _group_positions(keys, num_groups):
+    """Return a list with, for each group 0..num_groups-1, the positions whose key is that group"""
+    order = np.argsort(keys, kind='stable')
+    bounds = np.searchsorted(keys[order], np.arange(num_groups + 1))
+    return [order[bounds[g]:bounds[g + 1]] for g in range(num_groups)]
+
+class IncumbentCallback(cp_model.CpSolverSolutionCallback):
+    """Records every improving solution found during search and optionally forwards it"""
+    
+    def __init__(self, on_solution=None):
+        super().__init__()
+        self.on_solution = on_solution
+        self.incumbents = []
+    
+    def on_solution_callback(self):
+        incumbent = {
+            'objective_value': self.ObjectiveValue(),
+            'best_objective_bound': self.BestObjectiveBound(),
+            'wall_time': self.WallTime()
+        }
+        self.incumbents.append(incumbent)
+        if self.on_solution is not None:
+            self.on_solution(incumbent)
+
 class ResourceOptimizer:
-    def __init__(self):
+    def __init__(self, min_match_score=None, max_time_in_seconds=None, num_search_workers=None,
+                 relative_gap_limit=None, accept_feasible=True, on_solution=None):
         self.model = None
         self.solver = None
+        self.status = None
+        self.incumbents = []
+        # Only (employee, project) pairs scoring at least this much get a decision
+        # variable; None keeps every pair
+        self.min_match_score = min_match_score
+        # Search limits; None keeps the CP-SAT default
+        self.max_time_in_seconds = max_time_in_seconds
+        self.num_search_workers = num_search_workers
+        self.relative_gap_limit = relative_gap_limit
+        # Return the best plan found when the time limit stops the search early
+        # (otherwise only proven-optimal plans are returned)
+        self.accept_feasible = accept_feasible
+        # Called with each improving incumbent as the search runs
+        self.on_solution = on_solution
+        # How the last optimize_portfolio run used a previous plan, if it got one
+        self.warm_start = None
+    
+    def _solve(self, model):
+        """Solve model with the configured limits and return True if a usable plan was found"""
+        solver = cp_model.CpSolver()
+        if self.max_time_in_seconds is not None:
+            solver.parameters.max_time_in_seconds = float(self.max_time_in_seconds)
+        if self.num_search_workers is not None:
+            solver.parameters.num_workers = int(self.num_search_workers)
+        if self.relative_gap_limit is not None:
+            solver.parameters.relative_gap_limit = float(self.relative_gap_limit)
         
-    def optimize_allocation(self, projects, employees, skill_matches):
+        callback = IncumbentCallback(self.on_solution)
+        status = solver.Solve(model, callback)
+        
+        self.model = model
+        self.solver = solver
+        self.status = status
+        self.incumbents = callback.incumbents
+        
+        if status == cp_model.OPTIMAL:
+            return True
+        return status == cp_model.FEASIBLE and self.accept_feasible
+        
+    def _candidate_pairs(self, emp_index, proj_index, skill_matches, min_match_score):
+        """Return (employee position, project position, score) arrays for the decision variables"""
+        if min_match_score is None:
+            # Dense: every employee can be assigned to every project
+            emp_pos = np.repeat(np.arange(len(emp_index)), len(proj_index))
+            proj_pos = np.tile(np.arange(len(proj_index)), len(emp_index))
+            scores = np.array([
+                skill_matches.get((emp_index[e], proj_index[p]), 0)
+                for e, p in zip(emp_pos.tolist(), proj_pos.tolist())
+            ], dtype=float)
+            return emp_pos, proj_pos, scores
+        
+        # Sparse: only walk the scored pairs instead of the full employee x project grid
+        emp_lookup = {emp_id: i for i, emp_id in enumerate(emp_index)}
+        proj_lookup = {proj_id: i for i, proj_id in enumerate(proj_index)}
+        emp_pos, proj_pos, scores = [], [], []
+        for (emp_id, proj_id), score in skill_matches.items():
+            if score >= min_match_score and emp_id in emp_lookup and proj_id in proj_lookup:
+                emp_pos.append(emp_lookup[emp_id])
+                proj_pos.append(proj_lookup[proj_id])
+                scores.append(score)
+        return (np.array(emp_pos, dtype=np.int64), np.array(proj_pos, dtype=np.int64),
+                np.array(scores, dtype=float))
+    
+    def build_model(self, projects, employees, skill_matches, min_match_score=None):
         """
-        Optimize resource allocation based on:
-        - Project requirements
-        - Employee availability
-        - Employee skills
-        - Skill-project match scores
+        Build the CP-SAT model from pre-indexed arrays.
+        
+        Hours, availability and efficiency are pulled out of the DataFrames once
+        and constraints are written as weighted sums over the candidate pairs,
+        so no DataFrame filtering happens while the model is built.
+        Returns (model, pairs, variables) where pairs[i] = (employee_id, project_id).
         """
-        # Create the optimization model
+        if min_match_score is None:
+            min_match_score = self.min_match_score
+        emp_index = employees['id'].tolist()
+        proj_index = projects['id'].tolist()
+        available_hours = employees['available_hours'].to_numpy()
+        # Efficiency is scaled to an integer so fractional factors stay exact in CP-SAT
+        efficiency = np.rint(employees['efficiency'].to_numpy(dtype=float) * 100).astype(np.int64)
+        hours_needed = projects['hours_needed'].to_numpy()
+        
+        emp_pos, proj_pos, scores = self._candidate_pairs(emp_index, proj_index, skill_matches, min_match_score)
+        
         model = cp_model.CpModel()
         
-        # Decision variables: employee assigned to project
-        allocations = {}
-        for emp_id in employees['id']:
-            for proj_id in projects['id']:
-                allocations[(emp_id, proj_id)] = model.NewBoolVar(f'allocation_e{emp_id}_p{proj_id}')
+        # Decision variables: employee assigned to project (candidate pairs only)
+        variables = [
+            model.NewBoolVar(f'allocation_e{emp_index[e]}_p{proj_index[p]}')
+            for e, p in zip(emp_pos.tolist(), proj_pos.tolist())
+        ]
+        pairs = [(emp_index[e], proj_index[p]) for e, p in zip(emp_pos.tolist(), proj_pos.tolist())]
+        
+        # Group variable positions by employee and by project once
+        by_employee = _group_positions(emp_pos, len(emp_index))
+        by_project = _group_positions(proj_pos, len(proj_index))
         
         # Constraint: Each employee can't exceed their availability
-        for emp_id in employees['id']:
-            # Sum of project hours this employee is assigned to
-            model.Add(sum(allocations[(emp_id, proj_id)] * projects.loc[projects['id'] == proj_id, 'hours_needed'].iloc[0]
-                       for proj_id in projects['id']) 
-                    <= employees.loc[employees['id'] == emp_id, 'available_hours'].iloc[0])
+        for e, members in enumerate(by_employee):
+            if len(members) == 0:
+                continue
+            model.Add(cp_model.LinearExpr.WeightedSum(
+                [variables[i] for i in members],
+                [int(hours_needed[proj_pos[i]]) for i in members]
+            ) <= int(available_hours[e]))
         
         # Constraint: Each project must have all required hours allocated
-        for proj_id in projects['id']:
-            model.Add(sum(allocations[(emp_id, proj_id)] * employees.loc[employees['id'] == emp_id, 'efficiency'].iloc[0]
-                        for emp_id in employees['id'])
-                    >= projects.loc[projects['id'] == proj_id, 'hours_needed'].iloc[0])
+        for p, members in enumerate(by_project):
+            model.Add(cp_model.LinearExpr.WeightedSum(
+                [variables[i] for i in members],
+                [int(efficiency[emp_pos[i]]) for i in members]
+            ) >= int(hours_needed[p]) * 100)
         
-        # Objective: Maximize skill match scores
-        objective_terms = []
-        for emp_id in employees['id']:
-            for proj_id in projects['id']:
-                # Get skill match score between this employee and project
-                match_score = skill_matches.get((emp_id, proj_id), 0)
-                objective_terms.append(allocations[(emp_id, proj_id)] * int(match_score * 100))  # Convert to integer
+        # Objective: Maximize skill match scores (converted to integers)
+        model.Maximize(cp_model.LinearExpr.WeightedSum(
+            variables, [int(score * 100) for score in scores]
+        ))
         
-        model.Maximize(sum(objective_terms))
+        return model, pairs, variables
+    
+    def optimize_allocation(self, projects, employees, skill_matches, min_match_score=None):
+        """
+        Optimize resource allocation based on:
+        - Project requirements
+        - Employee availability
+        - Employee skills
+        - Skill-project match scores
+        """
+        # Create the optimization model
+        model, pairs, variables = self.build_model(projects, employees, skill_matches, min_match_score)
         
         # Solve the model
-        self.model = model
-        solver = cp_model.CpSolver()
-        status = solver.Solve(model)
-        self.solver = solver
+        solved = self._solve(model)
+        solver = self.solver
         
-        # Return results if optimal solution found
-        if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+        # Return results if optimal solution found (or the best one at the deadline)
+        if solved:
             allocation_results = []
-            for emp_id in employees['id']:
-                for proj_id in projects['id']:
-                    if solver.Value(allocations[(emp_id, proj_id)]) == 1:
-                        allocation_results.append({
-                            'employee_id': emp_id,
-                            'project_id': proj_id,
-                            'skill_match_score': skill_matches.get((emp_id, proj_id), 0)
-                        })
+            for (emp_id, proj_id), variable in zip(pairs, variables):
+                if solver.Value(variable) == 1:
+                    allocation_results.append({
+                        'employee_id': emp_id,
+                        'project_id': proj_id,
+                        'skill_match_score': skill_matches.get((emp_id, proj_id), 0)
+                    })
             return allocation_results
         else:
             return []
     
+    def optimize_portfolio(self, requirements, employees, skill_matches, calendar=None,
+                           previous_assignments=None, affected_employee_ids=None, affected_project_ids=None):
+        """
+        Jointly staff several projects in one solve.
+        
+        requirements: one row per project skill requirement with columns
+            project_id, skill_id, employees_requested, allocation_percentage
+        employees: columns id, available_percentage, skill_ids (list of skill ids)
+        skill_matches: {(employee_id, project_id): score}
+        calendar: optional CapacityCalendar; requirements then also need
+            start_date and end_date columns
+        
+        Each employee fills at most one role per project, their summed allocation
+        percentages stay within their remaining capacity (per overlapping week
+        when a calendar is given, otherwise overall), and no requirement gets
+        more than employees_requested people. Filling a role is rewarded first and
+        the match score breaks ties, so partially staffable portfolios still return
+        the best plan. Returns a list of assignment dicts.
+        
+        previous_assignments: assignments (employee_id, project_id, skill_id)
+            of an earlier plan the caller holds on to; every role is hinted
+            with whether it was part of that plan
+        affected_employee_ids, affected_project_ids: with previous_assignments,
+            only the roles of these employees and on these projects are
+            searched and every other role keeps its previous value (employees
+            whose previous role is gone are added automatically). If that
+            neighbourhood has no solution the full model is solved from the
+            hints instead.
+        """
+        requirements = requirements.reset_index(drop=True)
+        employees = employees.reset_index(drop=True)
+        
+        # Candidate roles: employees joined to the requirements for skills they hold
+        employee_skills = employees[['id', 'skill_ids']].explode('skill_ids').dropna()
+        employee_skills = employee_skills.rename(columns={'id': 'employee_id', 'skill_ids': 'skill_id'})
+        employee_skills['skill_id'] = employee_skills['skill_id'].astype(requirements['skill_id'].dtype)
+        employee_skills['emp_pos'] = employee_skills['employee_id'].map(
+            pd.Series(np.arange(len(employees)), index=employees['id'])
+        )
+        requirement_rows = requirements.assign(req_pos=np.arange(len(requirements)))
+        candidates = employee_skills.merge(requirement_rows, on='skill_id')
+        employee_ids = employees['id'].tolist()
+        if calendar is None:
+            available = employees['available_percentage'].to_numpy(dtype=float)
+            room = available[candidates['emp_pos'].to_numpy()]
+        else:
+            # Each requirement occupies the calendar weeks of its project
+            week_bounds = np.array([
+                calendar.week_range(start, end)
+                for start, end in zip(requirements['start_date'], requirements['end_date'])
+            ], dtype=np.int64).reshape(-1, 2)
+            room = np.array([
+                calendar.remaining(employee_ids[e])[week_bounds[r, 0]:week_bounds[r, 1] + 1].min(initial=100.0)
+                for e, r in zip(candidates['emp_pos'].tolist(), candidates['req_pos'].tolist())
+            ])
+        candidates = candidates[
+            candidates['allocation_percentage'].to_numpy(dtype=float) <= room
+        ].reset_index(drop=True)
+        
+        proj_index = requirements['project_id'].drop_duplicates().tolist()
+        proj_lookup = {proj_id: i for i, proj_id in enumerate(proj_index)}
+        emp_pos = candidates['emp_pos'].to_numpy(dtype=np.int64)
+        req_pos = candidates['req_pos'].to_numpy(dtype=np.int64)
+        proj_pos = candidates['project_id'].map(proj_lookup).to_numpy(dtype=np.int64)
+        percentages = np.rint(candidates['allocation_percentage'].to_numpy(dtype=float)).astype(np.int64)
+        scores = np.array([
+            skill_matches.get((emp_id, proj_id), 0)
+            for emp_id, proj_id in zip(candidates['employee_id'].tolist(), candidates['project_id'].tolist())
+        ], dtype=float)
+        
+        roles = list(zip(
+            candidates['employee_id'].tolist(), candidates['project_id'].tolist(), candidates['skill_id'].tolist()
+        ))
+        
+        model = cp_model.CpModel()
+        variables = [
+            model.NewBoolVar(f'allocation_e{emp_id}_p{proj_id}_s{skill_id}')
+            for emp_id, proj_id, skill_id in roles
+        ]
+        
+        # Constraint: No requirement gets more people than requested
+        requested = requirements['employees_requested'].to_numpy()
+        for r, members in enumerate(_group_positions(req_pos, len(requirements))):
+            if len(members):
+                model.Add(sum(variables[i] for i in members) <= int(requested[r]))
+        
+        # Constraint: One role per employee per project
+        emp_proj = emp_pos * len(proj_index) + proj_pos
+        _, emp_proj_groups = np.unique(emp_proj, return_inverse=True)
+        for members in _group_positions(emp_proj_groups.ravel(), emp_proj_groups.max() + 1 if len(emp_proj) else 0):
+            if len(members) > 1:
+                model.AddAtMostOne(variables[i] for i in members)
+        
+        # Constraint: Each employee stays within their remaining capacity
+        for e, members in enumerate(_group_positions(emp_pos, len(employees))):
+            if not len(members):
+                continue
+            if calendar is None:
+                model.Add(cp_model.LinearExpr.WeightedSum(
+                    [variables[i] for i in members], [int(percentages[i]) for i in members]
+                ) <= int(available[e]))
+                continue
+            for week_members, capacity in self._weekly_capacity_groups(
+                calendar, employee_ids[e], members, week_bounds[req_pos[members]], percentages
+            ):
+                model.Add(cp_model.LinearExpr.WeightedSum(
+                    [variables[i] for i in week_members], [int(percentages[i]) for i in week_members]
+                ) <= capacity)
+        
+        # Objective: Fill as many roles as possible, preferring better matches
+        model.Maximize(cp_model.LinearExpr.WeightedSum(
+            variables, [100 + int(score * 100) for score in scores]
+        ))
+        
+        self.warm_start = None
+        if previous_assignments is None:
+            solved = self._solve(model)
+        else:
+            solved = self._solve_from_plan(
+                model, roles, variables, previous_assignments, affected_employee_ids, affected_project_ids
+            )
+        if not solved:
+            return []
+        solver = self.solver
+        
+        assignments = []
+        for i, variable in enumerate(variables):
+            if solver.Value(variable) == 1:
+                emp_id, proj_id, skill_id = roles[i]
+                assignments.append({
+                    'employee_id': emp_id,
+                    'project_id': proj_id,
+                    'skill_id': skill_id,
+                    'allocation_percentage': float(percentages[i]),
+                    'skill_match_score': float(scores[i])
+                })
+        return assignments
+    
+    def _solve_from_plan(self, model, roles, variables, previous_assignments, affected_employee_ids,
+                         affected_project_ids):
+        """Solve a portfolio model warm-started from a previous plan (see optimize_portfolio)"""
+        previous = {
+            (assignment['employee_id'], assignment['project_id'], assignment['skill_id'])
+            for assignment in previous_assignments
+        }
+        for role, variable in zip(roles, variables):
+            model.AddHint(variable, int(role in previous))
+        
+        fixed = []
+        if affected_employee_ids is not None or affected_project_ids is not None:
+            affected = set(affected_employee_ids or [])
+            affected.update(emp_id for emp_id, _, _ in previous.difference(roles))
+            open_projects = set(affected_project_ids or [])
+            # Fix the other roles through their variable domains rather than
+            # extra constraints, so they can be released again for the fallback
+            proto_variables = model.Proto().variables
+            for role, variable in zip(roles, variables):
+                if role[0] not in affected and role[1] not in open_projects:
+                    domain = proto_variables[variable.Index()].domain
+                    domain[0] = domain[1] = int(role in previous)
+                    fixed.append(domain)
+        
+        solved = self._solve(model)
+        restricted = bool(fixed)
+        if not solved and restricted:
+            for domain in fixed:
+                domain[0], domain[1] = 0, 1
+            restricted = False
+            solved = self._solve(model)
+        self.warm_start = {
+            'hinted_roles': len(variables),
+            'previous_assignments': len(previous),
+            'restricted_to_affected': restricted,
+            'fixed_roles': len(fixed) if restricted else 0
+        }
+        return solved
+    
+    def _weekly_capacity_groups(self, calendar, employee_id, members, bounds, percentages):
+        """
+        Yield (roles, capacity) pairs for one employee's per-week constraints.
+        
+        Weeks in which the same set of candidate roles is active share one
+        constraint bounded by the tightest remaining capacity among them, and
+        sets that could never exceed that capacity are skipped.
+        """
+        first, last = bounds[:, 0].min(), bounds[:, 1].max()
+        if first > last:
+            return
+        weeks = np.arange(first, last + 1)
+        active = (bounds[:, :1] <= weeks) & (weeks <= bounds[:, 1:])
+        free = calendar.remaining(employee_id)[weeks]
+        patterns, inverse = np.unique(active.T, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        for k, pattern in enumerate(patterns):
+            week_members = members[pattern]
+            if len(week_members) == 0:
+                continue
+            capacity = int(np.floor(free[inverse == k].min()))
+            if percentages[week_members].sum() > capacity:
+                yield week_members, capacity
+    
     def get_explanation(self):
         """Get explanation for the optimization results"""
         if not self.solver:
             return "No optimization has been performed yet."
             
+        objective = self.solver.ObjectiveValue()
+        bound = self.solver.BestObjectiveBound()
         explanation = {
-            "objective_value": self.solver.ObjectiveValue(),
+            "status": self.solver.StatusName(self.status),
+            "objective_value": objective,
+            "best_objective_bound": bound,
+            # Relative distance between the plan and the best possible objective
+            "optimality_gap": abs(bound - objective) / max(1.0, abs(objective)),
             "wall_time": self.solver.WallTime(),
             "num_conflicts": self.solver.NumConflicts(),
-            "num_branches": self.solver.NumBranches()
+            "num_branches": self.solver.NumBranches(),
+            "num_incumbents": len(self.incumbents)
         }
+        if self.warm_start is not None:
+            explanation["warm_start"] = self.warm_start
         return explanation
 
 # Example usage:
-# optimizer = ResourceOptimizer()
+# optimizer = ResourceOptimizer(max_time_in_seconds=5, num_search_workers=4)
 # optimal_allocation = optimizer.optimize_allocation(projects_df, employees_df, skill_match_scores)
+# print(optimizer.get_explanation()["optimality_gap"])
@@ -0,0 +1,97 @@
+# Process-wide registry that loads ML components lazily and shares them between consumers
+import threading
+import time
+
+
+class ModelRegistry:
+    """
+    Holds named factories and builds each component the first time it is
+    requested. Loading is guarded per component, so concurrent requests for a
+    component that is still loading wait for the same instance.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._status = {}
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name, factory):
+        """Register a zero-argument factory (replaces any previous one)"""
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+            self._status.setdefault(name, {'loaded': False, 'load_seconds': None, 'error': None})
+
+    def get(self, name):
+        """Return the component, loading it on first use"""
+        if name in self._instances:
+            return self._instances[name]
+        if name not in self._factories:
+            raise KeyError(f"No component registered under '{name}'")
+        with self._locks[name]:
+            if name not in self._instances:
+                start = time.perf_counter()
+                try:
+                    instance = self._factories[name]()
+                except Exception as e:
+                    self._status[name] = {'loaded': False, 'load_seconds': None, 'error': str(e)}
+                    raise
+                self._instances[name] = instance
+                self._status[name] = {
+                    'loaded': True,
+                    'load_seconds': round(time.perf_counter() - start, 3),
+                    'error': None
+                }
+        return self._instances[name]
+
+    def replace(self, instances):
+        """Swap in already-built components in a single step"""
+        with self._registry_lock:
+            updated = dict(self._instances)
+            updated.update(instances)
+            for name in instances:
+                self._factories.setdefault(name, lambda name=name: self._instances[name])
+                self._locks.setdefault(name, threading.Lock())
+                self._status[name] = {'loaded': True, 'load_seconds': None, 'error': None}
+            # Rebinding the dict is atomic, so get() never sees a half-applied swap
+            self._instances = updated
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def warmup(self, names=None):
+        """Load the given components (all registered ones by default)"""
+        for name in names if names is not None else list(self._factories):
+            try:
+                self.get(name)
+            except Exception:
+                # Failure is recorded in status(); the request path will retry
+                pass
+        return self.status()
+
+    def status(self):
+        """Readiness report: {name: {'loaded', 'load_seconds', 'error'}}"""
+        with self._registry_lock:
+            return {name: dict(info) for name, info in self._status.items()}
+
+
+# Shared by every pipeline in the process
+registry = ModelRegistry()
+
+
+def get_encoder(model_name='paraphrase-MiniLM-L6-v2'):
+    """Return the process-wide Sentence-BERT encoder for model_name"""
+    name = f'encoder:{model_name}'
+    if name not in registry._factories:
+        def load_encoder():
+            # Imported here so that importing ml does not pull in torch
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(model_name)
+        registry.register(name, load_encoder)
+    return registry.get(name)
+
+# Example usage:
+# encoder = get_encoder()  # loaded on first call, shared afterwards
+# print(registry.status())
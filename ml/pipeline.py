@@ -1,38 +1,196 @@
 ﻿# Main ML pipeline integrating all components
-from ml.skill_matching.model import SkillMatcher
-from ml.resource_forecasting.model import ResourceForecaster
-from ml.allocation_optimization.model import ResourceOptimizer
-from ml.explainability.model import AllocationExplainer
+from ml.model_registry import ModelRegistry, registry as shared_registry
+from sqlalchemy import create_engine, text
 import pandas as pd
 import numpy as np
 
+# Components are imported inside their factories so that constructing a
+# pipeline does not import sentence-transformers, LIME or OR-Tools
+
+def _create_skill_matcher():
+    from ml.skill_matching.model import SkillMatcher
+    return SkillMatcher()
+
+def _create_forecaster(**params):
+    from ml.resource_forecasting.model import ResourceForecaster
+    return ResourceForecaster(**params)
+
+def _load_forecaster(checkpoint_dir, **params):
+    """Latest incrementally trained forecaster, falling back to an untrained one"""
+    from ml.resource_forecasting.incremental import ForecasterCheckpoints
+    return ForecasterCheckpoints(checkpoint_dir).load_latest() or _create_forecaster(**params)
+
+def _create_optimizer(**params):
+    from ml.allocation_optimization.model import ResourceOptimizer
+    return ResourceOptimizer(**params)
+
+def _create_explainer():
+    from ml.explainability.model import AllocationExplainer
+    return AllocationExplainer()
+
+def train_components(historical_allocations, employee_data, forecaster_params=None, progress=None):
+    """
+    Train the pipeline's trainable components without touching a live pipeline.
+    
+    This is a plain module-level function so it can run in a worker process;
+    the result is passed to ResourceAllocationPipeline.install. forecaster_params
+    (profile, n_jobs, max_depth, ...) configure the forecaster. progress, if
+    given, is called as progress(fraction, message).
+    """
+    report = progress or (lambda fraction, message: None)
+    
+    # Train forecasting model, reporting (and so checking for cancellation)
+    # between rounds of trees or boosting iterations
+    report(0.1, "Training forecasting model")
+    forecaster = _create_forecaster(**(forecaster_params or {}))
+    forecaster.train(
+        historical_allocations,
+        progress=lambda fraction, message: report(0.1 + 0.8 * fraction, message)
+    )
+    
+    # Prepare explainer
+    # We'll create a simplified feature set for explanation purposes
+    report(0.9, "Preparing explainer data")
+    features = pd.DataFrame({
+        'employee_skill_match': np.random.rand(len(historical_allocations)),
+        'employee_availability': np.random.randint(0, 40, size=len(historical_allocations)),
+        'employee_experience': np.random.randint(1, 10, size=len(historical_allocations)),
+        'project_priority': np.random.randint(1, 5, size=len(historical_allocations)),
+        'project_duration': np.random.randint(1, 12, size=len(historical_allocations))
+    })
+    
+    report(1.0, "Training complete")
+    return {'forecaster': forecaster, 'explainer_features': features}
+
+def train_components_from_database(database_url, forecaster_params=None, progress=None):
+    """
+    Read the allocation and employee history from database_url and run
+    train_components on it, all inside the (worker) process, so the API
+    process neither loads nor pickles the history. Returns None when there
+    are no allocations to learn from.
+    """
+    report = progress or (lambda fraction, message: None)
+    report(0.0, "Loading allocation history")
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as connection:
+            allocations_df = pd.read_sql(text(
+                "SELECT employee_id, project_id, start_date, end_date, hours_allocated, "
+                "allocation_percentage, status FROM resource_allocations"
+            ), connection)
+            employee_df = pd.read_sql(text(
+                "SELECT id, full_name AS name, role, department, average_performance AS performance FROM users"
+            ), connection)
+    finally:
+        engine.dispose()
+    if len(allocations_df) == 0:
+        return None
+    return train_components(allocations_df, employee_df, forecaster_params, progress=progress)
+
 class ResourceAllocationPipeline:
-    def __init__(self):
-        self.skill_matcher = SkillMatcher()
-        self.forecaster = ResourceForecaster()
-        self.optimizer = ResourceOptimizer()
-        self.explainer = AllocationExplainer()
+    COMPONENTS = {
+        'skill_matcher': _create_skill_matcher,
+        'forecaster': _create_forecaster,
+        'optimizer': _create_optimizer,
+        'explainer': _create_explainer
+    }
+
+    def __init__(self, optimizer_params=None, forecaster_checkpoint_dir=None, forecaster_params=None):
+        # Each component is built on first access
+        self.components = ModelRegistry()
+        for name, factory in self.COMPONENTS.items():
+            self.components.register(name, factory)
+        # Solver limits and model sparsity (max_time_in_seconds, num_search_workers,
+        # relative_gap_limit, min_match_score, ...)
+        self.optimizer_params = dict(optimizer_params or {})
+        self.components.register('optimizer', lambda: _create_optimizer(**self.optimizer_params))
+        # Training profile and overrides (profile, n_jobs, max_depth, min_samples_leaf, ...)
+        self.forecaster_params = dict(forecaster_params or {})
+        if forecaster_checkpoint_dir:
+            # Resume from the newest saved forecaster version, if there is one
+            self.components.register(
+                'forecaster', lambda: _load_forecaster(forecaster_checkpoint_dir, **self.forecaster_params)
+            )
+        else:
+            self.components.register('forecaster', lambda: _create_forecaster(**self.forecaster_params))
         self.trained = False
+        # Number of employees pulled from the skill index per request (if one is built)
+        self.candidate_limit = 200
+        # Employees are matched on the mean of their best skill_top_n skills
+        self.skill_top_n = 3
+        
+    @property
+    def skill_matcher(self):
+        return self.components.get('skill_matcher')
+
+    @property
+    def forecaster(self):
+        return self.components.get('forecaster')
+
+    @property
+    def optimizer(self):
+        return self.components.get('optimizer')
+
+    def new_optimizer(self):
+        """
+        A fresh optimizer with the pipeline's solver settings.
+        Optimizers record their last solve (solver, status, incumbents) on the
+        instance, so each request solves with its own rather than the shared
+        component.
+        """
+        return _create_optimizer(**self.optimizer_params)
+
+    @property
+    def explainer(self):
+        return self.components.get('explainer')
+
+    def warmup(self):
+        """Load every component and the shared encoder ahead of the first request"""
+        self.components.warmup()
+        self.skill_matcher.model  # loads the shared encoder
+        return self.status()
+
+    def status(self):
+        """Readiness report for the pipeline components and shared models"""
+        return {
+            'trained': self.trained,
+            'components': self.components.status(),
+            'shared_models': shared_registry.status()
+        }
         
     def train(self, historical_allocations, employee_data):
         """Train the pipeline components with historical data"""
-        # Train forecasting model
-        self.forecaster.train(historical_allocations)
-        
-        # Prepare explainer
-        # We'll create a simplified feature set for explanation purposes
-        features = pd.DataFrame({
-            'employee_skill_match': np.random.rand(len(historical_allocations)),
-            'employee_availability': np.random.randint(0, 40, size=len(historical_allocations)),
-            'employee_experience': np.random.randint(1, 10, size=len(historical_allocations)),
-            'project_priority': np.random.randint(1, 5, size=len(historical_allocations)),
-            'project_duration': np.random.randint(1, 12, size=len(historical_allocations))
-        })
-        self.explainer.prepare_explainer(features)
+        return self.install(train_components(historical_allocations, employee_data, self.forecaster_params))
+    
+    def install(self, trained_components):
+        """
+        Swap components produced by train_components into this pipeline.
         
+        The explainer is prepared first and both components are then replaced
+        in one step, so requests never see a new forecaster with an old explainer.
+        None (nothing was trained) leaves the serving components in place.
+        """
+        if trained_components is None:
+            return self
+        explainer = _create_explainer()
+        explainer.prepare_explainer(trained_components['explainer_features'])
+        self.components.replace({
+            'forecaster': trained_components['forecaster'],
+            'explainer': explainer
+        })
         self.trained = True
         return self
     
+    def install_forecaster(self, forecaster):
+        """
+        Swap in a forecaster trained on its own (e.g. by incremental training).
+        None or an untrained forecaster leaves the serving one in place.
+        """
+        if forecaster is None or not forecaster.trained:
+            return self
+        self.components.replace({'forecaster': forecaster})
+        return self
+    
     def process_project_request(self, project_data, available_employees):
         """Process a new project resource request"""
         if not self.trained:
@@ -48,19 +206,31 @@ class ResourceAllocationPipeline:
         project_desc = project_data['description']
         employee_skills = self._extract_employee_skills(available_employees)
         
+        # Narrow the candidates to the best index matches instead of scoring everyone,
+        # ranked by the same top-n mean the scoring below uses
+        index = self.skill_matcher.index
+        if index is not None and len(index) > self.candidate_limit:
+            candidate_ids = {
+                emp_id for emp_id, _ in self.skill_matcher.search_employees(
+                    project_desc, self.candidate_limit, top_n=self.skill_top_n
+                )
+            }
+            employee_skills = {
+                emp_id: skills for emp_id, skills in employee_skills.items() if emp_id in candidate_ids
+            }
+        
         # Step 2: Match skills to project requirements
-        skill_matches = {}
-        for emp_id, skills in employee_skills.items():
-            # Get skill text list
-            skill_texts = [skill['name'] for skill in skills]
-            if skill_texts:  # Check if employee has any skills
-                # Match project to skills
-                matches = self.skill_matcher.match_skills_to_project(project_desc, skill_texts)
-                # Calculate overall match score (average of top 3 skills or all if less than 3)
-                if matches:
-                    top_matches = matches[:min(3, len(matches))]
-                    avg_score = sum(score for _, score in top_matches) / len(top_matches)
-                    skill_matches[(emp_id, project_data['id'])] = avg_score
+        # Overall match score is the average of each employee's top skill_top_n
+        # skills, computed for all employees in one batched pass
+        skill_texts = {
+            emp_id: [skill['name'] for skill in skills]
+            for emp_id, skills in employee_skills.items()
+        }
+        employee_scores = self.skill_matcher.score_employees(project_desc, skill_texts, top_n=self.skill_top_n)
+        skill_matches = {
+            (emp_id, project_data['id']): score
+            for emp_id, score in employee_scores.items()
+        }
         
         # Step 3: Forecast resource availability
         # For simplicity, using a rule-based approach here
@@ -82,7 +252,8 @@ class ResourceAllocationPipeline:
         })
         
         # Step 5: Optimize resource allocation
-        optimal_allocations = self.optimizer.optimize_allocation(
+        optimizer = self.new_optimizer()
+        optimal_allocations = optimizer.optimize_allocation(
             projects_df, 
             employees_df, 
             skill_matches
@@ -117,8 +288,114 @@ class ResourceAllocationPipeline:
                 results['recommendations'].append(recommendation)
         
         # Add optimization explanation
-        results['explanation'] = self.optimizer.get_explanation()
+        results['explanation'] = optimizer.get_explanation()
+        
+        return results
+    
+    def process_portfolio_request(self, projects_data, available_employees, calendar=None,
+                                  previous_plan=None, changed_employee_ids=None):
+        """
+        Staff several projects jointly so the same people are not over-booked.
+        
+        projects_data: dicts with id, description, allocation_percentage,
+            start_date, end_date and skill_requirements
+            ([{'skill_id', 'employees_requested'}])
+        available_employees: dicts with id, name, available_percentage and
+            skills ([{'id', 'name'}])
+        calendar: optional CapacityCalendar of existing bookings; when given,
+            capacity is enforced per week the projects overlap instead of as
+            one overall percentage
+        previous_plan: an earlier result of this method ({'project_ids',
+            'assignments'}) kept by the caller; the solve is warm-started from it
+        changed_employee_ids: with previous_plan, re-plan only the roles of
+            these employees, of those freed from projects no longer in the
+            request and on projects that are new; every other role stays as
+            planned unless that leaves no solution
+        """
+        results = {
+            'project_ids': [project['id'] for project in projects_data],
+            'assignments': [],
+            'unfilled': [],
+            'explanation': {}
+        }
+        
+        # Step 1: One batched skill-match pass per project over the employees
+        # holding at least one of its required skills
+        skill_matches = {}
+        for project in projects_data:
+            required = {req['skill_id'] for req in project['skill_requirements']}
+            skill_texts = {
+                emp['id']: [skill['name'] for skill in emp.get('skills', [])]
+                for emp in available_employees
+                if required & {skill['id'] for skill in emp.get('skills', [])}
+            }
+            description = project.get('description') or project.get('name', '')
+            for emp_id, score in self.skill_matcher.score_employees(description, skill_texts).items():
+                skill_matches[(emp_id, project['id'])] = score
+        
+        # Step 2: Prepare data for optimization
+        requirements_df = pd.DataFrame([
+            {
+                'project_id': project['id'],
+                'skill_id': req['skill_id'],
+                'employees_requested': req['employees_requested'],
+                'allocation_percentage': project.get('allocation_percentage', 50),
+                'start_date': project.get('start_date'),
+                'end_date': project.get('end_date')
+            }
+            for project in projects_data
+            for req in project['skill_requirements']
+        ], columns=['project_id', 'skill_id', 'employees_requested', 'allocation_percentage', 'start_date', 'end_date'])
+        employees_df = pd.DataFrame({
+            'id': [emp['id'] for emp in available_employees],
+            'available_percentage': [emp.get('available_percentage', 100) for emp in available_employees],
+            'skill_ids': [[skill['id'] for skill in emp.get('skills', [])] for emp in available_employees]
+        })
+        if requirements_df.empty or employees_df.empty:
+            results['unfilled'] = [
+                {'project_id': req['project_id'], 'skill_id': req['skill_id'], 'employees_missing': req['employees_requested']}
+                for req in requirements_df.to_dict('records')
+            ]
+            return results
+        
+        # Step 3: Optimize all projects in one solve
+        previous_assignments, affected_employees, affected_projects = None, None, None
+        if previous_plan is not None:
+            previous_assignments = previous_plan.get('assignments', [])
+            if changed_employee_ids is not None:
+                project_ids = set(results['project_ids'])
+                affected_employees = set(changed_employee_ids)
+                affected_employees.update(
+                    assignment['employee_id'] for assignment in previous_assignments
+                    if assignment['project_id'] not in project_ids
+                )
+                affected_projects = project_ids - set(previous_plan.get('project_ids', []))
+        optimizer = self.new_optimizer()
+        assignments = optimizer.optimize_portfolio(
+            requirements_df, employees_df, skill_matches, calendar=calendar,
+            previous_assignments=previous_assignments,
+            affected_employee_ids=affected_employees, affected_project_ids=affected_projects
+        )
+        
+        # Step 4: Build the plan and report what could not be staffed
+        names = {emp['id']: emp.get('name', f"Employee {emp['id']}") for emp in available_employees}
+        filled = {}
+        for assignment in assignments:
+            assignment['employee_name'] = names.get(assignment['employee_id'])
+            key = (assignment['project_id'], assignment['skill_id'])
+            filled[key] = filled.get(key, 0) + 1
+        results['assignments'] = assignments
+        
+        for req in requirements_df[['project_id', 'skill_id', 'employees_requested']].to_dict('records'):
+            missing = req['employees_requested'] - filled.get((req['project_id'], req['skill_id']), 0)
+            if missing > 0:
+                results['unfilled'].append({
+                    'project_id': req['project_id'],
+                    'skill_id': req['skill_id'],
+                    'employees_missing': missing
+                })
         
+        results['explanation'] = optimizer.get_explanation()
         return results
     
     def _extract_employee_skills(self, employees):
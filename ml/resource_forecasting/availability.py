@@ -0,0 +1,107 @@
+# Vectorized weekly availability forecasting
+import numpy as np
+import pandas as pd
+from ml.utils.weeks import booking_matrix, week_dates, week_number
+
+WEEKS_PER_YEAR = 52
+
+
+def week_of_year(numbers):
+    """0-51 seasonal position of each week; the odd 53rd week joins the 52nd"""
+    return np.minimum((week_dates(numbers).dayofyear.to_numpy() - 1) // 7, WEEKS_PER_YEAR - 1)
+
+
+def allocation_weeks(allocations):
+    """
+    Allocations reduced to employee_id, first and last week number and weekly
+    hours, with dates parsed once. Rows with a week column instead of dates
+    book that week only.
+
+    A missing date is open-ended, as in the capacity calendar: NaN start_week
+    books from the beginning of whatever span is looked at, NaN end_week
+    through its end (see ml.utils.weeks.booking_matrix).
+    """
+    if 'start_date' not in allocations and 'week' in allocations:
+        start = end = week_number(allocations['week'])
+    else:
+        start, end = week_number(allocations['start_date']), week_number(allocations['end_date'])
+    return pd.DataFrame({
+        'employee_id': allocations['employee_id'].to_numpy(),
+        'start_week': start,
+        'end_week': end,
+        'hours_allocated': pd.to_numeric(allocations['hours_allocated'], errors='coerce').to_numpy(float)
+    })
+
+
+def booked_hours(weeks, employee_ids, first_week, num_weeks):
+    """Booked hours per employee and week (employees x num_weeks) for allocation_weeks output"""
+    return booking_matrix(
+        employee_ids, weeks['employee_id'], weeks['start_week'], weeks['end_week'],
+        weeks['hours_allocated'], first_week, num_weeks
+    )
+
+
+class WeeklyAvailabilityForecaster:
+    """
+    Forecasts each employee's available hours per week.
+
+    fit pivots the allocation history before as_of into an employees x weeks
+    matrix of booked hours, once. Load is modelled additively: a week-of-year
+    profile shared by all employees (learned once there is a year of history)
+    plus each employee's deseasonalized level over the last lookback_weeks.
+    predict takes, per cell, the larger of that expected load and the hours
+    already booked for the week by allocations running on past as_of (known
+    from their end_date), and returns weekly_hours minus it, floored at zero.
+    """
+
+    def __init__(self, weekly_hours=40, lookback_weeks=12):
+        self.weekly_hours = weekly_hours
+        self.lookback_weeks = lookback_weeks
+
+    def fit(self, allocations, as_of=None, employee_ids=None):
+        """
+        allocations: employee_id, start_date, end_date and hours_allocated
+        (hours per week). employee_ids lists who to forecast (default:
+        everyone in allocations); as_of defaults to today.
+        """
+        weeks = allocation_weeks(allocations)
+        self.employee_ids_ = pd.Index(
+            employee_ids if employee_ids is not None else np.sort(weeks['employee_id'].dropna().unique()),
+            name='employee_id'
+        )
+        self.as_of_ = week_number([as_of if as_of is not None else pd.Timestamp.today()])[0]
+        # Only bookings still running at as_of are known for the forecast horizon
+        self.bookings_ = weeks[weeks['end_week'].isna() | (weeks['end_week'] >= self.as_of_)]
+
+        # History starts at the earliest known date; open-ended starts book from there
+        known = np.concatenate([weeks['start_week'].to_numpy(), weeks['end_week'].to_numpy()])
+        known = known[~np.isnan(known)]
+        first_week = known.min() if len(known) else self.as_of_ - self.lookback_weeks
+        num_weeks = max(0, int(self.as_of_ - first_week)) if len(weeks) else 0
+        self.season_ = np.zeros(WEEKS_PER_YEAR)
+        self.level_ = np.zeros(len(self.employee_ids_))
+        if num_weeks == 0:
+            return self
+
+        load = booked_hours(weeks, self.employee_ids_, first_week, num_weeks)
+        seasons = week_of_year(first_week + np.arange(num_weeks))
+        if num_weeks >= WEEKS_PER_YEAR:
+            residual = (load - load.mean(axis=1, keepdims=True)).sum(axis=0)
+            counts = np.bincount(seasons, minlength=WEEKS_PER_YEAR) * len(self.employee_ids_)
+            totals = np.bincount(seasons, weights=residual, minlength=WEEKS_PER_YEAR)
+            self.season_ = np.divide(totals, counts, out=np.zeros(WEEKS_PER_YEAR), where=counts > 0)
+        recent = slice(max(0, num_weeks - self.lookback_weeks), num_weeks)
+        self.level_ = (load[:, recent] - self.season_[seasons[recent]]).mean(axis=1)
+        return self
+
+    def predict(self, dates):
+        """Available hours as a DataFrame: one row per employee, one column per week start"""
+        weeks = week_number(dates)
+        expected = self.level_[:, None] + self.season_[week_of_year(weeks)][None, :]
+        booked = np.zeros_like(expected)
+        if len(weeks):
+            first_week = weeks.min()
+            span = booked_hours(self.bookings_, self.employee_ids_, first_week, int(weeks.max() - first_week) + 1)
+            booked = span[:, (weeks - first_week).astype(np.int64)]
+        available = np.clip(self.weekly_hours - np.maximum(expected, booked), 0, self.weekly_hours)
+        return pd.DataFrame(available, index=self.employee_ids_, columns=pd.Index(week_dates(weeks), name='week'))
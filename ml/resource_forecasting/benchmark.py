@@ -0,0 +1,84 @@
+# Feature matrix memory and build time for ResourceForecaster training data,
+# and the weekly availability forecast for a large workforce
+# Run from the project root: python -m ml.resource_forecasting.benchmark
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from ml.resource_forecasting.availability import WeeklyAvailabilityForecaster
+from ml.resource_forecasting.features import AllocationFeatureTransformer
+
+
+def make_allocations(num_rows=500_000, num_employees=5000, num_projects=2000, num_skills=300, seed=42):
+    """
+    Synthetic allocation history shaped like the resource_allocations table.
+
+    hours_allocated follows the allocation percentage plus per-employee and
+    per-skill offsets, a seasonal term and noise, so models have something
+    to learn and their errors can be compared.
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365, size=num_rows), unit='D')
+    end = start + pd.to_timedelta(rng.integers(14, 365, size=num_rows), unit='D')
+    employee_id = rng.integers(1, num_employees + 1, size=num_rows)
+    skill_id = rng.integers(1, num_skills + 1, size=num_rows)
+    percentage = rng.integers(10, 100, size=num_rows).astype(float)
+    employee_offset = rng.normal(0, 4, size=num_employees + 1)
+    skill_offset = rng.normal(0, 2, size=num_skills + 1)
+    hours = (
+        0.4 * percentage + employee_offset[employee_id] + skill_offset[skill_id]
+        + 3 * np.sin(2 * np.pi * start.month.to_numpy() / 12) + rng.normal(0, 2, size=num_rows)
+    )
+    return pd.DataFrame({
+        'employee_id': employee_id,
+        'project_id': rng.integers(1, num_projects + 1, size=num_rows),
+        'skill_id': skill_id,
+        'start_date': start.strftime('%Y-%m-%d'),
+        'end_date': end.strftime('%Y-%m-%d'),
+        'hours_allocated': np.clip(np.round(hours), 1, 40),
+        'allocation_percentage': percentage
+    })
+
+
+def matrix_bytes(matrix):
+    if hasattr(matrix, 'indptr'):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return matrix.nbytes
+
+
+def measure(allocations, **params):
+    """fit_transform wall time, result size and peak traced memory"""
+    transformer = AllocationFeatureTransformer(**params)
+    tracemalloc.start()
+    start = time.perf_counter()
+    matrix = transformer.fit_transform(allocations)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, matrix.shape, matrix_bytes(matrix), peak
+
+
+def measure_availability(allocations, num_weeks=52, as_of='2025-01-06'):
+    """Wall time of fitting on the history and forecasting num_weeks for every employee"""
+    weeks = pd.date_range(as_of, periods=num_weeks, freq='W-MON')
+    start = time.perf_counter()
+    forecast = WeeklyAvailabilityForecaster().fit(allocations, as_of=as_of).predict(weeks)
+    return time.perf_counter() - start, forecast.shape
+
+
+if __name__ == '__main__':
+    allocations = make_allocations()
+    n_columns = 5 + 1 + sum(allocations[col].nunique() for col in ('employee_id', 'project_id', 'skill_id'))
+    # pd.get_dummies fed to StandardScaler/RandomForest became a dense float matrix
+    print(f"{len(allocations)} allocations; dense one-hot float64 matrix would be "
+          f"{len(allocations)} x {n_columns} = {len(allocations) * n_columns * 8 / 1e9:.1f} GB")
+    for params in ({'encoding': 'onehot'}, {'encoding': 'ordinal'}):
+        seconds, shape, size, peak = measure(allocations, **params)
+        print(f"{params['encoding']:8s} {shape[0]} x {shape[1]}: {size / 1e6:.1f} MB, "
+              f"peak {peak / 1e6:.1f} MB during fit_transform, {seconds:.2f}s")
+
+    history = make_allocations(300_000, num_employees=10_000)
+    seconds, shape = measure_availability(history)
+    print(f"availability forecast {shape[0]} employees x {shape[1]} weeks from "
+          f"{len(history)} allocations: {seconds:.2f}s")
@@ -0,0 +1,133 @@
+# Fitted feature transformer for allocation records
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+
+DATE_FEATURES = ['start_year', 'start_month', 'end_year', 'end_month', 'duration_months']
+
+
+class AllocationFeatureTransformer(BaseEstimator, TransformerMixin):
+    """
+    Turns allocation records into a model matrix with a schema fixed at fit time.
+
+    Dates are parsed once per column. Each categorical column (employee,
+    project, skill ids) gets a vocabulary learned by fit; values outside it
+    encode as "unknown" instead of adding columns, so transform always
+    returns the fitted columns in the fitted order.
+
+    encoding='onehot' returns a scipy.sparse CSR matrix whose one-hot block
+    costs one stored value per row and column, not one cell per category.
+    encoding='ordinal' returns a dense float matrix with one code column per
+    categorical (NaN for unknown), for models with native categorical support.
+    max_categories keeps only the most frequent values of each column.
+    partial_fit grows the vocabularies chunk by chunk for incremental training.
+    """
+
+    def __init__(self, categorical_columns=('employee_id', 'project_id', 'skill_id'),
+                 numeric_columns=('allocation_percentage',), encoding='onehot', max_categories=None):
+        self.categorical_columns = categorical_columns
+        self.numeric_columns = numeric_columns
+        self.encoding = encoding
+        self.max_categories = max_categories
+
+    def fit(self, X, y=None):
+        if self.encoding not in ('onehot', 'ordinal'):
+            raise ValueError(f"Unknown encoding '{self.encoding}'")
+        # Only columns present at fit time are part of the schema
+        self.numeric_columns_ = [col for col in self.numeric_columns if col in X.columns]
+        self.categories_ = {}
+        for col in self.categorical_columns:
+            if col not in X.columns:
+                continue
+            counts = X[col].dropna().value_counts(sort=self.max_categories is not None)
+            if self.max_categories is not None:
+                counts = counts.iloc[:self.max_categories]
+            values = pd.Index(counts.index).sort_values()
+            # Ids read from a column with gaps arrive as floats; keep them as ints
+            if values.dtype.kind == 'f' and np.all(values == np.round(values)):
+                values = values.astype('int64')
+            self.categories_[col] = values
+        self.feature_names_ = DATE_FEATURES + self.numeric_columns_
+        if self.encoding == 'onehot':
+            self.feature_names_ += [
+                f"{col}_{value}" for col, values in self.categories_.items() for value in values
+            ]
+        else:
+            self.feature_names_ += list(self.categories_)
+        self.n_features_in_ = len(X.columns)
+        return self
+
+    def partial_fit(self, X, y=None):
+        """
+        Fit on the first call, then only append unseen values to each vocabulary.
+
+        Existing codes never move, so models trained on earlier chunks keep
+        their meaning. With encoding='ordinal' the width stays fixed; with
+        'onehot' new values add columns at the end.
+        """
+        if not hasattr(self, 'categories_'):
+            return self.fit(X, y)
+        for col, values in self.categories_.items():
+            if col not in X.columns:
+                continue
+            seen = pd.Index(X[col].dropna().unique())
+            if values.dtype.kind == 'i' and seen.dtype.kind == 'f':
+                seen = seen.astype('int64')
+            new_values = seen[values.get_indexer(seen) < 0].sort_values()
+            if self.max_categories is not None:
+                new_values = new_values[:max(0, self.max_categories - len(values))]
+            if len(new_values):
+                self.categories_[col] = values.append(new_values)
+                if self.encoding == 'onehot':
+                    self.feature_names_ += [f"{col}_{value}" for value in new_values]
+        return self
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(self.feature_names_, dtype=object)
+
+    def _dense_features(self, X):
+        """Date parts, duration and numeric columns as one float matrix"""
+        n = len(X)
+        start = pd.to_datetime(X['start_date'], errors='coerce') if 'start_date' in X else pd.Series(pd.NaT, index=X.index)
+        end = pd.to_datetime(X['end_date'], errors='coerce') if 'end_date' in X else pd.Series(pd.NaT, index=X.index)
+        start_year, start_month = start.dt.year.to_numpy(float), start.dt.month.to_numpy(float)
+        end_year, end_month = end.dt.year.to_numpy(float), end.dt.month.to_numpy(float)
+        columns = [
+            start_year, start_month, end_year, end_month,
+            (end_year - start_year) * 12 + (end_month - start_month)
+        ]
+        for col in self.numeric_columns_:
+            columns.append(
+                pd.to_numeric(X[col], errors='coerce').to_numpy(float) if col in X else np.full(n, np.nan)
+            )
+        return np.column_stack(columns) if columns else np.empty((n, 0))
+
+    def _codes(self, X, col):
+        """Position of each value in the column's vocabulary; -1 when unknown or missing"""
+        if col not in X:
+            return np.full(len(X), -1)
+        return self.categories_[col].get_indexer(X[col])
+
+    def transform(self, X):
+        dense = np.nan_to_num(self._dense_features(X), nan=0.0)
+        if self.encoding == 'ordinal':
+            codes = [self._codes(X, col).astype(float) for col in self.categories_]
+            for column in codes:
+                column[column < 0] = np.nan
+            return np.column_stack([dense] + codes) if codes else dense
+
+        rows, cols = [], []
+        offset = 0
+        for col, values in self.categories_.items():
+            codes = self._codes(X, col)
+            known = codes >= 0
+            rows.append(np.flatnonzero(known))
+            cols.append(codes[known] + offset)
+            offset += len(values)
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=int)
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype=int)
+        onehot = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(X), offset)
+        )
+        return sp.hstack([sp.csr_matrix(dense.astype(np.float32)), onehot], format='csr')
@@ -0,0 +1,164 @@
+# Out-of-core training for the resource forecaster with versioned checkpoints
+# Nightly retrain from the project root:
+#   python -m ml.resource_forecasting.incremental --database-url sqlite:///backend/resource_planning.db
+import argparse
+import json
+import os
+import tempfile
+from datetime import datetime
+
+import joblib
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from ml.resource_forecasting.model import IncrementalResourceForecaster
+
+ALLOCATION_HISTORY_QUERY = text(
+    "SELECT id, employee_id, project_id, start_date, end_date, hours_allocated, allocation_percentage "
+    "FROM resource_allocations WHERE id > :after_id ORDER BY id"
+)
+
+
+def read_allocation_chunks(engine, after_id=0, chunk_size=50000):
+    """
+    Yield allocation history with id > after_id as DataFrames of chunk_size rows.
+
+    The query runs on one streaming (server-side where supported) cursor, so
+    only one chunk is in memory at a time. Allocations edited after they were
+    learned keep their id and are not re-read; a full retrain picks those up.
+    """
+    with engine.connect().execution_options(stream_results=True) as connection:
+        yield from pd.read_sql_query(
+            ALLOCATION_HISTORY_QUERY, connection, params={"after_id": after_id}, chunksize=chunk_size
+        )
+
+
+class ForecasterCheckpoints:
+    """
+    Versioned forecaster snapshots in a directory.
+
+    Each save writes forecaster-v<version>.joblib and then repoints
+    latest.json at it, both via atomic renames, so a reader never sees a
+    half-written model. Only the newest `keep` versions are kept.
+    """
+
+    LATEST = "latest.json"
+
+    def __init__(self, directory, keep=5):
+        self.directory = directory
+        self.keep = keep
+
+    def _path(self, version):
+        return os.path.join(self.directory, f"forecaster-v{version:05d}.joblib")
+
+    def _write_atomic(self, path, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def latest(self):
+        """Metadata of the newest version, or None"""
+        try:
+            with open(os.path.join(self.directory, self.LATEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def load_latest(self):
+        """The newest forecaster, or None if nothing has been saved"""
+        info = self.latest()
+        return joblib.load(self._path(info["version"])) if info else None
+
+    def save(self, forecaster):
+        """Store the forecaster as the next version and return its metadata"""
+        os.makedirs(self.directory, exist_ok=True)
+        previous = self.latest()
+        forecaster.version = (previous["version"] if previous else 0) + 1
+        self._write_atomic(self._path(forecaster.version), lambda f: joblib.dump(forecaster, f))
+        info = {
+            "version": forecaster.version,
+            "last_allocation_id": forecaster.last_allocation_id,
+            "rows_seen": forecaster.rows_seen,
+            "trees": len(forecaster.model.named_steps["regressor"].estimators_),
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        self._write_atomic(
+            os.path.join(self.directory, self.LATEST), lambda f: f.write(json.dumps(info).encode("utf-8"))
+        )
+        for version in range(forecaster.version - self.keep, 0, -1):
+            if not os.path.exists(self._path(version)):
+                break
+            os.unlink(self._path(version))
+        return info
+
+
+def train_incremental(database_url, checkpoint_dir, chunk_size=50000, keep=5, full=False,
+                      forecaster_params=None, progress=None):
+    """
+    Continue the latest checkpoint with allocations added since it was taken.
+
+    Runs standalone or as a training job (progress(fraction, message) is
+    reported per chunk). full=True starts a new model from the whole history.
+    forecaster_params (profile, n_jobs, ...) configure a new model; n_jobs
+    also applies when continuing a checkpoint. Returns the trained forecaster,
+    saved as a new version, or None if there was nothing new to learn.
+    """
+    report = progress or (lambda fraction, message: None)
+    forecaster_params = dict(forecaster_params or {})
+    checkpoints = ForecasterCheckpoints(checkpoint_dir, keep=keep)
+    forecaster = None if full else checkpoints.load_latest()
+    if forecaster is None:
+        forecaster = IncrementalResourceForecaster(**forecaster_params)
+    elif 'n_jobs' in forecaster_params:
+        forecaster.model.named_steps['regressor'].set_params(n_jobs=forecaster_params['n_jobs'])
+
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as connection:
+            pending = connection.execute(
+                text("SELECT COUNT(*) FROM resource_allocations WHERE id > :after_id"),
+                {"after_id": forecaster.last_allocation_id}
+            ).scalar()
+        report(0.05, f"{pending} new allocations since id {forecaster.last_allocation_id}")
+        if pending == 0:
+            return None
+
+        rows_before = forecaster.rows_seen
+        done = 0
+        for chunk in read_allocation_chunks(engine, forecaster.last_allocation_id, chunk_size):
+            forecaster.partial_fit(chunk)
+            done += len(chunk)
+            report(0.05 + 0.9 * done / pending, f"Learned {done}/{pending} allocations")
+    finally:
+        engine.dispose()
+
+    if forecaster.rows_seen == rows_before:
+        # Only rows without hours_allocated were new
+        return None
+    info = checkpoints.save(forecaster)
+    report(1.0, f"Saved forecaster version {info['version']}")
+    return forecaster
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the resource forecaster on allocations added since the last checkpoint")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./resource_planning.db"))
+    parser.add_argument("--checkpoint-dir", default=os.getenv("ML_CHECKPOINT_DIR", "./model_checkpoints"))
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--keep", type=int, default=5, help="Checkpoint versions to keep")
+    parser.add_argument("--full", action="store_true", help="Retrain from the whole history instead of continuing")
+    args = parser.parse_args()
+    forecaster = train_incremental(
+        args.database_url, args.checkpoint_dir, args.chunk_size, args.keep, args.full,
+        progress=lambda fraction, message: print(f"[{fraction:5.1%}] {message}")
+    )
+    if forecaster is None:
+        print("No new allocations to learn from")
+    else:
+        print(f"Forecaster version {forecaster.version}: {forecaster.rows_seen} rows, "
+              f"last allocation id {forecaster.last_allocation_id}")
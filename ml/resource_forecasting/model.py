@@ -1,89 +1,240 @@
 ﻿# Resource forecasting with scikit-learn
+from contextlib import nullcontext
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
 from sklearn.pipeline import Pipeline
+from threadpoolctl import ThreadpoolController
+from ml.resource_forecasting.availability import WeeklyAvailabilityForecaster
+from ml.resource_forecasting.features import AllocationFeatureTransformer
+
+# Named training setups: estimator, feature encoding and estimator parameters.
+# Forests train and predict on all cores (n_jobs=-1) and are bounded in depth,
+# leaf size and rows per tree, which caps both fit time and pickled size.
+# 'exhaustive' is the original unbounded single-threaded forest on one-hot ids.
+TRAINING_PROFILES = {
+    'fast': {
+        'estimator': 'random_forest',
+        'encoding': 'ordinal',
+        'params': {'n_estimators': 50, 'max_depth': 10, 'min_samples_leaf': 50, 'max_samples': 0.1, 'n_jobs': -1}
+    },
+    'balanced': {
+        'estimator': 'random_forest',
+        'encoding': 'ordinal',
+        'params': {'n_estimators': 100, 'max_depth': 14, 'min_samples_leaf': 50, 'max_samples': 0.2, 'n_jobs': -1}
+    },
+    'exhaustive': {
+        'estimator': 'random_forest',
+        'encoding': 'onehot',
+        'params': {'n_estimators': 100}
+    },
+    'hist_gradient_boosting': {
+        'estimator': 'hist_gradient_boosting',
+        'encoding': 'ordinal',
+        'params': {'max_iter': 200, 'learning_rate': 0.1, 'max_leaf_nodes': 31, 'min_samples_leaf': 20}
+    }
+}
+
+DEFAULT_PROFILE = 'balanced'
+
+ESTIMATORS = {
+    'random_forest': RandomForestRegressor,
+    'hist_gradient_boosting': HistGradientBoostingRegressor
+}
+
+
+def resolve_profile(profile=DEFAULT_PROFILE, **params):
+    """Estimator name, encoding and parameters of a profile, with params overriding its defaults"""
+    if profile not in TRAINING_PROFILES:
+        raise ValueError(f"Unknown training profile '{profile}'; expected one of {sorted(TRAINING_PROFILES)}")
+    spec = TRAINING_PROFILES[profile]
+    params = {'random_state': 42, **spec['params'], **params}
+    if spec['estimator'] == 'hist_gradient_boosting':
+        # Boosting is sequential and has no n_jobs; it uses OpenMP threads itself
+        params.pop('n_jobs', None)
+    return spec['estimator'], spec['encoding'], params
+
+
+_thread_controller = None
+
+
+def _thread_limit(n_jobs):
+    """OpenMP thread cap for an n_jobs setting (None or -1: no cap)"""
+    global _thread_controller
+    if n_jobs is None or n_jobs == -1:
+        return nullcontext()
+    if _thread_controller is None:
+        # Scanning the loaded libraries is the slow part; do it once per process
+        _thread_controller = ThreadpoolController()
+    return _thread_controller.limit(limits=max(1, n_jobs), user_api='openmp')
+
 
 class ResourceForecaster:
-    def __init__(self):
-        # Create a pipeline with preprocessing and model
+    def __init__(self, profile=DEFAULT_PROFILE, **params):
+        """
+        profile picks a TRAINING_PROFILES entry; keyword arguments override its
+        estimator parameters (e.g. n_jobs=2, max_depth=None)
+        """
+        # n_jobs also caps the OpenMP threads of estimators without an n_jobs (boosting)
+        self.n_jobs = params.get('n_jobs')
+        estimator, encoding, params = resolve_profile(profile, **params)
+        self.profile = profile
+        # Create a pipeline with feature encoding and model; trees need no scaling,
+        # and the transformer's output (sparse for one-hot) goes to the model as is
         self.model = Pipeline([
-            ('scaler', StandardScaler()),
-            ('regressor', RandomForestRegressor(n_estimators=100, random_state=42))
+            ('features', AllocationFeatureTransformer(encoding=encoding)),
+            ('regressor', ESTIMATORS[estimator](**params))
         ])
         self.trained = False
     
+    @property
+    def feature_transformer(self):
+        return self.model.named_steps['features']
+    
     def prepare_features(self, allocation_data):
         """
-        Prepare features from allocation data
+        Prepare features from allocation data with the fitted transformer
         Expected columns: employee_id, project_id, skill_id, start_date, end_date, 
-                        hours_allocated, allocation_percentage
+                        allocation_percentage
+        Returns a matrix (sparse for one-hot profiles) with the columns fixed when
+        the model was trained (see feature_transformer.get_feature_names_out()).
         """
-        # Convert dates to numerical features
-        df = allocation_data.copy()
-        df['start_year'] = pd.to_datetime(df['start_date']).dt.year
-        df['start_month'] = pd.to_datetime(df['start_date']).dt.month
-        df['end_year'] = pd.to_datetime(df['end_date']).dt.year
-        df['end_month'] = pd.to_datetime(df['end_date']).dt.month
-        df['duration_months'] = (df['end_year'] - df['start_year']) * 12 + (df['end_month'] - df['start_month'])
-        
-        # One-hot encode categorical variables
-        df_encoded = pd.get_dummies(df, columns=['employee_id', 'project_id', 'skill_id'])
-        
-        return df_encoded
+        return self.feature_transformer.transform(allocation_data)
     
-    def train(self, historical_allocations):
-        """Train the forecasting model on historical allocation data"""
+    def train(self, historical_allocations, progress=None, steps=10):
+        """
+        Train the forecasting model on historical allocation data
+        With progress, the estimator is grown in up to steps rounds (trees for
+        forests, boosting iterations otherwise) and progress(fraction, message)
+        is called after each, so a training job can stop between rounds.
+        """
         if len(historical_allocations) == 0:
             raise ValueError("No historical data provided for training")
         
-        X = self.prepare_features(historical_allocations)
+        # Rows without a recorded target cannot be learned from
+        historical_allocations = historical_allocations[historical_allocations['hours_allocated'].notna()]
+        if len(historical_allocations) == 0:
+            raise ValueError("No historical allocations with hours_allocated")
         y = historical_allocations['hours_allocated']  # Target variable
         
-        self.model.fit(X, y)
+        with _thread_limit(getattr(self, 'n_jobs', None)):
+            if progress is None:
+                self.model.fit(historical_allocations, y)
+            else:
+                self._fit_in_steps(historical_allocations, y, progress, steps)
         self.trained = True
         return self
     
+    def _fit_in_steps(self, historical_allocations, y, progress, steps):
+        """Fit the model by growing the estimator with warm_start; same result as one fit"""
+        features = self.feature_transformer.fit_transform(historical_allocations)
+        regressor = self.model.named_steps['regressor']
+        forest = isinstance(regressor, RandomForestRegressor)
+        size, unit = ("n_estimators", "trees") if forest else ("max_iter", "boosting iterations")
+        total, warm_start = regressor.get_params()[size], regressor.warm_start
+        sizes = np.unique(np.ceil(np.arange(1, steps + 1) * total / steps).astype(int))
+        try:
+            for count in sizes:
+                regressor.set_params(warm_start=True, **{size: int(count)})
+                regressor.fit(features, y)
+                progress(count / total, f"Fitted {count} of {total} {unit}")
+                if getattr(regressor, 'n_iter_', count) < count:
+                    # Boosting stopped early; going on would not match a single fit
+                    break
+        finally:
+            regressor.set_params(warm_start=warm_start, **{size: total})
+    
     def predict_allocation(self, new_allocations):
         """Predict resource allocation hours based on new allocation requests"""
         if not self.trained:
             raise ValueError("Model must be trained before making predictions")
         
-        X_new = self.prepare_features(new_allocations)
+        # The transformer encodes ids unseen in training as unknown, so the
+        # columns always match the training schema
+        with _thread_limit(getattr(self, 'n_jobs', None)):
+            return self.model.predict(new_allocations)
+    
+    def forecast_availability(self, employee_data, future_dates, weekly_hours=40, as_of=None, employee_ids=None):
+        """
+        Forecast employee availability for future weeks
+        employee_data: allocations with employee_id, start_date, end_date and
+                       hours_allocated (per week), or per-week rows with a week column
+        future_dates: dates in the weeks to forecast; history is what lies before
+                      as_of (default: the first of those weeks)
+        Returns available hours as a DataFrame indexed by employee_id with one
+        column per week start; .to_numpy() gives the employees x weeks matrix.
+        """
+        future_dates = pd.to_datetime(pd.Series(future_dates).to_numpy())
+        if as_of is None and len(future_dates):
+            as_of = future_dates.min()
+        forecaster = WeeklyAvailabilityForecaster(weekly_hours=weekly_hours)
+        return forecaster.fit(employee_data, as_of=as_of, employee_ids=employee_ids).predict(future_dates)
+
+class IncrementalResourceForecaster(ResourceForecaster):
+    """
+    Forecaster that learns from allocation history one chunk at a time.
+    
+    Each partial_fit grows trees_per_chunk new trees on that chunk only
+    (warm_start), so memory depends on the chunk size rather than the history.
+    Once the forest exceeds max_trees the oldest trees are dropped, which
+    keeps the model bounded and weighted towards recent data. Ids get stable
+    ordinal codes that later chunks only append to, so the feature width never
+    changes between chunks. last_allocation_id is the checkpoint watermark:
+    the next run only needs rows with a larger id.
+    """
+    
+    def __init__(self, trees_per_chunk=10, max_trees=200, profile=DEFAULT_PROFILE, **params):
+        estimator, _, params = resolve_profile(profile, **params)
+        if estimator != 'random_forest':
+            raise ValueError(f"Profile '{profile}' cannot be trained incrementally")
+        # The tree size bounds of the profile apply; the tree count is set per chunk
+        params.update(n_estimators=0, warm_start=True)
+        self.profile = profile
+        self.trees_per_chunk = trees_per_chunk
+        self.max_trees = max_trees
+        self.model = Pipeline([
+            ('features', AllocationFeatureTransformer(encoding='ordinal')),
+            ('regressor', RandomForestRegressor(**params))
+        ])
+        self.trained = False
+        self.last_allocation_id = 0
+        self.rows_seen = 0
+        self.version = 0
+    
+    def partial_fit(self, allocations):
+        """Grow the forest on one chunk of history (needs hours_allocated, and id for the watermark)"""
+        if 'id' in allocations and len(allocations):
+            self.last_allocation_id = max(self.last_allocation_id, int(allocations['id'].max()))
+        allocations = allocations[allocations['hours_allocated'].notna()]
+        if len(allocations) == 0:
+            return self
         
-        # Ensure X_new has the same features as training data
-        missing_cols = set(self.model.feature_names_in_) - set(X_new.columns)
-        for col in missing_cols:
-            X_new[col] = 0
-            
-        # Ensure X_new has only the features used in training
-        X_new = X_new[self.model.feature_names_in_]
+        features = self.feature_transformer.partial_fit(allocations)
+        regressor = self.model.named_steps['regressor']
+        regressor.n_estimators = len(getattr(regressor, 'estimators_', [])) + self.trees_per_chunk
+        regressor.fit(features.transform(allocations), allocations['hours_allocated'])
+        if len(regressor.estimators_) > self.max_trees:
+            regressor.estimators_ = regressor.estimators_[-self.max_trees:]
+            regressor.n_estimators = self.max_trees
         
-        return self.model.predict(X_new)
+        self.rows_seen += len(allocations)
+        self.trained = True
+        return self
     
-    def forecast_availability(self, employee_data, future_dates):
-        """Forecast employee availability for future dates"""
-        # This would use historical allocation patterns to predict future availability
-        # For simplicity, using a rule-based approach for now
-        availability = {}
-        
-        for emp_id in employee_data['employee_id'].unique():
-            # Example: calculate availability as 40 hours minus allocated hours
-            emp_allocations = employee_data[employee_data['employee_id'] == emp_id]
-            weekly_hours = 40  # Assuming 40-hour work week
-            
-            # Calculate allocated hours per week
-            allocated_hours = emp_allocations.groupby('week')['hours_allocated'].sum()
-            
-            # Calculate availability for each week
-            for week in future_dates:
-                if week in allocated_hours.index:
-                    availability[(emp_id, week)] = max(0, weekly_hours - allocated_hours[week])
-                else:
-                    availability[(emp_id, week)] = weekly_hours
-                    
-        return availability
+    def train(self, historical_allocations, chunk_size=50000):
+        """Train from scratch on a DataFrame or an iterable of DataFrame chunks"""
+        if isinstance(historical_allocations, pd.DataFrame):
+            if len(historical_allocations) == 0:
+                raise ValueError("No historical data provided for training")
+            frame = historical_allocations
+            historical_allocations = (
+                frame.iloc[start:start + chunk_size] for start in range(0, len(frame), chunk_size)
+            )
+        for chunk in historical_allocations:
+            self.partial_fit(chunk)
+        if not self.trained:
+            raise ValueError("No historical allocations with hours_allocated")
+        return self
 
 # Example usage:
 # forecaster = ResourceForecaster()
@@ -0,0 +1,81 @@
+# Fit time, predict latency, model size and accuracy of the forecaster training profiles
+# Run from the project root:
+#   python -m ml.resource_forecasting.training_benchmark --rows 10000 100000 1000000
+import argparse
+import io
+import time
+
+import joblib
+import numpy as np
+
+from ml.resource_forecasting.benchmark import make_allocations
+from ml.resource_forecasting.model import ResourceForecaster, TRAINING_PROFILES
+
+# The unbounded single-threaded forest on one-hot ids takes minutes even on
+# 10k rows, so it only runs at or below this size unless asked for explicitly
+EXHAUSTIVE_MAX_ROWS = 10_000
+
+
+def model_bytes(forecaster):
+    """Size of the fitted pipeline as joblib would write it"""
+    buffer = io.BytesIO()
+    joblib.dump(forecaster.model, buffer)
+    return buffer.getbuffer().nbytes
+
+
+def measure(profile, train, test, single_requests=50, **params):
+    """Fit seconds, batch and single-row predict latency, model bytes and MAE of one profile"""
+    forecaster = ResourceForecaster(profile, **params)
+    start = time.perf_counter()
+    forecaster.train(train)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = forecaster.predict_allocation(test)
+    batch_seconds = time.perf_counter() - start
+
+    # One allocation request at a time, as the API asks
+    latencies = []
+    for i in range(single_requests):
+        row = test.iloc[i:i + 1]
+        start = time.perf_counter()
+        forecaster.predict_allocation(row)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        'fit_seconds': fit_seconds,
+        'batch_ms_per_1k': 1000 * batch_seconds / len(test) * 1000,
+        'single_ms': 1000 * float(np.median(latencies)),
+        'model_mb': model_bytes(forecaster) / 1e6,
+        'mae': float(np.mean(np.abs(predictions - test['hours_allocated'].to_numpy())))
+    }
+
+
+def run(rows, profiles, test_rows=10_000, exhaustive_max_rows=EXHAUSTIVE_MAX_ROWS, **params):
+    """Print one line per (history size, profile) on the same held-out allocations"""
+    print(f"{'rows':>9s} {'profile':24s} {'fit s':>8s} {'ms/1k':>7s} {'1-row ms':>8s} {'MB':>8s} {'MAE':>6s}")
+    for num_rows in rows:
+        allocations = make_allocations(num_rows + test_rows)
+        train, test = allocations.iloc[:num_rows], allocations.iloc[num_rows:]
+        baseline = np.mean(np.abs(test['hours_allocated'] - train['hours_allocated'].mean()))
+        print(f"{num_rows:9d} {'(predict the mean)':24s} {'':>8s} {'':>7s} {'':>8s} {'':>8s} {baseline:6.2f}")
+        for profile in profiles:
+            if profile == 'exhaustive' and exhaustive_max_rows is not None and num_rows > exhaustive_max_rows:
+                continue
+            result = measure(profile, train, test, **params)
+            print(f"{num_rows:9d} {profile:24s} {result['fit_seconds']:8.2f} {result['batch_ms_per_1k']:7.2f} "
+                  f"{result['single_ms']:8.2f} {result['model_mb']:8.1f} {result['mae']:6.2f}", flush=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare forecaster training profiles on synthetic allocation histories")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--profiles', nargs='+', choices=list(TRAINING_PROFILES),
+                        help="Profiles to compare (default: all, with 'exhaustive' only on small histories)")
+    parser.add_argument('--n-jobs', type=int, default=None, help="Override the forests' n_jobs")
+    args = parser.parse_args()
+    overrides = {} if args.n_jobs is None else {'n_jobs': args.n_jobs}
+    if args.profiles:
+        run(args.rows, args.profiles, exhaustive_max_rows=None, **overrides)
+    else:
+        run(args.rows, list(TRAINING_PROFILES), **overrides)
@@ -0,0 +1,173 @@
+# Two-tier cache for skill embeddings (in-process LRU + memory-mapped .npy on disk)
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+
+
+def embedding_key(model_name, text):
+    """Content hash identifying an embedding for (model_name, text)"""
+    return hashlib.sha1(f"{model_name}\x00{text}".encode('utf-8')).hexdigest()
+
+
+class SkillEmbeddingCache:
+    """
+    Stores skill vectors so each (model_name, text) pair is encoded only once.
+
+    Lookups go to a bounded in-process LRU first, then to an on-disk store made
+    of `embeddings.npy` (opened memory-mapped) plus `index.json` mapping content
+    hashes to row numbers. New vectors are buffered and appended on `flush()`.
+    """
+
+    INDEX_FILE = 'index.json'
+    VECTORS_FILE = 'embeddings.npy'
+
+    def __init__(self, model_name, cache_dir=None, max_memory_items=10000):
+        self.model_name = model_name
+        self.max_memory_items = max_memory_items
+        self.cache_dir = None
+        if cache_dir:
+            # One sub-directory per model so vectors of different sizes never mix
+            safe_name = model_name.replace('/', '__')
+            self.cache_dir = os.path.join(cache_dir, safe_name)
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._memory = OrderedDict()
+        self._disk_index = {}
+        self._disk_vectors = None
+        self._pending = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self._load_disk_tier()
+
+    def _load_disk_tier(self):
+        """Open the on-disk tier if it exists"""
+        if not self.cache_dir:
+            return
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        vectors_path = os.path.join(self.cache_dir, self.VECTORS_FILE)
+        if not (os.path.exists(index_path) and os.path.exists(vectors_path)):
+            return
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            vectors = np.load(vectors_path, mmap_mode='r')
+        except (OSError, ValueError):
+            # A corrupt cache is only a cache; start over rather than fail requests
+            return
+        if len(index) and max(index.values()) >= len(vectors):
+            return
+        self._disk_index = index
+        self._disk_vectors = vectors
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, text):
+        """Return the cached vector for text, or None"""
+        key = embedding_key(self.model_name, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+            vector = self._pending.get(key)
+            if vector is None and key in self._disk_index:
+                vector = np.array(self._disk_vectors[self._disk_index[key]])
+            if vector is None:
+                self.misses += 1
+                return None
+            self._remember(key, vector)
+            self.hits += 1
+            return vector
+
+    def put(self, text, vector):
+        """Add a freshly computed vector to both tiers"""
+        key = embedding_key(self.model_name, text)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            if self.cache_dir and key not in self._disk_index:
+                self._pending[key] = vector
+
+    def encode(self, texts, encode_fn):
+        """
+        Return an (n, dim) array of embeddings for texts, calling encode_fn
+        once with only the texts that are not cached yet.
+        """
+        texts = list(texts)
+        vectors = [self.get(text) for text in texts]
+        missing = list(OrderedDict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            computed = np.asarray(encode_fn(missing), dtype=np.float32)
+            computed_by_text = dict(zip(missing, computed))
+            for text, vector in computed_by_text.items():
+                self.put(text, vector)
+            vectors = [v if v is not None else computed_by_text[t] for t, v in zip(texts, vectors)]
+            self.flush()
+        if not vectors:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(vectors)
+
+    def flush(self):
+        """Append buffered vectors to the on-disk tier"""
+        if not self.cache_dir:
+            return
+        with self._lock:
+            if not self._pending:
+                return
+            new_vectors = np.vstack(list(self._pending.values()))
+            if self._disk_vectors is not None and len(self._disk_vectors):
+                all_vectors = np.concatenate([np.asarray(self._disk_vectors), new_vectors])
+            else:
+                all_vectors = new_vectors
+            index = dict(self._disk_index)
+            offset = len(all_vectors) - len(new_vectors)
+            for i, key in enumerate(self._pending):
+                index[key] = offset + i
+
+            # Write to temp files and rename so readers never see a partial store
+            vectors_path = os.path.join(self.cache_dir, self.VECTORS_FILE)
+            index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+            tmp_vectors = f'{vectors_path}.{os.getpid()}.tmp.npy'
+            tmp_index = f'{index_path}.{os.getpid()}.tmp'
+            np.save(tmp_vectors, all_vectors)
+            with open(tmp_index, 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            self._disk_vectors = None
+            os.replace(tmp_vectors, vectors_path)
+            os.replace(tmp_index, index_path)
+
+            self._disk_index = index
+            self._disk_vectors = np.load(vectors_path, mmap_mode='r')
+            self._pending.clear()
+
+    def clear_memory(self):
+        """Drop the in-process tier (the on-disk tier is kept)"""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        """Cache counters for monitoring"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'model_name': self.model_name,
+                'memory_items': len(self._memory),
+                'disk_items': len(self._disk_index),
+                'pending_items': len(self._pending),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+# Example usage:
+# cache = SkillEmbeddingCache('paraphrase-MiniLM-L6-v2', cache_dir='.embedding_cache')
+# vectors = cache.encode(["Python programming", "UI design"], model.encode)
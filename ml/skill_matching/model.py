@@ -1,15 +1,32 @@
 ﻿# Skill matching with Sentence-BERT from Hugging Face
-from sentence_transformers import SentenceTransformer
 import numpy as np
+import os
+from ml.model_registry import get_encoder
+from ml.skill_matching.embedding_cache import SkillEmbeddingCache
+from ml.skill_matching.vector_index import create_index, recall_at_k
 
 class SkillMatcher:
-    def __init__(self, model_name='paraphrase-MiniLM-L6-v2'):
-        # Load pre-trained model from Hugging Face
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name='paraphrase-MiniLM-L6-v2', cache_dir=None):
+        # The pre-trained Hugging Face model is loaded on first use and shared
+        # process-wide through the model registry
+        self.model_name = model_name
+        # Skill vectors are cached per (model_name, text) in memory and, if a
+        # cache directory is configured, on disk across restarts
+        if cache_dir is None:
+            cache_dir = os.getenv("SKILL_EMBEDDING_CACHE_DIR")
+        self.embedding_cache = SkillEmbeddingCache(model_name, cache_dir=cache_dir)
+        # Optional employee skill index for sub-linear candidate retrieval
+        self.index = None
+    
+    @property
+    def model(self):
+        """Shared Sentence-BERT encoder (loaded lazily)"""
+        return get_encoder(self.model_name)
     
     def get_skill_embeddings(self, skills):
         """Generate embeddings for a list of skills"""
-        return self.model.encode(skills)
+        # Only touch (and therefore load) the encoder for texts missing from the cache
+        return self.embedding_cache.encode(skills, lambda texts: self.model.encode(texts))
     
     def get_project_requirements_embedding(self, project_description):
         """Generate embedding for project description"""
@@ -38,6 +55,94 @@ class SkillMatcher:
         # Sort by similarity score (descending)
         return sorted(skill_scores, key=lambda x: x[1], reverse=True)
 
+    def score_employees(self, project_description, employee_skills, top_n=3):
+        """
+        Score many employees against one project in a single pass.
+
+        employee_skills maps employee id -> list of skill texts. The project is
+        encoded once, every skill vector is stacked into one matrix with a
+        segment offset per employee, and the score for each employee is the mean
+        of their top_n skill similarities. Returns {employee_id: score} for
+        employees that have at least one skill.
+        """
+        emp_ids = [emp_id for emp_id, skills in employee_skills.items() if skills]
+        if not emp_ids:
+            return {}
+        counts = np.array([len(employee_skills[emp_id]) for emp_id in emp_ids])
+        segment_ids = np.repeat(np.arange(len(emp_ids)), counts)
+        flat_skills = [skill for emp_id in emp_ids for skill in employee_skills[emp_id]]
+
+        # Encode each distinct skill text once, then gather rows per skill occurrence
+        unique_skills, inverse = np.unique(np.array(flat_skills, dtype=object), return_inverse=True)
+        unique_embeddings = self.get_skill_embeddings(list(unique_skills))
+        project_embedding = self.get_project_requirements_embedding(project_description)
+        unique_similarities = self.calculate_similarity(project_embedding, unique_embeddings)
+        similarities = unique_similarities[inverse.ravel()]
+
+        # Order by (employee, similarity desc) and keep the first top_n of each segment
+        order = np.lexsort((-similarities, segment_ids))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        rank_in_segment = np.arange(len(order)) - starts[segment_ids[order]]
+        keep = order[rank_in_segment < top_n]
+        totals = np.bincount(segment_ids[keep], weights=similarities[keep], minlength=len(emp_ids))
+        scores = totals / np.minimum(counts, top_n)
+
+        return {emp_id: float(score) for emp_id, score in zip(emp_ids, scores)}
+
+    def build_index(self, employee_skills, backend='flat', **index_params):
+        """
+        Build an employee skill index from {employee_id: [skill texts]}.
+        Every distinct skill is encoded in one batch and the vectors are
+        added in bulk, so an IVF index trains once on all of them.
+        """
+        index = create_index(backend, **index_params)
+        employee_skills = {emp_id: skills for emp_id, skills in employee_skills.items() if skills}
+        if employee_skills:
+            unique_skills = list(dict.fromkeys(skill for skills in employee_skills.values() for skill in skills))
+            embeddings = self.get_skill_embeddings(unique_skills)
+            rows = {skill: i for i, skill in enumerate(unique_skills)}
+            index.add_many(
+                (emp_id, embeddings[[rows[skill] for skill in skills]])
+                for emp_id, skills in employee_skills.items()
+            )
+        self.index = index
+        return index
+
+    def index_employee(self, employee_id, skills, embeddings=None):
+        """
+        Add or refresh one employee in the index after their skills change.
+        embeddings, if given, are the skills' vectors from get_skill_embeddings,
+        so callers can encode elsewhere and only update the index here.
+        """
+        if self.index is None:
+            return
+        if skills:
+            self.index.add(employee_id, self.get_skill_embeddings(skills) if embeddings is None else embeddings)
+        else:
+            self.index.remove(employee_id)
+
+    def remove_employee(self, employee_id):
+        """Drop an employee from the index"""
+        if self.index is not None:
+            self.index.remove(employee_id)
+
+    def search_employees(self, project_description, k=10, top_n=1):
+        """
+        Return the top-k (employee_id, score) pairs from the index, scored by
+        the mean of each employee's top_n skills as in score_employees
+        """
+        if self.index is None:
+            raise ValueError("Skill index must be built before searching")
+        project_embedding = self.get_project_requirements_embedding(project_description)
+        return self.index.search(project_embedding, k, top_n=top_n)
+
+    def index_recall(self, project_descriptions, k=10):
+        """Recall@k of the current index against an exact flat index"""
+        if self.index is None:
+            raise ValueError("Skill index must be built before measuring recall")
+        queries = np.atleast_2d(self.model.encode(list(project_descriptions)))
+        return recall_at_k(self.index, queries, k)
+
 # Example usage:
 # matcher = SkillMatcher()
 # skills = ["Python programming", "Data analysis", "Project management", "UI design"]
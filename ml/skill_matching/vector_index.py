@@ -0,0 +1,283 @@
+# Vector indexes for retrieving the employees whose skills best match a project embedding
+import numpy as np
+
+
+def _normalize(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorIndex:
+    """
+    Base index mapping a key (employee id) to one or more skill vectors.
+
+    Vectors are stored L2-normalized in one growable matrix; an employee's score
+    for a query is the cosine similarity of their best matching skill.
+    Subclasses decide which rows are candidates for a query.
+    """
+
+    def __init__(self):
+        self.dim = None
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._owner = np.zeros(0, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._free_rows = []
+        self._rows_by_key = {}
+        self._keys = []
+        self._codes = {}
+
+    def __len__(self):
+        return len(self._rows_by_key)
+
+    def __contains__(self, key):
+        return key in self._rows_by_key
+
+    def _allocate_rows(self, count):
+        """Reuse freed rows first, then grow the storage by doubling"""
+        rows = []
+        while self._free_rows and len(rows) < count:
+            rows.append(self._free_rows.pop())
+        needed = count - len(rows)
+        if needed:
+            if self._size + needed > len(self._vectors):
+                capacity = max(2 * len(self._vectors), self._size + needed, 64)
+                vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+                if self._size:
+                    vectors[:self._size] = self._vectors[:self._size]
+                owner = np.zeros(capacity, dtype=np.int64)
+                owner[:self._size] = self._owner[:self._size]
+                alive = np.zeros(capacity, dtype=bool)
+                alive[:self._size] = self._alive[:self._size]
+                self._vectors, self._owner, self._alive = vectors, owner, alive
+            rows.extend(range(self._size, self._size + needed))
+            self._size += needed
+        return np.array(rows, dtype=np.int64)
+
+    def add(self, key, vectors):
+        """Add (or replace) all skill vectors for key"""
+        vectors = _normalize(vectors)
+        if len(vectors) == 0:
+            self.remove(key)
+            return
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}")
+
+        self.remove(key)
+        if key not in self._codes:
+            self._codes[key] = len(self._keys)
+            self._keys.append(key)
+        rows = self._allocate_rows(len(vectors))
+        self._vectors[rows] = vectors
+        self._owner[rows] = self._codes[key]
+        self._alive[rows] = True
+        self._rows_by_key[key] = rows
+        self._on_add(rows)
+
+    def add_many(self, items):
+        """Add (or replace) the skill vectors of many keys from (key, vectors) pairs"""
+        for key, vectors in items:
+            self.add(key, vectors)
+        return self
+
+    def remove(self, key):
+        """Remove key from the index (no-op if absent)"""
+        rows = self._rows_by_key.pop(key, None)
+        if rows is None:
+            return
+        self._alive[rows] = False
+        self._free_rows.extend(rows.tolist())
+        self._on_remove(rows)
+
+    def get(self, key):
+        """Return the stored (normalized) vectors for key"""
+        rows = self._rows_by_key.get(key)
+        return None if rows is None else self._vectors[rows].copy()
+
+    def keys(self):
+        return list(self._rows_by_key.keys())
+
+    def search(self, query, k=10, top_n=1):
+        """
+        Return up to k (key, score) pairs, best first.
+
+        A key's score is the mean of its top_n skill similarities (top_n=1:
+        its best skill). The candidate rows only decide which keys are
+        scored; with top_n > 1 each of those is scored on all its vectors.
+        """
+        if not self._rows_by_key:
+            return []
+        query = _normalize(query)[0]
+        rows = self._candidate_rows(query)
+        if len(rows) == 0:
+            return []
+        if top_n > 1:
+            live = np.flatnonzero(self._alive[:self._size])
+            rows = live[np.isin(self._owner[live], self._owner[rows])]
+        similarities = self._vectors[rows] @ query
+        codes = self._owner[rows]
+
+        # Order by (owner, similarity desc) and average each owner's first top_n rows
+        order = np.lexsort((-similarities, codes))
+        codes, similarities = codes[order], similarities[order]
+        unique_codes, starts, counts = np.unique(codes, return_index=True, return_counts=True)
+        segment = np.repeat(np.arange(len(unique_codes)), counts)
+        keep = np.arange(len(codes)) - starts[segment] < top_n
+        scores = np.bincount(segment[keep], weights=similarities[keep], minlength=len(unique_codes))
+        scores /= np.minimum(counts, top_n)
+        top = np.argsort(-scores, kind='stable')[:k]
+        return [(self._keys[unique_codes[i]], float(scores[i])) for i in top]
+
+    def _candidate_rows(self, query):
+        raise NotImplementedError
+
+    def _on_add(self, rows):
+        pass
+
+    def _on_remove(self, rows):
+        pass
+
+
+class FlatIndex(VectorIndex):
+    """Exact index: every stored skill vector is scored"""
+
+    def _candidate_rows(self, query):
+        return np.flatnonzero(self._alive[:self._size])
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file index: vectors are bucketed by their nearest k-means centroid
+    and a query only scores the rows in its n_probe closest buckets.
+
+    Until enough vectors have been added to train the centroids the index
+    answers queries exactly, like FlatIndex. add_many trains once on
+    everything it added rather than on the first vectors to arrive; vectors
+    added after training are only assigned to the existing buckets, so call
+    train() again after large changes.
+    """
+
+    def __init__(self, n_lists=64, n_probe=8, train_iterations=10, random_state=42):
+        super().__init__()
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_iterations = train_iterations
+        self.random_state = random_state
+        self.centroids = None
+        self._deferred = False
+        self._lists = []
+        self._row_list = np.zeros(0, dtype=np.int64)
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def train(self):
+        """Fit the coarse quantizer on the stored vectors and rebucket them"""
+        rows = np.flatnonzero(self._alive[:self._size])
+        n_lists = min(self.n_lists, len(rows))
+        if n_lists == 0:
+            return self
+        data = self._vectors[rows]
+        rng = np.random.default_rng(self.random_state)
+        centroids = data[rng.choice(len(data), n_lists, replace=False)]
+
+        # Spherical k-means (Lloyd iterations on cosine similarity)
+        for _ in range(self.train_iterations):
+            assignment = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, data)
+            empty = np.bincount(assignment, minlength=n_lists) == 0
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+
+        self.centroids = centroids
+        self._lists = [set() for _ in range(n_lists)]
+        self._row_list = np.full(len(self._vectors), -1, dtype=np.int64)
+        self._on_add(rows)
+        return self
+
+    def add_many(self, items):
+        """Add many keys, then train on all stored vectors if that makes enough of them"""
+        if self.is_trained:
+            return super().add_many(items)
+        self._deferred = True
+        try:
+            super().add_many(items)
+        finally:
+            self._deferred = False
+        self._on_add(np.zeros(0, dtype=np.int64))
+        return self
+
+    def _assign(self, rows):
+        return np.argmax(self._vectors[rows] @ self.centroids.T, axis=1)
+
+    def _on_add(self, rows):
+        if not self.is_trained:
+            # Train automatically once there is enough data for meaningful buckets
+            if not self._deferred and self._alive[:self._size].sum() >= 4 * self.n_lists:
+                self.train()
+            return
+        if len(self._row_list) < len(self._vectors):
+            row_list = np.full(len(self._vectors), -1, dtype=np.int64)
+            row_list[:len(self._row_list)] = self._row_list
+            self._row_list = row_list
+        for row, list_id in zip(rows.tolist(), self._assign(rows).tolist()):
+            self._lists[list_id].add(row)
+            self._row_list[row] = list_id
+
+    def _on_remove(self, rows):
+        if not self.is_trained:
+            return
+        for row in rows.tolist():
+            list_id = self._row_list[row]
+            if list_id >= 0:
+                self._lists[list_id].discard(row)
+                self._row_list[row] = -1
+
+    def _candidate_rows(self, query):
+        if not self.is_trained:
+            return np.flatnonzero(self._alive[:self._size])
+        n_probe = min(self.n_probe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        rows = [row for list_id in probe for row in self._lists[list_id]]
+        return np.array(rows, dtype=np.int64)
+
+
+def create_index(backend='flat', **kwargs):
+    """Create a vector index by backend name ('flat' or 'ivf')"""
+    backends = {'flat': FlatIndex, 'ivf': IVFIndex}
+    if backend not in backends:
+        raise ValueError(f"Unknown vector index backend '{backend}'. Choose from {sorted(backends)}")
+    return backends[backend](**kwargs)
+
+
+def recall_at_k(index, queries, k=10):
+    """
+    Measure how many of the exact top-k employees the index returns.
+
+    An exact FlatIndex is built from the same vectors and used as ground truth.
+    Returns the mean recall over all queries (1.0 for an exact index).
+    """
+    exact = FlatIndex()
+    for key in index.keys():
+        exact.add(key, index.get(key))
+    queries = np.atleast_2d(queries)
+    if len(queries) == 0 or len(exact) == 0:
+        return 1.0
+    recalls = []
+    for query in queries:
+        expected = {key for key, _ in exact.search(query, k)}
+        found = {key for key, _ in index.search(query, k)}
+        recalls.append(len(expected & found) / len(expected))
+    return float(np.mean(recalls))
+
+# Example usage:
+# index = create_index('ivf', n_lists=32, n_probe=4)
+# index.add_many(employee_skill_embeddings.items())
+# top_employees = index.search(project_embedding, k=20)
+# print(recall_at_k(index, sample_project_embeddings, k=20))
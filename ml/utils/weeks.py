@@ -0,0 +1,56 @@
+# Monday-based week numbering and weekly booking arrays, shared by the
+# capacity calendar and the availability forecaster
+import numpy as np
+import pandas as pd
+
+# Weeks are numbered from the Monday before the Unix epoch (day 0 is a Thursday)
+WEEK_ZERO = np.datetime64('1969-12-29', 'D')
+
+
+def week_number(dates):
+    """Number of the Monday-based week each date falls in, as floats (NaN where missing)"""
+    days = pd.to_datetime(pd.Series(dates).to_numpy(), errors='coerce').to_numpy().astype('datetime64[D]')
+    numbers = (days - WEEK_ZERO).astype('int64').astype(float) // 7
+    numbers[np.isnat(days)] = np.nan
+    return numbers
+
+
+def week_dates(numbers):
+    """Monday of each week number"""
+    return pd.DatetimeIndex(WEEK_ZERO + np.asarray(numbers, dtype='int64') * np.timedelta64(7, 'D'))
+
+
+def booking_matrix(employee_ids, allocation_employee_ids, start_weeks, end_weeks, amounts,
+                   first_week, num_weeks, dtype=np.float64):
+    """
+    Amount booked per employee and week, as a len(employee_ids) x num_weeks
+    array whose columns are the weeks first_week .. first_week + num_weeks - 1.
+
+    Allocation i books amounts[i] in every week from start_weeks[i] to
+    end_weeks[i], both included. A missing (NaN) start or end is open-ended:
+    the allocation books from the first or through the last week of the
+    array. Allocations of other employees, without an amount, or ending
+    before they start are ignored.
+
+    Rather than looping over allocations, +amount goes in at the first week
+    and -amount after the last of a difference array, filled by one bincount
+    and summed along the weeks, so the cost is linear in the number of
+    allocations plus cells.
+    """
+    n = len(employee_ids)
+    width = num_weeks + 1
+    if n == 0 or num_weeks <= 0 or len(allocation_employee_ids) == 0:
+        return np.zeros((n, max(num_weeks, 0)), dtype=dtype)
+    rows = pd.Index(employee_ids).get_indexer(pd.Index(allocation_employee_ids))
+    start = np.nan_to_num(np.asarray(start_weeks, dtype=float) - first_week, nan=0)
+    end = np.nan_to_num(np.asarray(end_weeks, dtype=float) - first_week + 1, nan=num_weeks)
+    amounts = np.asarray(amounts, dtype=float)
+    keep = (rows >= 0) & ~np.isnan(amounts) & (end > start) & (end > 0) & (start < num_weeks)
+    rows, amounts = rows[keep], amounts[keep]
+    start = np.clip(start[keep], 0, num_weeks).astype(np.int64)
+    end = np.clip(end[keep], 0, num_weeks).astype(np.int64)
+    deltas = (
+        np.bincount(rows * width + start, weights=amounts, minlength=n * width)
+        - np.bincount(rows * width + end, weights=amounts, minlength=n * width)
+    )
+    return np.cumsum(deltas.reshape(n, width), axis=1)[:, :num_weeks].astype(dtype, copy=False)